@@ -0,0 +1,227 @@
+"""
+Типизированная запись статьи и схема колонок.
+
+Раньше scraped_date был то datetime, то словарем fallback_date
+{"date": ..., "has_time": ...}, то строкой GNews, и ноутбук на каждой
+загрузке разбирал его через pd.to_datetime(format='mixed', errors='coerce').
+Теперь process_page собирает Article, и дата приводится один раз, при записи:
+
+    published_at    - время публикации, datetime с поясом UTC
+    date_precision  - 'time' (время известно) или 'day' (только день)
+    date_source     - откуда дата: page (совпала с GNews с точностью до времени),
+                      page_partial (только день), feed (RSS / sitemap), gnews (на странице не нашли),
+                      scraped (даты нет и в выдаче - время разбора, для анализа не годится)
+    gnews_date      - дата из выдачи GNews, UTC
+    id              - стабильный id по URL статьи (без схемы, www, utm меток и / в конце)
+
+Дата со страницы без пояса считается московской (PAGE_TZ). scraped_date
+оставлен для старых ячеек ноутбука и равен published_at.
+
+Чтение csv / parquet с нативными колонками времени, без mixed разбора:
+
+    from article import read_articles
+    df = read_articles('сбербанк_3day_news.csv')
+"""
+import hashlib, re
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+from dateutil import parser
+
+PAGE_TZ = timezone(timedelta(hours=3))
+DATE_SOURCES = ('page', 'page_partial', 'feed', 'gnews', 'scraped')
+FOUND_SOURCES = ('page', 'page_partial', 'feed')   # дата взята со страницы или из ленты
+PRECISIONS = ('time', 'day')
+
+# колонка -> dtype pandas; порядок - порядок колонок в csv
+SCHEMA = {
+    'id': 'string',
+    'published_at': 'datetime64[ns, UTC]',
+    'date_precision': 'category',
+    'date_source': 'category',
+    'gnews_date': 'datetime64[ns, UTC]',
+    'date': 'string',             # строка даты GNews как есть
+    'scraped_date': 'datetime64[ns, UTC]',
+    'title': 'string',
+    'url': 'string',
+    'summary': 'string',
+    'tickers': 'string',
+}
+TIME_COLUMNS = [c for c, dtype in SCHEMA.items() if dtype.startswith('datetime')]
+
+
+def article_id(url):
+    """16 hex знаков sha1 от нормализованного URL: http/https, www, utm метки и / в конце не влияют."""
+    parts = urlsplit(url or '')
+    host = parts.netloc.lower().removeprefix('www.')
+    query = urlencode([(k, v) for k, v in parse_qsl(parts.query) if not k.startswith('utm_')])
+    key = f"{host}{parts.path.rstrip('/')}" + (f"?{query}" if query else '')
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+
+
+def to_utc(value, default_tz=PAGE_TZ):
+    """datetime или строка -> datetime в UTC (без пояса - default_tz), None если не разобрать."""
+    if value is None:
+        return None
+    if not isinstance(value, datetime):
+        try:
+            value = parser.parse(str(value))
+        except Exception:
+            return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=default_tz)
+    return value.astimezone(timezone.utc)
+
+
+class Article:
+    __slots__ = ('id', 'url', 'title', 'summary', 'tickers', 'published_at', 'date_precision', 'date_source',
+                 'gnews_date', 'gnews_raw')
+
+    def __init__(self, url, title, summary, tickers, published_at, date_precision, date_source,
+                 gnews_date=None, gnews_raw=None):
+        if published_at is None or published_at.tzinfo is None or published_at.utcoffset():
+            raise ValueError(f"published_at должен быть в UTC: {published_at!r}")
+        if date_precision not in PRECISIONS:
+            raise ValueError(f"Неизвестная точность даты: {date_precision}")
+        if date_source not in DATE_SOURCES:
+            raise ValueError(f"Неизвестный источник даты: {date_source}")
+        self.id = article_id(url)
+        self.url = url
+        self.title = title
+        self.summary = summary
+        self.tickers = tickers
+        self.published_at = published_at
+        self.date_precision = date_precision
+        self.date_source = date_source
+        self.gnews_date = gnews_date
+        self.gnews_raw = gnews_raw
+
+    @classmethod
+    def from_page(cls, item, url, page_date, summary, tickers):
+        """
+        Запись по элементу выдачи и результату поиска даты:
+        page_date - datetime (perfect), словарь fallback_date из extract_page_date или None.
+        """
+        gnews_raw = item.get('published date')
+        gnews_date = to_utc(gnews_raw, timezone.utc)
+        if item.get('feed'):
+            published_at, precision, source = to_utc(item['published_at']), 'time', 'feed'
+        elif isinstance(page_date, datetime):
+            published_at, precision, source = to_utc(page_date), 'time', 'page'
+        elif isinstance(page_date, dict) and page_date.get('date'):
+            published_at = to_utc(page_date['date'])
+            precision, source = ('time' if page_date.get('has_time') else 'day'), 'page_partial'
+        else:
+            published_at, precision, source = gnews_date, 'day', 'gnews'
+        if published_at is None and gnews_date is not None:
+            published_at, precision, source = gnews_date, 'day', 'gnews'
+        elif published_at is None:
+            published_at, precision, source = datetime.now(timezone.utc), 'day', 'scraped'
+        return cls(url, item.get('title'), summary, ','.join(tickers), published_at, precision, source,
+                   gnews_date, gnews_raw)
+
+    def to_row(self):
+        return {
+            'id': self.id,
+            'published_at': self.published_at,
+            'date_precision': self.date_precision,
+            'date_source': self.date_source,
+            'gnews_date': self.gnews_date,
+            'date': self.gnews_raw,
+            'scraped_date': self.published_at,
+            'title': self.title,
+            'url': self.url,
+            'summary': self.summary,
+            'tickers': self.tickers,
+        }
+
+
+def to_frame(rows):
+    """Строки статей -> DataFrame с типами SCHEMA (лишние колонки, например gate_*, сохраняются)."""
+    import pandas as pd
+    df = pd.DataFrame(rows)
+    for column, dtype in SCHEMA.items():
+        if column not in df:
+            df[column] = pd.Series(dtype=dtype, index=df.index)
+        elif dtype.startswith('datetime'):
+            df[column] = pd.to_datetime(df[column], utc=True)
+        else:
+            df[column] = df[column].astype(dtype)
+    extra = [c for c in df.columns if c not in SCHEMA]
+    return df[list(SCHEMA) + extra]
+
+
+def read_articles(path):
+    """
+    csv / parquet статей с типами SCHEMA. Время в csv пишется to_frame в одном
+    ISO формате, поэтому разбирается как ISO8601, без format='mixed'.
+    Старые csv (scraped_date вперемешку) - только через миграцию: python article.py old.csv new.parquet
+    """
+    import pandas as pd
+    if str(path).endswith('.parquet'):
+        return pd.read_parquet(path)
+    df = pd.read_csv(path, dtype={c: t for c, t in SCHEMA.items() if not t.startswith('datetime')}, encoding='utf-8-sig')
+    for column in TIME_COLUMNS:
+        if column in df:
+            df[column] = pd.to_datetime(df[column], format='ISO8601', utc=True)
+    return df
+
+
+def append_articles(df, path):
+    """
+    Дописать статьи (to_frame) в csv. Старый csv с заголовком date, scraped_date, ...
+    сначала один раз переводится в схему (migrate), иначе новые строки легли бы под
+    чужой заголовок. Новые колонки, которых нет в файле, - перезапись файла целиком.
+    """
+    import os
+    import pandas as pd
+    if not os.path.exists(path):
+        df.to_csv(path, index=False, encoding='utf-8-sig')
+        return
+    header = list(pd.read_csv(path, nrows=0, encoding='utf-8-sig').columns)
+    if 'published_at' not in header:
+        old = migrate(pd.read_csv(path, encoding='utf-8-sig'))
+        pd.concat([old, df], ignore_index=True).to_csv(path, index=False, encoding='utf-8-sig')
+    elif set(df.columns) - set(header):
+        old = read_articles(path)
+        pd.concat([old, df], ignore_index=True).to_csv(path, index=False, encoding='utf-8-sig')
+    else:
+        df.reindex(columns=header).to_csv(path, mode='a', index=False, header=False, encoding='utf-8-sig')
+
+
+def migrate(df):
+    """Старый csv (date, scraped_date вперемешку, title, url, summary) -> схема SCHEMA, один раз."""
+    rows = []
+    for rec in df.to_dict('records'):
+        scraped = rec.get('scraped_date')
+        page_date = None
+        if isinstance(scraped, str) and scraped.startswith('{'):
+            # repr словаря fallback_date: {'date': datetime.datetime(...), 'has_time': False}
+            match = re.search(r"datetime\.datetime\(([\d, ]+)\)", scraped)
+            if match:
+                page_date = {'date': datetime(*map(int, match.group(1).split(','))), 'has_time': "'has_time': True" in scraped}
+        elif isinstance(scraped, str) and scraped and scraped != rec.get('date'):
+            page_date = to_utc(scraped)
+        item = {'title': rec.get('title'), 'published date': rec.get('date')}
+        tickers = [t for t in str(rec.get('tickers') or '').split(',') if t]
+        row = Article.from_page(item, rec.get('url'), page_date, rec.get('summary'), tickers).to_row()
+        rows.append({**rec, **row})
+    return to_frame(rows)
+
+
+def main():
+    import argparse
+    import pandas as pd
+    arg_parser = argparse.ArgumentParser(description="Перевод старого csv статей в типизированную схему")
+    arg_parser.add_argument('source')
+    arg_parser.add_argument('target', help=".csv или .parquet")
+    args = arg_parser.parse_args()
+    df = migrate(pd.read_csv(args.source))
+    if args.target.endswith('.parquet'):
+        df.to_parquet(args.target, index=False)
+    else:
+        df.to_csv(args.target, index=False, encoding='utf-8-sig')
+    print(f"Статей: {len(df)}, источники даты: {df['date_source'].value_counts().to_dict()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Хранилище обработанных статей (SQLite). Один URL - одна строка, поэтому
+по нему же проверяем, видели ли мы статью раньше.
+"""
+import json, sqlite3, threading
+from datetime import datetime, timezone
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent
+STORE_PATH = BASE_DIR / 'articles.db'
+
+# энкодер эмбеддингов: по нему дедупликация и кластеры (FAISS/UMAP, dag.embed), и поверх
+# того же вектора головы тем и сентимента (distill.py, inference.py) - один проход на статью
+INDEX_ENCODER = 'intfloat/multilingual-e5-large'
+
+# колонка -> тип SQLite. Новые колонки докидываются в существующую базу через ALTER TABLE
+COLUMNS = {
+    'url': 'TEXT PRIMARY KEY',
+    'date': 'TEXT',           # дата из GNews
+    'scraped_date': 'TEXT',   # дата со страницы
+    'id': 'TEXT',             # article.article_id
+    'published_at': 'TEXT',   # ISO, UTC - см. article.py
+    'date_precision': 'TEXT',
+    'date_source': 'TEXT',
+    'gnews_date': 'TEXT',
+    'title': 'TEXT',
+    'publisher': 'TEXT',
+    'summary': 'TEXT',
+    'topics': 'TEXT',         # json {метка: вероятность}
+    'news_index': 'REAL',
+    'weighted_index': 'REAL',
+    'tickers': 'TEXT',        # через запятую, см. tickers.py
+    'gate_decision': 'TEXT',  # решение relevance_gate.py: fetch / defer / skip
+    'gate_score': 'REAL',
+    'embedding': 'BLOB',      # float32 вектор энкодера, см. inference.py
+    'embedding_model': 'TEXT',
+    'ingested_at': 'TEXT',
+}
+
+JSON_COLUMNS = {'topics'}
+TIME_COLUMNS = {'published_at', 'gnews_date'}
+VECTOR_COLUMNS = {'embedding'}
+
+class ArticleStore:
+    def __init__(self, path=STORE_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS articles (url TEXT PRIMARY KEY)")
+        existing = {row[1] for row in self._conn.execute("PRAGMA table_info(articles)")}
+        for name, sql_type in COLUMNS.items():
+            if name not in existing:
+                self._conn.execute(f"ALTER TABLE articles ADD COLUMN {name} {sql_type.replace(' PRIMARY KEY', '')}")
+        self._conn.commit()
+
+    def has(self, url):
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM articles WHERE url = ?", (url,)).fetchone() is not None
+
+    def _values(self, row):
+        values = {k: v for k, v in row.items() if k in COLUMNS}
+        values.setdefault('ingested_at', datetime.now(timezone.utc).isoformat())
+        for k in JSON_COLUMNS & values.keys():
+            values[k] = json.dumps(values[k], ensure_ascii=False)
+        for k in VECTOR_COLUMNS & values.keys():
+            if values[k] is not None:
+                values[k] = values[k].astype('float32').tobytes()
+        for k, v in values.items():
+            if isinstance(v, datetime):
+                values[k] = v.isoformat()
+            elif isinstance(v, dict): # fallback_date из extract_page_date
+                values[k] = json.dumps(v, ensure_ascii=False, default=str)
+        return values
+
+    def _upsert(self, values):
+        cols = ', '.join(values)
+        marks = ', '.join('?' for _ in values)
+        updates = ', '.join(f"{k} = excluded.{k}" for k in values if k != 'url')
+        on_conflict = f"DO UPDATE SET {updates}" if updates else "DO NOTHING"
+        self._conn.execute(
+            f"INSERT INTO articles ({cols}) VALUES ({marks}) ON CONFLICT(url) {on_conflict}",
+            list(values.values())
+        )
+
+    def add(self, row):
+        """Вставляет или обновляет статью. Лишние ключи row игнорируются."""
+        values = self._values(row)
+        with self._lock:
+            self._upsert(values)
+            self._conn.commit()
+
+    def add_many(self, rows):
+        """То же, что add, для пачки строк - одной транзакцией."""
+        batch = [self._values(row) for row in rows]
+        with self._lock:
+            for values in batch:
+                self._upsert(values)
+            self._conn.commit()
+
+    def load(self, where=None, params=()):
+        """Статьи как DataFrame. where - условие SQL, например "embedding IS NULL"."""
+        import numpy as np
+        import pandas as pd
+        query = "SELECT * FROM articles" + (f" WHERE {where}" if where else "")
+        with self._lock:
+            df = pd.read_sql_query(query, self._conn, params=params)
+        for k in JSON_COLUMNS:
+            df[k] = df[k].apply(lambda v: json.loads(v) if isinstance(v, str) and v else None)
+        for k in VECTOR_COLUMNS:
+            df[k] = df[k].apply(lambda v: np.frombuffer(v, dtype=np.float32) if isinstance(v, bytes) else None)
+        for k in TIME_COLUMNS:
+            df[k] = pd.to_datetime(df[k], format='ISO8601', utc=True)
+        return df
+
+    def close(self):
+        self._conn.close()
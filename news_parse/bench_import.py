@@ -0,0 +1,81 @@
+"""
+Бенчмарк холодного старта: время импорта модулей скрапера в чистом
+интерпретаторе и самые тяжелые импорты по данным python -X importtime.
+
+    python bench_import.py                 # news_parse, live_service, debug скрипты
+    python bench_import.py --max-seconds 1 # код 1, если старт news_parse дольше секунды
+
+"До первой загрузки" = импорт news_parse + поиск chromedriver в кеше +
+проверка данных nltk, без запуска самого браузера.
+"""
+import argparse, subprocess, sys, time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent
+
+SCENARIOS = {
+    'import news_parse': "import news_parse",
+    'import live_service': "import live_service",
+    'import single_url_test': "import single_url_test",
+    'import not_extraced_urls_debug': "import not_extraced_urls_debug",
+    'до первой загрузки': (
+        "import news_parse, drivers, summarizer\n"
+        "drivers.chromedriver_path()\n"
+        "summarizer.ensure_nltk_data()"
+    ),
+}
+
+
+def run_once(code, importtime=False):
+    cmd = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', code]
+    started = time.perf_counter()
+    proc = subprocess.run(cmd, cwd=BASE_DIR, capture_output=True, text=True)
+    elapsed = time.perf_counter() - started
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"код {proc.returncode}")
+    return elapsed, proc.stderr
+
+
+def heaviest_imports(importtime_output, top=10):
+    """Топ модулей по кумулятивному времени импорта (микросекунды)."""
+    rows = []
+    for line in importtime_output.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append((int(cumulative_us), name.rstrip()[1:]))  # один пробел после '|' - разделитель
+    # прямые импорты модуля (отступ в 2 пробела) - они и показывают, что тянет старт
+    rows = [(us, name.strip()) for us, name in rows if name.startswith('  ') and not name.startswith('   ')]
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Время холодного старта скрапера")
+    arg_parser.add_argument('--repeat', type=int, default=3)
+    arg_parser.add_argument('--max-seconds', type=float, default=None)
+    args = arg_parser.parse_args()
+
+    baseline, _ = min(run_once("pass") for _ in range(args.repeat))
+    print(f"пустой интерпретатор: {baseline:.3f} сек\n")
+
+    results = {}
+    for name, code in SCENARIOS.items():
+        try:
+            best = min(run_once(code)[0] for _ in range(args.repeat))
+        except RuntimeError as e:
+            print(f"{name:32s} ошибка: {e}")
+            continue
+        results[name] = best
+        print(f"{name:32s} {best:.3f} сек (без интерпретатора {best - baseline:.3f})")
+
+    _, importtime_output = run_once(SCENARIOS['import news_parse'], importtime=True)
+    print("\nСамые тяжелые импорты news_parse (кумулятивно):")
+    for us, name in heaviest_imports(importtime_output):
+        print(f"  {us / 1e6:7.3f} сек  {name}")
+
+    if args.max_seconds is not None and results.get('import news_parse', float('inf')) - baseline > args.max_seconds:
+        print(f"\nСтарт news_parse дольше {args.max_seconds} сек")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
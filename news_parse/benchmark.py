@@ -0,0 +1,120 @@
+"""
+Бенчмарк пайплайна на офлайн корпусе (corpus.py).
+
+Прогоняет fetch_with_selenium в режиме replay по всем записанным окнам и
+считает статьи/сек, задержки этапов (p50/p95 из metrics) и точность даты
+со страницы относительно даты GNews. Сравнивает результат с сохраненной
+базой и завершается с кодом 1, если что-то просело больше допуска.
+
+    python benchmark.py dec2025 --update-baseline   # зафиксировать базу
+    python benchmark.py dec2025                     # проверить регрессии
+"""
+import argparse, json, sys, time
+from pathlib import Path
+
+from corpus import Corpus
+from domain_health import DomainHealth
+from domain_profiles import DomainProfiles
+from metrics import metrics
+from relevance_gate import RelevanceGate
+import news_parse
+
+BASE_DIR = Path(__file__).parent
+
+THROUGHPUT_TOLERANCE = 0.2   # допустимое падение статей/сек, доля
+LATENCY_TOLERANCE = 0.3      # допустимый рост p95 этапа, доля
+LATENCY_FLOOR = 0.005        # рост меньше 5 мс не считаем - это шум таймера
+ACCURACY_TOLERANCE = 0.01    # допустимое падение точности даты, абсолютное
+
+
+def date_accuracy(df):
+    """
+    Доли perfect / partial / none по date_source (article.py) и доля дат,
+    совпавших с GNews с точностью до суток. Дата из ленты считается perfect.
+    """
+    import pandas as pd
+    from article import FOUND_SOURCES
+    if df.empty:
+        return {'perfect': 0.0, 'partial': 0.0, 'none': 0.0, 'within_1d': 0.0}
+    n = len(df)
+    found = df['date_source'].isin(FOUND_SOURCES)
+    perfect = df['date_source'].isin(['page', 'feed']).sum()
+    partial = (df['date_source'] == 'page_partial').sum()
+    delta = (df['published_at'] - df['gnews_date']).abs()
+    matched = (found & (delta <= pd.Timedelta(days=1))).sum()
+    return {'perfect': float(perfect / n), 'partial': float(partial / n), 'none': float((n - perfect - partial) / n),
+            'within_1d': float(matched / n)}
+
+
+def run_benchmark(corpus_name):
+    """
+    Прогон воспроизводим: фильтр релевантности только размечает (shadow), а здоровье
+    доменов и профили дат - чистые экземпляры в памяти, не сохраненные с прошлых прогонов.
+    """
+    corpus = Corpus(corpus_name, mode='replay')
+    gate = RelevanceGate(mode='shadow')
+    health = DomainHealth(path=None)
+    profiles = DomainProfiles(path=None)
+    metrics.reset()
+    frames = []
+    started = time.perf_counter()
+    # запросы одного окна (несколько тикеров) прогоняем вместе, как в main
+    windows = {}
+    for keyword, start_date, end_date in corpus.windows():
+        windows.setdefault((start_date, end_date), []).append(keyword)
+    for (start_date, end_date), keywords in windows.items():
+        df, _ = news_parse.fetch_with_selenium(keywords, start_date, end_date, corpus, gate=gate,
+                                                health=health, profiles=profiles)
+        frames.append(df)
+    elapsed = time.perf_counter() - started
+
+    import pandas as pd
+    df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    return {
+        'corpus': corpus_name,
+        'articles': len(df),
+        'seconds': round(elapsed, 3),
+        'articles_per_sec': round(len(df) / elapsed, 3) if elapsed else 0.0,
+        'stages': metrics.stage_totals(),
+        'date_accuracy': date_accuracy(df),
+    }
+
+
+def find_regressions(result, baseline):
+    problems = []
+    if result['articles_per_sec'] < baseline['articles_per_sec'] * (1 - THROUGHPUT_TOLERANCE):
+        problems.append(f"статей/сек: {result['articles_per_sec']} < {baseline['articles_per_sec']}")
+    for stage, stats in baseline['stages'].items():
+        current = result['stages'].get(stage)
+        if current and stats['p95'] and current['p95'] and current['p95'] > stats['p95'] * (1 + LATENCY_TOLERANCE) + LATENCY_FLOOR:
+            problems.append(f"p95 {stage}: {current['p95']:.4f}s > {stats['p95']:.4f}s")
+    for key in ('perfect', 'within_1d'):
+        if result['date_accuracy'][key] < baseline['date_accuracy'][key] - ACCURACY_TOLERANCE:
+            problems.append(f"точность даты {key}: {result['date_accuracy'][key]:.3f} < {baseline['date_accuracy'][key]:.3f}")
+    return problems
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Офлайн бенчмарк пайплайна")
+    arg_parser.add_argument('corpus')
+    arg_parser.add_argument('--baseline', default=None, help="по умолчанию corpus/<name>/baseline.json")
+    arg_parser.add_argument('--update-baseline', action='store_true')
+    args = arg_parser.parse_args()
+
+    result = run_benchmark(args.corpus)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+    baseline_path = Path(args.baseline) if args.baseline else BASE_DIR / 'corpus' / args.corpus / 'baseline.json'
+    if args.update_baseline or not baseline_path.exists():
+        baseline_path.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding='utf-8')
+        print(f"База сохранена: {baseline_path}")
+        return
+
+    problems = find_regressions(result, json.loads(baseline_path.read_text(encoding='utf-8')))
+    if problems:
+        print("РЕГРЕССИЯ:\n  " + "\n  ".join(problems))
+        sys.exit(1)
+    print("Регрессий нет")
+
+if __name__ == "__main__":
+    main()
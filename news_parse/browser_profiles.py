@@ -0,0 +1,115 @@
+"""
+Профили блокировки ресурсов для selenium / undetected_chromedriver.
+
+Блокировка идет через Chrome DevTools Protocol (Network.setBlockedURLs):
+по типам ресурсов (картинки, шрифты, видео - по расширениям в URL) и по
+спискам рекламных / аналитических доменов. Текст статьи и разметка даты
+лежат в DOM, поэтому скрипты самих сайтов и html не блокируются.
+
+Учет по странице берется из performance лога Chrome: сколько запросов
+ушло, сколько заблокировано, сколько байт скачано и примерно сэкономлено.
+"""
+import json
+
+# рекламные сети, счетчики и виджеты, которые встречаются на русских новостных сайтах
+AD_DOMAINS = [
+    'doubleclick.net', 'googlesyndication.com', 'googleadservices.com', 'google-analytics.com',
+    'googletagmanager.com', 'googletagservices.com', 'mc.yandex.ru', 'an.yandex.ru',
+    'yandex.ru/ads', 'yastatic.net/pcode', 'adfox.ru', 'adriver.ru', 'begun.ru', 'adhigh.net',
+    'top-fwz1.mail.ru', 'ad.mail.ru', 'r.mradx.net', 'counter.yadro.ru', 'liveinternet.ru',
+    'tns-counter.ru', 'mediametrics.ru', 'smi2.ru', 'smi2.net', '24smi.org', '24smi.info',
+    'relap.io', 'lentainform.com', 'mgid.com', 'adsbygoogle', 'vk.com/rtrg', 'top100.ru',
+    'scorecardresearch.com', 'facebook.net', 'connect.facebook.net', 'criteo.com', 'criteo.net',
+    'sape.ru', 'directadvert.ru', 'marketgid.com', 'tgtrack.ru', 'ssp.rambler.ru', 'kraken.rambler.ru',
+]
+
+RESOURCE_PATTERNS = {
+    'image': ['.jpg', '.jpeg', '.png', '.gif', '.webp', '.avif', '.svg', '.ico', '.bmp'],
+    'font': ['.woff', '.woff2', '.ttf', '.otf', '.eot'],
+    'media': ['.mp4', '.webm', '.m3u8', '.mp3', '.ogg', '.mov'],
+}
+
+# средний размер заблокированного ресурса по типу из Network.requestWillBeSent, байты.
+# Реальный размер заблокированного запроса неизвестен - это грубая оценка экономии
+AVG_RESOURCE_BYTES = {
+    'Image': 40_000, 'Font': 35_000, 'Media': 400_000, 'Script': 45_000,
+    'XHR': 5_000, 'Fetch': 5_000, 'Stylesheet': 20_000, 'Other': 5_000,
+}
+
+PROFILES = {
+    # как было: ждем всю страницу, ничего не режем
+    'none': {'resource_types': [], 'ad_domains': False, 'page_load_strategy': 'normal', 'accounting': False},
+    # только реклама и счетчики
+    'ads': {'resource_types': [], 'ad_domains': True, 'page_load_strategy': 'eager', 'accounting': True},
+    # по умолчанию: реклама + картинки, шрифты, видео
+    'light': {'resource_types': ['image', 'font', 'media'], 'ad_domains': True, 'page_load_strategy': 'eager', 'accounting': True},
+}
+
+DEFAULT_PROFILE = 'light'
+
+
+def get_profile(name):
+    if name not in PROFILES:
+        raise ValueError(f"Неизвестный профиль блокировки: {name}. Доступны: {', '.join(PROFILES)}")
+    return PROFILES[name]
+
+
+def blocked_patterns(profile):
+    """Список URL паттернов для Network.setBlockedURLs."""
+    patterns = []
+    for resource_type in profile['resource_types']:
+        patterns += [f'*{ext}*' for ext in RESOURCE_PATTERNS[resource_type]]
+    if profile['ad_domains']:
+        patterns += [f'*{domain}*' for domain in AD_DOMAINS]
+    return patterns
+
+
+def configure_options(options, profile_name=DEFAULT_PROFILE):
+    """Стратегия загрузки и performance лог для опций Chrome (до запуска драйвера)."""
+    profile = get_profile(profile_name)
+    options.page_load_strategy = profile['page_load_strategy']
+    if profile['accounting']:
+        options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+    return options
+
+
+def apply_blocking(driver, profile_name=DEFAULT_PROFILE):
+    """Включает блокировку в уже запущенном драйвере через CDP."""
+    patterns = blocked_patterns(get_profile(profile_name))
+    if not patterns:
+        return
+    driver.execute_cdp_cmd('Network.enable', {})
+    driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patterns})
+
+
+def drain_performance_log(driver):
+    try:
+        return driver.get_log('performance')
+    except Exception:
+        return []
+
+
+def page_accounting(driver):
+    """
+    Разбор performance лога с момента прошлого вызова.
+    Возвращает {'requests', 'blocked', 'bytes_loaded', 'bytes_saved_est'}.
+    """
+    types = {}
+    stats = {'requests': 0, 'blocked': 0, 'bytes_loaded': 0, 'bytes_saved_est': 0}
+    for entry in drain_performance_log(driver):
+        try:
+            message = json.loads(entry['message'])['message']
+        except (KeyError, ValueError):
+            continue
+        method = message.get('method')
+        params = message.get('params', {})
+        if method == 'Network.requestWillBeSent':
+            stats['requests'] += 1
+            types[params.get('requestId')] = params.get('type', 'Other')
+        elif method == 'Network.loadingFinished':
+            stats['bytes_loaded'] += int(params.get('encodedDataLength', 0))
+        elif method == 'Network.loadingFailed' and params.get('blockedReason'):
+            stats['blocked'] += 1
+            resource_type = types.get(params.get('requestId'), 'Other')
+            stats['bytes_saved_est'] += AVG_RESOURCE_BYTES.get(resource_type, AVG_RESOURCE_BYTES['Other'])
+    return stats
@@ -0,0 +1,413 @@
+"""
+Признаки свечей для многих тикеров сразу.
+
+В ноутбуке z-score считается по одной серии SBER:
+
+    candle_change = close - open
+    z-score = (candle_change - rolling('1D').mean()) / rolling('1D').std()
+
+Окно '1D' по часам захватывает ночь и выходные: в понедельник утром в окне
+лежат бары пятничного вечера, а после праздников окно почти пустое. Здесь:
+
+  - свечи всех тикеров лежат одним блоком (Bars): массивы time / open / high /
+    low / close / volume по всем барам подряд, тикер за тикером, offsets -
+    границы тикеров. Скользящие суммы считаются накопленными суммами по всему
+    блоку сразу, без цикла по тикерам и без pandas rolling;
+  - окно window='session' - последние торговые сутки в барах: бары вне сессий
+    MOEX (SESSIONS) отбрасываются, а окно считается числом баров торгового дня,
+    так что ночь и выходные его не растягивают. window='time' - окно по часам,
+    как в ноутбуке (для сверки);
+  - признаки: ret (лог доходность), rv (realized volatility по внутридневным
+    доходностям окна, без гэпа открытия сессии), candle_change, change_mean /
+    change_std / z_score, volume_surprise (объем к среднему объему окна);
+  - FeatureEngine.update(новые бары) считает признаки только новых баров по
+    хвосту окна каждого тикера.
+
+    python candles.py bench --tickers 50 --days 250      # синтетика: скорость и сверка с pandas
+    python candles.py features SBER GAZP --start 2025-11-01 --end 2025-12-01 --out features.pkl
+"""
+import argparse, time
+
+import numpy as np
+
+# сессии акций MOEX по будням, МСК: [начало, конец) в минутах от полуночи - утренняя
+# (с 2025 года, вместе с аукционом открытия 6:50), основная и вечерняя. Аукцион открытия
+# основной сессии 9:50-10:00 и перерывы между сессиями в окно не попадают
+SESSIONS = ((6 * 60 + 50, 9 * 60 + 50), (10 * 60, 18 * 60 + 40), (19 * 60 + 5, 23 * 60 + 50))
+PERIOD_MINUTES = {'1min': 1, '5min': 5, '10min': 10, '15min': 15, '30min': 30, '1h': 60}
+DAY_NS = 86_400 * 10**9
+MINUTE_NS = 60 * 10**9
+MIN_PERIODS = 2             # как у pandas rolling по времени для std
+
+
+class Bars:
+    """
+    Свечи многих тикеров одним блоком. Бары отсортированы по (тикер, время),
+    бары тикера i - строки offsets[i]:offsets[i + 1]. time - int64 нс, МСК без пояса
+    (как отдает moexalgo).
+    """
+    FIELDS = ('time', 'open', 'high', 'low', 'close', 'volume')
+
+    def __init__(self, tickers, offsets, time, open, high, low, close, volume):
+        self.tickers = list(tickers)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.time = np.asarray(time, dtype=np.int64)
+        self.open = np.asarray(open, dtype=np.float64)
+        self.high = np.asarray(high, dtype=np.float64)
+        self.low = np.asarray(low, dtype=np.float64)
+        self.close = np.asarray(close, dtype=np.float64)
+        self.volume = np.asarray(volume, dtype=np.float64)
+
+    def __len__(self):
+        return len(self.time)
+
+    @classmethod
+    def from_frame(cls, df, time='end'):
+        """Длинная таблица свечей (ticker, end, open, high, low, close, volume) -> Bars."""
+        import pandas as pd
+        times = pd.to_datetime(df[time])
+        if times.dt.tz is not None:
+            times = times.dt.tz_convert('Europe/Moscow').dt.tz_localize(None)
+        times = times.to_numpy('datetime64[ns]').astype(np.int64)
+        codes, tickers = pd.factorize(df['ticker'], sort=True)
+        order = np.lexsort((times, codes))   # устойчивая: из повторов (тикер, время) последний - последний
+        codes, times = codes[order], times[order]
+        last = np.r_[(codes[1:] != codes[:-1]) | (times[1:] != times[:-1]), True]
+        order, codes = order[last], codes[last]
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=len(tickers)))])
+        return cls(tickers, offsets, times[last], *(df[c].to_numpy(np.float64)[order]
+                                                     for c in ('open', 'high', 'low', 'close', 'volume')))
+
+    def to_frame(self):
+        import pandas as pd
+        return pd.DataFrame({
+            'ticker': pd.Categorical.from_codes(np.repeat(np.arange(len(self.tickers)), np.diff(self.offsets)),
+                                                self.tickers),
+            'end': self.time.astype('datetime64[ns]'),
+            **{field: getattr(self, field) for field in self.FIELDS[1:]},
+        })
+
+    def select(self, mask):
+        """Бары, где mask, с пересчетом offsets (тикеры без баров остаются пустыми)."""
+        kept = np.concatenate([[0], np.cumsum(mask)])
+        return Bars(self.tickers, kept[self.offsets], *(getattr(self, f)[mask] for f in self.FIELDS))
+
+    def segment_starts(self):
+        """Для каждой строки - первая строка ее тикера."""
+        return np.repeat(self.offsets[:-1], np.diff(self.offsets))
+
+
+def session_index(time_ns, sessions=SESSIONS):
+    """Номер сессии бара в SESSIONS или -1, если бар вне сессий."""
+    minute = (time_ns // MINUTE_NS) % 1440
+    index = np.full(len(time_ns), -1, dtype=np.int64)
+    for i, (start, end) in enumerate(sessions):
+        index[(minute >= start) & (minute < end)] = i
+    return index
+
+
+def count_window_starts(starts, window):
+    """Начало окна из window последних баров тикера."""
+    return np.maximum(np.arange(len(starts)) - window + 1, starts)
+
+
+def time_window_starts(bars, width_ns):
+    """Начало окна (t - width, t] по времени, как rolling('1D') в pandas."""
+    lo = np.empty(len(bars), dtype=np.int64)
+    for start, end in zip(bars.offsets[:-1], bars.offsets[1:]):
+        t = bars.time[start:end]
+        lo[start:end] = start + np.searchsorted(t, t - width_ns, 'right')
+    return lo
+
+
+def window_sum(values, lo):
+    """Суммы values в окнах [lo[i], i] - разность накопленных сумм, по всему блоку сразу."""
+    cs = np.empty(len(values) + 1)
+    cs[0] = 0.0
+    np.cumsum(values, out=cs[1:])
+    return cs[1:] - cs[lo]
+
+
+def rolling_moments(x, lo, n, starts):
+    """
+    Среднее и std (ddof=1) x в окнах [lo[i], i] из n значений; x - без пропусков (свечи).
+    Значения центрируются первым значением тикера, чтобы разность накопленных
+    квадратов не теряла точность.
+    """
+    center = x[starts]
+    centered = x - center
+    s = window_sum(centered, lo)
+    np.multiply(centered, centered, out=centered)
+    ss = window_sum(centered, lo)
+    mean = s / n
+    ss -= s * mean
+    np.maximum(ss, 0.0, out=ss)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        std = np.sqrt(ss / (n - 1))
+    mean += center
+    return mean, std
+
+
+class FeatureEngine:
+    """
+    Признаки свечей по блоку Bars.
+
+    window='session' - окно из days торговых дней в барах (бары вне сессий отбрасываются),
+    window='time' - окно days суток по часам, как rolling('1D') в ноутбуке.
+    """
+    def __init__(self, period='1min', window='session', days=1, sessions=SESSIONS, min_periods=MIN_PERIODS):
+        if window not in ('session', 'time'):
+            raise ValueError(f"Неизвестное окно: {window}")
+        self.period = period
+        self.window = window
+        self.days = days
+        self.sessions = sessions
+        self.min_periods = min_periods
+        session_minutes = sum(end - start for start, end in sessions)
+        self.window_bars = days * session_minutes // PERIOD_MINUTES[period]
+        self.tail = None
+
+    def prepare(self, bars):
+        """Для окна по сессиям - только бары внутри сессий."""
+        if self.window == 'session':
+            return bars.select(session_index(bars.time, self.sessions) >= 0)
+        return bars
+
+    def window_starts(self, bars):
+        if self.window == 'session':
+            return count_window_starts(bars.segment_starts(), self.window_bars)
+        return time_window_starts(bars, self.days * DAY_NS)
+
+    def features(self, bars, lo):
+        """Признаки для всех строк bars (уже после prepare) по началам окон lo - словарь массивов той же длины."""
+        starts = bars.segment_starts()
+        row = np.arange(len(bars))
+        first = row == starts
+        n = (row + 1 - lo).astype(np.float64)   # баров в окне
+
+        # открытие сессии: первый бар тикера или другая сессия / день, чем у предыдущего бара
+        session_key = (bars.time // DAY_NS) * 8 + session_index(bars.time, self.sessions)
+        session_open = first | np.r_[True, session_key[1:] != session_key[:-1]]
+
+        prev_close = np.r_[np.nan, bars.close[:-1]]
+        prev_close[first] = np.nan
+        with np.errstate(invalid='ignore', divide='ignore'):
+            ret = np.log(bars.close / prev_close)
+        intraday = ~session_open                        # гэп открытия в волатильность не идет
+        n_ret = window_sum(intraday, lo)
+        with np.errstate(invalid='ignore'):
+            rv = np.where(n_ret > 0, np.sqrt(window_sum(np.where(intraday, ret * ret, 0.0), lo)), np.nan)
+
+        change = bars.close - bars.open
+        change_mean, change_std = rolling_moments(change, lo, n, starts)
+        change_std[n < max(self.min_periods, 2)] = np.nan
+        volume_mean = window_sum(bars.volume, lo) / n
+        with np.errstate(invalid='ignore', divide='ignore'):
+            z_score = (change - change_mean) / change_std
+            volume_surprise = bars.volume / volume_mean
+        return {
+            'ret': ret,
+            'session_open': session_open,
+            'rv': rv,
+            'candle_change': change,
+            'change_mean': change_mean,
+            'change_std': change_std,
+            'z_score': z_score,
+            'volume_surprise': volume_surprise,
+        }
+
+    def compute(self, bars):
+        """Полный пересчет: таблица баров с признаками (для window='session' - только бары сессий). Обновляет хвосты для update."""
+        bars = self.prepare(bars)
+        lo = self.window_starts(bars)
+        features = self.features(bars, lo)
+        self.tail = self._tail(bars, lo)
+        return _frame(bars, features)
+
+    def update(self, frame, time='end'):
+        """
+        Новые бары (длинная таблица, как для Bars.from_frame) -> признаки только для них.
+        Бары приходят по времени; бары хвоста не раньше первого нового бара тикера
+        заменяются новыми (свеча дозакрылась).
+        """
+        import pandas as pd
+        new = self.prepare(Bars.from_frame(frame, time)).to_frame()
+        tail = self.tail.to_frame() if self.tail is not None else new.iloc[:0]
+        first_new = new.groupby('ticker', observed=True)['end'].min()
+        tail = tail[~(tail['end'] >= tail['ticker'].astype(str).map(first_new))]
+        bars = Bars.from_frame(pd.concat([tail, new], ignore_index=True))
+        # у каждого тикера сначала строки хвоста, затем новые
+        tail_counts = tail['ticker'].astype(str).value_counts()
+        position = np.arange(len(bars)) - bars.segment_starts()
+        is_new = position >= np.repeat([tail_counts.get(t, 0) for t in bars.tickers], np.diff(bars.offsets))
+        lo = self.window_starts(bars)
+        features = self.features(bars, lo)
+        self.tail = self._tail(bars, lo)
+        selected = bars.select(is_new)
+        return _frame(selected, {name: values[is_new] for name, values in features.items()})
+
+    def _tail(self, bars, lo):
+        """Последние бары каждого тикера, которых хватает на окно следующего бара (и на его доходность)."""
+        if not len(bars):
+            return bars
+        keep = np.zeros(len(bars), dtype=bool)
+        for start, end in zip(bars.offsets[:-1], bars.offsets[1:]):
+            if end > start:
+                keep[max(lo[end - 1] - 1, start):end] = True
+        return bars.select(keep)
+
+
+def _frame(bars, features):
+    df = bars.to_frame()
+    for name, values in features.items():
+        df[name] = values
+    return df
+
+
+def pandas_reference(candles):
+    """z-score одного тикера ровно как в ноутбуке: candles с колонкой end, окно rolling('1D')."""
+    import pandas as pd
+    candles = candles.copy()
+    candles['end'] = pd.to_datetime(candles['end'])
+    candles = candles.set_index('end')
+    candles['candle_change'] = candles['close'] - candles['open']
+    candles['mean'] = candles['candle_change'].rolling(window='1D').mean()
+    candles['std'] = candles['candle_change'].rolling(window='1D').std()
+    candles['z-score'] = (candles['candle_change'] - candles['mean']) / candles['std']
+    return candles
+
+
+def verify(frame, engine=None):
+    """
+    Сверка с pandas по каждому тикеру: window='time' - с ячейкой ноутбука (pandas_reference),
+    window='session' - с pandas rolling(window_bars) по барам внутри сессий.
+    Возвращает максимальные абсолютные расхождения mean / std / z-score.
+    """
+    import pandas as pd
+    engine = engine or FeatureEngine(window='time')
+    ours = FeatureEngine(engine.period, engine.window, engine.days, engine.sessions, engine.min_periods)
+    result = ours.compute(Bars.from_frame(frame))
+    diffs = {'mean': 0.0, 'std': 0.0, 'z': 0.0}
+    for ticker, group in result.groupby('ticker', sort=False):
+        group = group.reset_index(drop=True)
+        if engine.window == 'time':
+            reference = pandas_reference(group[['end', 'open', 'close']]).reset_index()
+        else:
+            reference = group[['end', 'open', 'close']].copy()
+            rolling = (reference['close'] - reference['open']).rolling(ours.window_bars, min_periods=1)
+            reference['mean'] = rolling.mean()
+            reference['std'] = rolling.std().where(rolling.count() >= ours.min_periods)
+            reference['z-score'] = ((reference['close'] - reference['open']) - reference['mean']) / reference['std']
+        for key, ours_col, ref_col in (('mean', 'change_mean', 'mean'), ('std', 'change_std', 'std'),
+                                       ('z', 'z_score', 'z-score')):
+            a, b = group[ours_col].to_numpy(), reference[ref_col].to_numpy()
+            finite = np.isfinite(a) & np.isfinite(b)
+            if not np.array_equal(np.isfinite(a), np.isfinite(b)):
+                raise AssertionError(f"{ticker}: разные пропуски в {key}")
+            if finite.any():
+                diffs[key] = max(diffs[key], float(np.max(np.abs(a[finite] - b[finite]))))
+    return diffs
+
+
+def authorize():
+    """Вход в moexalgo по USERNAME / PASSWORD из .env, как в ноутбуке."""
+    import os
+    from dotenv import load_dotenv
+    from moexalgo import session
+    load_dotenv()
+    if os.getenv('USERNAME') and os.getenv('PASSWORD'):
+        session.authorize(os.getenv('USERNAME'), os.getenv('PASSWORD'))
+
+
+def load_bars(tickers, start, end, period='1min'):
+    """Свечи moexalgo нескольких тикеров -> Bars."""
+    import pandas as pd
+    from moexalgo import Ticker
+    authorize()
+    frames = []
+    for ticker in tickers:
+        candles = pd.DataFrame(Ticker(ticker).candles(start=start, end=end, period=period))
+        frames.append(candles.assign(ticker=ticker))
+    return Bars.from_frame(pd.concat(frames, ignore_index=True))
+
+
+def synthetic_frame(tickers=50, days=250, period='1min', seed=0):
+    """Свечи случайного блуждания по будням в часы SESSIONS (и немного ночных баров вне сессий) - для bench."""
+    import pandas as pd
+    rng = np.random.default_rng(seed)
+    step = PERIOD_MINUTES[period]
+    minutes = np.concatenate([np.arange(start, end, step) for start, end in SESSIONS] + [np.arange(0, 2 * 60, 30)])
+    dates = pd.bdate_range('2025-01-01', periods=days).to_numpy('datetime64[ns]').astype(np.int64)
+    ends = np.sort((dates[:, None] + (minutes[None, :] + step) * MINUTE_NS - 10**9).ravel())
+    frames = []
+    for i in range(tickers):
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 1e-3, len(ends))))
+        open_ = close * np.exp(rng.normal(0, 5e-4, len(ends)))
+        frames.append(pd.DataFrame({
+            'ticker': f"T{i:03d}", 'end': ends.astype('datetime64[ns]'), 'open': open_, 'close': close,
+            'high': np.maximum(open_, close), 'low': np.minimum(open_, close),
+            'volume': rng.lognormal(8, 1, len(ends)),
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def bench(tickers=50, days=250, period='1min', chunks=5):
+    import pandas as pd
+    frame = synthetic_frame(tickers, days, period)
+    bars = Bars.from_frame(frame)
+    print(f"Баров: {len(bars):,} ({tickers} тикеров x {days} дней, {period})")
+    for window in ('time', 'session'):
+        engine = FeatureEngine(period, window)
+        started = time.perf_counter()
+        engine.compute(bars)
+        print(f"  window={window}: {time.perf_counter() - started:.2f} сек")
+
+    started = time.perf_counter()
+    for _, group in frame.groupby('ticker'):
+        pandas_reference(group)
+    print(f"  pandas rolling('1D') по тикерам: {time.perf_counter() - started:.2f} сек")
+
+    sample = frame[frame['ticker'].isin(frame['ticker'].unique()[:5])]
+    for window in ('time', 'session'):
+        print(f"  сверка с pandas, window={window}: {verify(sample, FeatureEngine(period, window))}")
+
+    # update по частям == полный пересчет
+    engine = FeatureEngine(period)
+    full = FeatureEngine(period).compute(Bars.from_frame(sample))
+    ends = np.sort(sample['end'].unique())
+    parts = [engine.update(sample[sample['end'].isin(part)]) for part in np.array_split(ends, chunks)]
+    updated = pd.concat(parts).sort_values(['ticker', 'end']).reset_index(drop=True)
+    diff = np.nanmax(np.abs(updated['z_score'].to_numpy() - full['z_score'].to_numpy()))
+    print(f"  update частями ({chunks}) против полного пересчета: строк {len(updated)} / {len(full)}, "
+          f"max |dz| = {diff:.2e}")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Признаки свечей по многим тикерам с окнами по сессиям MOEX")
+    commands = arg_parser.add_subparsers(dest='command', required=True)
+    bench_parser = commands.add_parser('bench', help="скорость и сверка с pandas на синтетике")
+    bench_parser.add_argument('--tickers', type=int, default=50)
+    bench_parser.add_argument('--days', type=int, default=250)
+    bench_parser.add_argument('--period', choices=list(PERIOD_MINUTES), default='1min')
+    features_parser = commands.add_parser('features', help="признаки по свечам moexalgo")
+    features_parser.add_argument('tickers', nargs='+')
+    features_parser.add_argument('--start', required=True)
+    features_parser.add_argument('--end', required=True)
+    features_parser.add_argument('--period', choices=list(PERIOD_MINUTES), default='1min')
+    features_parser.add_argument('--window', choices=['session', 'time'], default='session')
+    features_parser.add_argument('--out', default='candle_features.pkl', help=".pkl или .csv")
+    args = arg_parser.parse_args()
+
+    if args.command == 'bench':
+        bench(args.tickers, args.days, args.period)
+        return
+    bars = load_bars(args.tickers, args.start, args.end, args.period)
+    df = FeatureEngine(args.period, args.window).compute(bars)
+    if args.out.endswith('.csv'):
+        df.to_csv(args.out, index=False, encoding='utf-8-sig')
+    else:
+        df.to_pickle(args.out)
+    print(f"Баров: {len(df)}, тикеров: {df['ticker'].nunique()} -> {args.out}")
+
+if __name__ == "__main__":
+    main()
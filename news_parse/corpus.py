@@ -0,0 +1,138 @@
+"""
+Офлайн корпус страниц: запись во время скрапинга и воспроизведение без сети.
+
+Структура корпуса corpus/<name>/:
+    searches.jsonl   - выдача GNews по (keyword, start, end)
+    pages.jsonl      - по одной записи на статью: ссылка GNews, раскрытый URL,
+                       итоговый URL, исход загрузки, файл с html
+    pages/<sha1>.html.gz - сжатый html страницы
+
+Запись: fetch_with_selenium(..., corpus=Corpus('dec2025', mode='record'))
+Воспроизведение: fetch_with_selenium(..., corpus=Corpus('dec2025', mode='replay')) -
+GNews, gnewsdecoder и браузер подменяются данными корпуса (ReplayDriver).
+"""
+import gzip, hashlib, json, threading
+from datetime import datetime
+from pathlib import Path
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+from static_page import StaticPage
+
+BASE_DIR = Path(__file__).parent
+CORPUS_DIR = BASE_DIR / 'corpus'
+
+
+def url_key(url):
+    return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+
+def _search_key(keyword, start_date, end_date):
+    return f"{keyword}|{start_date:%Y-%m-%d}|{end_date:%Y-%m-%d}"
+
+
+class Corpus:
+    def __init__(self, name, mode='replay', root=CORPUS_DIR):
+        if mode not in ('record', 'replay'):
+            raise ValueError(f"Неизвестный режим корпуса: {mode}")
+        self.name = name
+        self.mode = mode
+        self.path = Path(root) / name
+        self.pages_dir = self.path / 'pages'
+        self._lock = threading.Lock()
+        self.searches = {}
+        self.pages = {}     # ссылка GNews -> запись
+        self.by_url = {}    # раскрытый URL -> запись
+        if mode == 'record':
+            self.pages_dir.mkdir(parents=True, exist_ok=True)
+        elif not self.path.exists():
+            raise FileNotFoundError(f"Корпус {self.path} не найден")
+        self._load()
+
+    def _load(self):
+        searches_file = self.path / 'searches.jsonl'
+        if searches_file.exists():
+            for line in searches_file.read_text(encoding='utf-8').splitlines():
+                rec = json.loads(line)
+                self.searches[rec['key']] = rec['results']
+        pages_file = self.path / 'pages.jsonl'
+        if pages_file.exists():
+            for line in pages_file.read_text(encoding='utf-8').splitlines():
+                self._index(json.loads(line))
+
+    def _index(self, rec):
+        self.pages[rec['url']] = rec
+        self.by_url[rec['decoded_url']] = rec
+
+    def _append(self, file_name, rec):
+        with self._lock, open(self.path / file_name, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(rec, ensure_ascii=False, default=str) + '\n')
+
+    # --- запись ---
+    def record_search(self, keyword, start_date, end_date, results):
+        key = _search_key(keyword, start_date, end_date)
+        self.searches[key] = results
+        self._append('searches.jsonl', {'key': key, 'keyword': keyword, 'start': start_date, 'end': end_date, 'results': results})
+
+    def record_page(self, url, decoded_url, final_url, html, seconds=None):
+        html_file = f"{url_key(decoded_url)}.html.gz"
+        with gzip.open(self.pages_dir / html_file, 'wt', encoding='utf-8') as f:
+            f.write(html)
+        rec = {'url': url, 'decoded_url': decoded_url, 'final_url': final_url, 'outcome': 'ok',
+               'html_file': html_file, 'fetch_seconds': seconds, 'fetched_at': datetime.now().isoformat()}
+        self._index(rec)
+        self._append('pages.jsonl', rec)
+
+    def record_error(self, url, decoded_url, exc):
+        rec = {'url': url, 'decoded_url': decoded_url, 'final_url': None, 'outcome': 'error',
+               'error_type': type(exc).__name__, 'error_message': str(exc)[:500],
+               'fetched_at': datetime.now().isoformat()}
+        self._index(rec)
+        self._append('pages.jsonl', rec)
+
+    def record_skip(self, url, decoded_url):
+        """Статья отброшена до загрузки (excluded_domains) - храним только раскрытый URL."""
+        rec = {'url': url, 'decoded_url': decoded_url, 'final_url': None, 'outcome': 'skipped'}
+        self._index(rec)
+        self._append('pages.jsonl', rec)
+
+    # --- воспроизведение ---
+    def search(self, keyword, start_date, end_date):
+        return self.searches.get(_search_key(keyword, start_date, end_date), [])
+
+    def decode(self, url):
+        rec = self.pages.get(url)
+        return rec['decoded_url'] if rec else url
+
+    def html(self, decoded_url):
+        """html страницы из корпуса или None, если страница не сохранялась."""
+        rec = self.by_url.get(decoded_url)
+        if not rec or not rec.get('html_file'):
+            return None
+        with gzip.open(self.pages_dir / rec['html_file'], 'rt', encoding='utf-8') as f:
+            return f.read()
+
+    def windows(self):
+        """Все записанные запросы как (keyword, start, end)."""
+        result = []
+        for key in self.searches:
+            keyword, start, end = key.split('|')
+            result.append((keyword, datetime.strptime(start, '%Y-%m-%d'), datetime.strptime(end, '%Y-%m-%d')))
+        return result
+
+
+class ReplayDriver(StaticPage):
+    """Подмена браузера: get() отдает страницу из корпуса или повторяет записанную ошибку."""
+    def __init__(self, corpus):
+        super().__init__('')
+        self.corpus = corpus
+
+    def get(self, url):
+        rec = self.corpus.by_url.get(url)
+        if rec is None:
+            raise WebDriverException(f"Страница отсутствует в корпусе: {url}")
+        if rec['outcome'] != 'ok':
+            if rec.get('error_type') == 'TimeoutException':
+                raise TimeoutException(rec.get('error_message'))
+            raise WebDriverException(rec.get('error_message'))
+        super().__init__(self.corpus.html(url), rec.get('final_url') or url)
@@ -0,0 +1,555 @@
+"""
+Расчет индикатора как граф этапов вместо ручного порядка ячеек ноутбука.
+
+    scrape -> summarize -> embed -> classify -> sentiment -> weight --\
+                                 \-> dedup ---------------------------> market_join
+                                 \-> cluster -------------------------/
+
+embed - один проход e5-large по summary: по векторам дедупликация и кластеры,
+а classify и sentiment (model='distilled', по умолчанию) - головы distill.py
+поверх тех же векторов. model='teacher' - bart-large-mnli и finbert, как в ноутбуке.
+
+Каждый этап - функция, результат пишется в ARTIFACTS_DIR/<этап>.pkl. Отпечаток
+этапа - sha1 от кода функции, параметров, версий моделей (commit из кэша
+huggingface) и содержимого входов. Если отпечаток совпал с dag_state.json,
+этап пропускается; если этап пересчитан, но результат не изменился, следующие
+этапы тоже не пересчитываются.
+
+Этапы с partitioned=True (classify, sentiment, embed, dedup) считаются по
+дням публикации (колонка day, МСК): у каждого дня свой отпечаток от среза
+входов, и после дозагрузки новостей за один день модели прогоняются только
+по этому дню. Независимые этапы (classify и ветки dedup / cluster) идут
+параллельно в потоках.
+
+    python dag.py status
+    python dag.py run                          # все, что устарело
+    python dag.py run dedup                    # только dedup и то, от чего он зависит
+    python dag.py run --force classify         # пересчитать classify по всем дням
+    python dag.py run --source feeds_news.csv --source сбербанк_3day_news.csv
+    python dag.py run --set dedup.threshold=0.92
+    python dag.py run --set classify.model=teacher --set sentiment.model=teacher
+    python dag.py run --dry-run
+
+umap, hdbscan (cluster) и moexalgo (market_join) импортируются только
+внутри своих этапов; dedup использует faiss, если он установлен.
+"""
+import argparse, hashlib, inspect, json, logging, os, threading, time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from pathlib import Path
+
+from article_store import INDEX_ENCODER
+from distill import HEADS_PATH
+from metrics import metrics
+
+BASE_DIR = Path(__file__).parent
+DATA_DIR = BASE_DIR.parent
+ARTIFACTS_DIR = DATA_DIR / 'artifacts'
+STATE_NAME = 'dag_state.json'
+SOURCES = [str(DATA_DIR / 'сбербанк_3day_news.csv')]
+WORKERS = 2
+
+dag_logger = logging.getLogger('dag')
+
+
+class StageDef:
+    def __init__(self, name, fn, inputs, params, models, files, partitioned):
+        self.name = name
+        self.fn = fn
+        self.inputs = inputs
+        self.params = params
+        self.models = models
+        self.files = files
+        self.partitioned = partitioned
+
+
+STAGES = {}
+
+def stage(inputs=(), params=None, models=(), files=(), partitioned=False):
+    """
+    Регистрирует этап. fn(**входы, **params) -> DataFrame с колонками id и day.
+    models - имена моделей huggingface, files - параметры с путями к внешним файлам
+    (в отпечаток идет их содержимое).
+    """
+    def register(fn):
+        STAGES[fn.__name__] = StageDef(fn.__name__, fn, tuple(inputs), dict(params or {}), tuple(models),
+                                       tuple(files), partitioned)
+        return fn
+    return register
+
+
+# --- отпечатки ---
+def _sha1(data):
+    return hashlib.sha1(data).hexdigest()
+
+
+def _cell(value):
+    if hasattr(value, 'tobytes'):
+        return _sha1(value.tobytes())
+    return repr(value)
+
+
+def frame_hash(df):
+    """
+    Отпечаток содержимого DataFrame без индекса. Объектные колонки (словари тем,
+    векторы) - по repr / байтам значения: pickle зависит от того, какие объекты
+    общие, и давал бы разные отпечатки для одинаковых данных.
+    """
+    import pandas as pd
+    digest = hashlib.sha1()
+    for column in df.columns:
+        values = df[column]
+        if values.dtype == object:
+            values = values.map(_cell)
+        digest.update(f"{column}:{df[column].dtype}".encode('utf-8'))
+        digest.update(pd.util.hash_pandas_object(values, index=False).values.tobytes())
+    return digest.hexdigest()
+
+
+def file_hash(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def model_version(name):
+    """Commit модели в локальном кэше huggingface (refs/main), иначе только имя."""
+    try:
+        from huggingface_hub.constants import HF_HUB_CACHE
+    except ImportError:
+        HF_HUB_CACHE = os.path.expanduser('~/.cache/huggingface/hub')
+    ref = Path(HF_HUB_CACHE) / f"models--{name.replace('/', '--')}" / 'refs' / 'main'
+    return ref.read_text().strip() if ref.exists() else None
+
+
+def _code(fn):
+    """Исходник функции; для функций без файла (ячейка ноутбука, exec) - байткод и константы."""
+    try:
+        return inspect.getsource(fn)
+    except (OSError, TypeError):
+        return _sha1(fn.__code__.co_code + repr(fn.__code__.co_consts).encode('utf-8'))
+
+
+def _definition(spec, params):
+    """Код, параметры и модели этапа - часть отпечатка, не зависящая от входов."""
+    return {
+        'code': _code(spec.fn),
+        'params': params,
+        'models': {name: model_version(name) for name in spec.models},
+        'files': {key: [file_hash(p) if Path(p).exists() else None for p in params[key]] for key in spec.files},
+    }
+
+
+def fingerprint(*parts):
+    return _sha1(json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8'))
+
+
+# --- запуск ---
+class Runner:
+    """
+    Запуск этапов с учетом dag_state.json. params - {этап: {параметр: значение}}
+    поверх значений по умолчанию из stage(...).
+    """
+    def __init__(self, root=ARTIFACTS_DIR, params=None, workers=WORKERS):
+        self.root = Path(root)
+        self.params = params or {}
+        self.workers = workers
+        self.state_path = self.root / STATE_NAME
+        self.state = json.loads(self.state_path.read_text(encoding='utf-8')) if self.state_path.exists() else {}
+        self._lock = threading.Lock()
+
+    def path(self, name, day=None):
+        return self.root / name / f"{day}.pkl" if day else self.root / f"{name}.pkl"
+
+    def load(self, name):
+        import pandas as pd
+        return pd.read_pickle(self.path(name))
+
+    def stage_params(self, spec):
+        return {**spec.params, **self.params.get(spec.name, {})}
+
+    def plan(self, targets=None):
+        """Этапы для targets и их предки, в порядке зависимостей."""
+        order, seen = [], set()
+        def visit(name):
+            if name in seen:
+                return
+            if name not in STAGES:
+                raise KeyError(f"Неизвестный этап: {name}")
+            seen.add(name)
+            for dep in STAGES[name].inputs:
+                visit(dep)
+            order.append(name)
+        for name in targets or STAGES:
+            visit(name)
+        return order
+
+    def stage_key(self, spec):
+        """Отпечаток этапа по определению и отпечаткам выходов входов."""
+        inputs = {dep: self.state.get(dep, {}).get('output') for dep in spec.inputs}
+        return fingerprint(_definition(spec, self.stage_params(spec)), inputs)
+
+    def fresh(self, spec):
+        entry = self.state.get(spec.name)
+        return bool(entry) and entry.get('key') == self.stage_key(spec) and self.path(spec.name).exists()
+
+    def status(self, targets=None):
+        """[(этап, fresh / stale / pending)]: pending - устарел кто-то из входов."""
+        rows, stale = [], set()
+        for name in self.plan(targets):
+            spec = STAGES[name]
+            if any(dep in stale for dep in spec.inputs):
+                stale.add(name)
+                rows.append((name, 'pending'))
+            elif self.fresh(spec):
+                rows.append((name, 'fresh'))
+            else:
+                stale.add(name)
+                rows.append((name, 'stale'))
+        return rows
+
+    def _run_partitioned(self, spec, params, inputs):
+        """Пересчет только дней, у которых изменился срез входов. Возвращает (df, {день: отпечаток}, пересчитано дней)."""
+        import pandas as pd
+        definition = fingerprint(_definition(spec, params))
+        old = self.state.get(spec.name, {}).get('partitions', {})
+        days = sorted(set().union(*(set(df['day']) for df in inputs.values())))
+        partitions, parts, computed = {}, [], 0
+        for day in days:
+            sliced = {dep: df[df['day'] == day] for dep, df in inputs.items()}
+            key = fingerprint(definition, {dep: frame_hash(df) for dep, df in sliced.items()})
+            path = self.path(spec.name, day)
+            if old.get(day) == key and path.exists():
+                part = pd.read_pickle(path)
+            else:
+                with metrics.timer('dag_partition', spec.name):
+                    part = spec.fn(**sliced, **params)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                part.to_pickle(path)
+                computed += 1
+            partitions[day] = key
+            parts.append(part)
+        for day in set(old) - set(partitions):
+            self.path(spec.name, day).unlink(missing_ok=True)
+        result = pd.concat(parts, ignore_index=True) if parts else spec.fn(**inputs, **params)
+        return result, partitions, computed
+
+    def run_stage(self, name):
+        spec = STAGES[name]
+        params = self.stage_params(spec)
+        key = self.stage_key(spec)
+        inputs = {dep: self.load(dep) for dep in spec.inputs}
+        started = time.perf_counter()
+        entry = {'key': key}
+        with metrics.timer('dag_stage', name):
+            if spec.partitioned:
+                df, entry['partitions'], computed = self._run_partitioned(spec, params, inputs)
+                dag_logger.info("%s: пересчитано дней %s из %s", name, computed, len(entry['partitions']))
+            else:
+                df = spec.fn(**inputs, **params)
+        df.to_pickle(self.path(name))
+        output = frame_hash(df)
+        previous = self.state.get(name, {}).get('output')
+        entry.update({
+            'output': output,
+            'rows': len(df),
+            'seconds': round(time.perf_counter() - started, 2),
+            'finished_at': datetime.now(timezone.utc).isoformat(),
+        })
+        with self._lock:
+            self.state[name] = entry
+            self.save()
+        dag_logger.info("%s: %s строк за %.1f сек%s", name, len(df), entry['seconds'],
+                        " (результат не изменился)" if output == previous else "")
+        return entry
+
+    def run(self, targets=None, force=(), dry_run=False):
+        """
+        Пересчитывает устаревшие этапы; независимые - параллельно, до workers сразу.
+        force - этапы, которые пересчитать в любом случае. Возвращает {этап: 'run' / 'skip'}.
+        """
+        self.root.mkdir(parents=True, exist_ok=True)
+        order = self.plan(targets)
+        for name in force:
+            self.state.pop(name, None)
+        if dry_run:
+            return dict(self.status(targets))
+        done, result, running = set(), {}, {}
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            while len(done) < len(order):
+                for name in order:
+                    spec = STAGES[name]
+                    if name in done or name in running or not all(dep in done for dep in spec.inputs):
+                        continue
+                    # входы готовы - отпечаток известен
+                    if self.fresh(spec):
+                        done.add(name)
+                        result[name] = 'skip'
+                        dag_logger.info("%s: без изменений", name)
+                    else:
+                        running[name] = pool.submit(self.run_stage, name)
+                if not running:
+                    continue
+                finished, _ = wait(running.values(), return_when=FIRST_COMPLETED)
+                for name, future in list(running.items()):
+                    if future in finished:
+                        future.result()
+                        del running[name]
+                        done.add(name)
+                        result[name] = 'run'
+        return result
+
+    def save(self):
+        text = json.dumps(self.state, ensure_ascii=False, indent=2)
+        tmp = self.state_path.with_suffix('.tmp')
+        tmp.write_text(text, encoding='utf-8')
+        tmp.replace(self.state_path)
+
+
+# --- этапы ---
+@stage(params={'sources': SOURCES}, files=('sources',))
+def scrape(sources):
+    """Выгрузки скрапера (news_parse.py, feeds.py --fetch): типизированные или старые csv / parquet."""
+    import pandas as pd
+    from article import read_articles, migrate
+    frames = []
+    for path in sources:
+        if str(path).endswith('.parquet') or 'published_at' in pd.read_csv(path, nrows=0).columns:
+            frames.append(read_articles(path))
+        else:
+            frames.append(migrate(pd.read_csv(path)))
+    df = pd.concat(frames, ignore_index=True)
+    return df.drop_duplicates('id', keep='last').sort_values(['published_at', 'id']).reset_index(drop=True)
+
+
+@stage(inputs=('scrape',), params={'min_length': 100})
+def summarize(scrape, min_length):
+    """Summary без заглушек и точных дублей (ячейка drop_duplicates ноутбука), издание и день публикации."""
+    from article import PAGE_TZ
+    from indicator import extract_publisher
+    df = scrape[['id', 'published_at', 'title', 'url', 'summary']].copy()
+    df['summary'] = df['summary'].fillna('').map(lambda text: ' '.join(text.split()))
+    df = df[df['summary'].str.len() >= min_length].drop_duplicates(subset='summary')
+    df['publisher'] = df['title'].fillna('').map(extract_publisher)
+    df['day'] = df['published_at'].dt.tz_convert(PAGE_TZ).dt.strftime('%Y-%m-%d')
+    return df.reset_index(drop=True)
+
+
+def _distilled(summarize, embed):
+    """(строки summarize с векторами embed, темы и news_index голов distill.py по этим векторам)."""
+    import numpy as np
+    from distill import get_heads
+    from inference import score_vectors
+    heads = get_heads()
+    models = set(embed['embedding_model'])
+    if models - {heads.encoder}:
+        raise ValueError(f"Головы обучены на {heads.encoder}, а векторы embed - {sorted(models)}: "
+                         f"переобучите distill.py train --encoder или задайте model=teacher")
+    df = summarize[['id', 'day', 'summary']].merge(embed[['id', 'vector']], on='id')
+    X = np.stack(df['vector'].values) if len(df) else np.zeros((0, 0), np.float32)
+    return df, score_vectors(X, heads) if len(df) else []
+
+
+@stage(inputs=('summarize', 'embed'), params={'model': 'distilled', 'batch_size': 8, 'heads': [str(HEADS_PATH)]},
+       models=('facebook/bart-large-mnli',), files=('heads',), partitioned=True)
+def classify(summarize, embed, model, batch_size, heads):
+    """Темы: головы поверх векторов embed (distilled) или zero-shot bart (teacher)."""
+    import pandas as pd
+    from indicator import classify_summaries, is_noise
+    if model == 'distilled':
+        df, scores = _distilled(summarize, embed)
+        topics = [row_topics for row_topics, _ in scores]
+    elif model == 'teacher':
+        df = summarize
+        texts = summarize['summary'].tolist()
+        topics = []
+        for i in range(0, len(texts), batch_size):
+            topics.extend(classify_summaries(texts[i:i + batch_size], batch_size=batch_size))
+    else:
+        raise ValueError(f"Неизвестная модель classify: {model}")
+    return pd.DataFrame({
+        'id': df['id'].values,
+        'day': df['day'].values,
+        'topics': topics,
+        'noise': [is_noise(t) for t in topics],
+    })
+
+
+@stage(inputs=('summarize', 'classify', 'embed'), params={'model': 'distilled', 'heads': [str(HEADS_PATH)]},
+       models=('ProsusAI/finbert',), files=('heads',), partitioned=True)
+def sentiment(summarize, classify, embed, model, heads):
+    """news_index только для новостей не из шумовых тем: голова по векторам embed или finbert."""
+    if model == 'distilled':
+        df, scores = _distilled(summarize, embed)
+        df['news_index'] = [news_index for _, news_index in scores]
+        df = df.merge(classify[['id', 'noise']], on='id')
+        df.loc[df['noise'], 'news_index'] = None
+    elif model == 'teacher':
+        from indicator import calculate_market_index
+        df = summarize[['id', 'day', 'summary']].merge(classify[['id', 'noise']], on='id')
+        df['news_index'] = [None if noise else calculate_market_index(text)
+                            for text, noise in zip(df['summary'], df['noise'])]
+    else:
+        raise ValueError(f"Неизвестная модель sentiment: {model}")
+    return df[['id', 'day', 'news_index']]
+
+
+@stage(inputs=('summarize', 'sentiment'))
+def weight(summarize, sentiment):
+    import pandas as pd
+    from indicator import weight_index
+    df = summarize[['id', 'day', 'publisher']].merge(sentiment[['id', 'news_index']], on='id')
+    df['weighted_index'] = [weight_index(None if pd.isna(value) else value, publisher)
+                            for value, publisher in zip(df['news_index'], df['publisher'])]
+    return df[['id', 'day', 'news_index', 'weighted_index']]
+
+
+@stage(inputs=('summarize',), params={'encoder': INDEX_ENCODER, 'batch_size': 16},
+       models=(INDEX_ENCODER,), partitioned=True)
+def embed(summarize, encoder, batch_size):
+    """
+    Эмбеддинги e5 (query: префикс, L2 норма) - как SentenceTransformer в ноутбуке.
+    Единственный проход энкодера: по этим же векторам classify и sentiment (model='distilled').
+    """
+    import pandas as pd
+    from distill import encode
+    vectors = encode(summarize['summary'].tolist(), encoder, batch_size)
+    return pd.DataFrame({'id': summarize['id'].values, 'day': summarize['day'].values, 'vector': list(vectors),
+                         'embedding_model': encoder})
+
+
+def _range_neighbors(vectors, threshold):
+    """Для каждого вектора - индексы векторов с косинусом >= threshold (включая его самого)."""
+    import numpy as np
+    try:
+        import faiss
+    except ImportError:
+        sims = vectors @ vectors.T
+        return [np.flatnonzero(row >= threshold) for row in sims]
+    index = faiss.IndexFlatIP(vectors.shape[1])
+    index.add(vectors)
+    lims, _, inds = index.range_search(vectors, threshold)
+    return [inds[lims[i]:lims[i + 1]] for i in range(len(vectors))]
+
+
+@stage(inputs=('summarize', 'embed'), params={'threshold': 0.95}, partitioned=True)
+def dedup(summarize, embed, threshold):
+    """
+    Похожие новости за день: news_order - номер новости среди похожих по времени,
+    similar_news_count - сколько похожих за день (как faiss range_search в ноутбуке).
+    """
+    import numpy as np
+    df = summarize[['id', 'day', 'published_at']].merge(embed, on=['id', 'day'])
+    df = df.sort_values(['published_at', 'id']).reset_index(drop=True)
+    if df.empty:
+        return df.assign(news_order=[], similar_news_count=[])[['id', 'day', 'news_order', 'similar_news_count']]
+    neighbors = _range_neighbors(np.stack(df['vector'].values).astype(np.float32), threshold)
+    df['news_order'] = [int(np.sum(found < i)) + 1 for i, found in enumerate(neighbors)]
+    df['similar_news_count'] = [len(found) - 1 for found in neighbors]
+    return df[['id', 'day', 'news_order', 'similar_news_count']]
+
+
+@stage(inputs=('summarize', 'embed'), params={'n_components': 3, 'n_neighbors': 5, 'min_cluster_size': 5,
+                                             'random_state': 42})
+def cluster(summarize, embed, n_components, n_neighbors, min_cluster_size, random_state):
+    """UMAP по всем новостям (не по дням - проекция общая), затем HDBSCAN внутри каждого дня."""
+    import numpy as np
+    import umap
+    import hdbscan
+    df = summarize[['id', 'day', 'published_at']].merge(embed[['id', 'vector']], on='id')
+    reducer = umap.UMAP(n_components=n_components, n_neighbors=n_neighbors, metric='cosine',
+                        random_state=random_state)
+    coords = reducer.fit_transform(np.stack(df['vector'].values))
+    df['x'], df['y'], df['z'] = coords[:, 0], coords[:, 1], coords[:, 2]
+    df['cluster_id'] = -1
+    for _, group in df.groupby('day'):
+        if len(group) < min_cluster_size:
+            continue
+        clusterer = hdbscan.HDBSCAN(min_cluster_size=min_cluster_size, allow_single_cluster=True,
+                                    cluster_selection_method='eom', metric='euclidean')
+        df.loc[group.index, 'cluster_id'] = clusterer.fit_predict(group[['x', 'y', 'z']].values)
+    df['min_time'] = df.groupby('day')['published_at'].transform('min')
+    return df[['id', 'day', 'x', 'y', 'z', 'cluster_id', 'min_time']]
+
+
+def load_candles(ticker, start, end, period):
+    """
+    Свечи moexalgo с z-score изменения свечи за последние торговые сутки; индекс end в UTC.
+    Окно - по барам сессий MOEX (candles.FeatureEngine, window='session'), а не rolling('1D')
+    по часам: ночь и выходные его не растягивают. Бары вне сессий отбрасываются.
+    """
+    import pandas as pd
+    from moexalgo import Ticker
+    from article import PAGE_TZ
+    from candles import Bars, FeatureEngine, authorize
+    authorize()
+    candles = pd.DataFrame(Ticker(ticker).candles(start=start, end=end, period=period)).assign(ticker=ticker)
+    candles = FeatureEngine(period, window='session').compute(Bars.from_frame(candles))
+    candles['end'] = candles['end'].dt.tz_localize(PAGE_TZ).dt.tz_convert('UTC')
+    return candles.rename(columns={'z_score': 'z-score'}).set_index('end').sort_index()
+
+
+@stage(inputs=('summarize', 'weight', 'dedup', 'cluster'), params={'ticker': 'SBER', 'period': '15min'})
+def market_join(summarize, weight, dedup, cluster, ticker, period):
+    """Итоговая таблица новостей: индекс, дубли, кластеры и z-score ближайшей следующей свечи к min_time."""
+    import pandas as pd
+    df = (summarize.merge(weight.drop(columns='day'), on='id')
+                   .merge(dedup.drop(columns='day'), on='id')
+                   .merge(cluster.drop(columns='day'), on='id'))
+    if df.empty:
+        return df.assign(**{'z-score': []})
+    candles = load_candles(ticker, df['published_at'].min().date(), df['published_at'].max().date(), period)
+    df = df.sort_values('min_time')
+    merged = pd.merge_asof(df, candles[['z-score']], left_on='min_time', right_index=True, direction='forward')
+    return merged.sort_values('published_at').reset_index(drop=True)
+
+
+def parse_set(values):
+    """['classify.batch_size=16', ...] -> {'classify': {'batch_size': 16}} (значение - json или строка)."""
+    params = {}
+    for value in values or []:
+        key, raw = value.split('=', 1)
+        name, param = key.split('.', 1)
+        try:
+            parsed = json.loads(raw)
+        except json.JSONDecodeError:
+            parsed = raw
+        params.setdefault(name, {})[param] = parsed
+    return params
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Граф этапов индикатора с инкрементальным пересчетом")
+    arg_parser.add_argument('command', choices=['run', 'status'])
+    arg_parser.add_argument('targets', nargs='*', help=f"этапы: {', '.join(STAGES)} (по умолчанию все)")
+    arg_parser.add_argument('--source', action='append', default=None, help="csv / parquet скрапера для scrape (можно несколько раз)")
+    arg_parser.add_argument('--set', action='append', default=None, metavar='STAGE.PARAM=VALUE', help="параметр этапа")
+    arg_parser.add_argument('--force', action='append', default=[], metavar='STAGE', help="пересчитать этап в любом случае")
+    arg_parser.add_argument('--workers', type=int, default=WORKERS, help="сколько этапов считать параллельно")
+    arg_parser.add_argument('--dir', default=str(ARTIFACTS_DIR))
+    arg_parser.add_argument('--dry-run', action='store_true', help="только показать, что будет пересчитано")
+    args = arg_parser.parse_intermixed_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    params = parse_set(args.set)
+    if args.source:
+        params.setdefault('scrape', {})['sources'] = [str(Path(p).resolve()) for p in args.source]
+    runner = Runner(args.dir, params, args.workers)
+
+    if args.command == 'status':
+        for name, status in runner.status(args.targets):
+            entry = runner.state.get(name, {})
+            print(f"  {name:<12} {status:<8} {entry.get('rows', '')!s:>6} {entry.get('finished_at', '')}")
+        return
+    started = time.perf_counter()
+    result = runner.run(args.targets, args.force, args.dry_run)
+    for name, status in result.items():
+        print(f"  {name:<12} {status}")
+    if not args.dry_run:
+        print(f"Пересчитано этапов: {sum(1 for s in result.values() if s == 'run')} из {len(result)}, "
+              f"за {time.perf_counter() - started:.1f} сек")
+
+if __name__ == "__main__":
+    main()
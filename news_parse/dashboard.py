@@ -0,0 +1,363 @@
+"""
+Дашборд индикатора, который не тормозит на миллионе статей.
+
+Ячейки ноутбука рисуют каждую статью отдельной точкой go.Scatter и заранее
+делают hover текст textwrap.fill по каждому summary - на нескольких тысячах
+статей график уже тормозит. Здесь:
+
+  - при запуске строится пирамида агрегатов по корзинам времени (LEVELS, от
+    5 минут до недели) по всем статьям и по каждому тикеру: число статей,
+    средний news_index и weighted_index, сумма similar_news_count, z-score
+    свечи (среднее, минимум, максимум);
+  - браузер запрашивает /series для видимого окна, и сервер выбирает самый
+    мелкий уровень, у которого в окне не больше MAX_BUCKETS корзин, - при
+    зуме детализация растет, а объем ответа нет;
+  - отдельные статьи отдаются точками, только когда их в окне не больше
+    MAX_POINTS, и без текста: заголовок и summary грузятся через /articles
+    для выбранных точек;
+  - рисуется WebGL (scattergl) из plotly.js.
+
+Данные - итог dag.py (artifacts/market_join.pkl, тикеры подтягиваются из
+scrape.pkl) или csv / parquet статей с теми же колонками.
+
+    python dashboard.py                              # artifacts/ из dag.py
+    python dashboard.py --input news_index.parquet --port 8767
+
+    GET /                       - страница
+    GET /meta                   - тикеры, диапазон времени, уровни
+    GET /series?ticker=&start=&end=   - агрегаты (и точки) для окна, время в мс
+    GET /articles?rows=1,2,3    - заголовок, summary, ссылка для выбранных точек
+"""
+import argparse, json, logging, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+
+from article import PAGE_TZ
+
+BASE_DIR = Path(__file__).parent
+ARTIFACTS_DIR = BASE_DIR.parent / 'artifacts'
+HOST = '127.0.0.1'
+PORT = 8767
+
+# уровень -> ширина корзины в минутах
+LEVELS = {'5min': 5, '15min': 15, '1h': 60, '4h': 240, '1D': 1440, '7D': 10080}
+MAX_BUCKETS = 1500          # корзин на ответ /series
+MAX_POINTS = 5000           # отдельных статей на ответ /series
+MAX_ARTICLES = 200          # статей на ответ /articles
+ALL = ''                    # "тикер" для всех статей
+
+AGGREGATES = ('count', 'news_index', 'weighted_index', 'similar', 'z_mean', 'z_min', 'z_max')
+
+dashboard_logger = logging.getLogger('dashboard')
+
+
+def load_frame(input_path=None, root=ARTIFACTS_DIR):
+    """Статьи для дашборда: файл input_path или market_join.pkl из dag.py (+ тикеры из scrape.pkl)."""
+    import pandas as pd
+    from article import read_articles
+    if input_path:
+        path = str(input_path)
+        df = pd.read_pickle(path) if path.endswith('.pkl') else read_articles(path)
+    else:
+        df = pd.read_pickle(Path(root) / 'market_join.pkl')
+        scrape = Path(root) / 'scrape.pkl'
+        if 'tickers' not in df and scrape.exists():
+            df = df.merge(pd.read_pickle(scrape)[['id', 'tickers']], on='id', how='left')
+    return df
+
+
+class Pyramid:
+    """
+    Агрегаты по уровням и тикерам в numpy массивах, отсортированных по времени корзины.
+    Время везде - мс московского времени без пояса (так его и показывает plotly).
+    Статьи без published_at (NaT) на графике не поставить - они отбрасываются, число в dropped.
+    """
+    def __init__(self, df):
+        import pandas as pd
+        missing = df['published_at'].isna()
+        self.dropped = int(missing.sum())
+        if self.dropped:
+            dashboard_logger.warning("Статей без published_at: %s - на графике их нет", self.dropped)
+        df = df[~missing].sort_values('published_at').reset_index(drop=True)
+        self.df = df
+        local = df['published_at'].dt.tz_convert(PAGE_TZ).dt.tz_localize(None)
+        self.time = local.to_numpy('datetime64[ms]').astype(np.int64)
+        columns = {
+            'news_index': 'news_index', 'weighted_index': 'weighted_index',
+            'similar': 'similar_news_count', 'z': 'z-score',
+        }
+        values = {key: pd.to_numeric(df[column], errors='coerce').to_numpy(np.float64) if column in df
+                  else np.full(len(df), np.nan) for key, column in columns.items()}
+        self.y = values['weighted_index']
+        cluster = pd.to_numeric(df['cluster_id'], errors='coerce') if 'cluster_id' in df else pd.Series(-1, index=df.index)
+        self.cluster = cluster.fillna(-1).to_numpy(np.int64)
+
+        # строки каждого тикера (статья с несколькими тикерами - в каждом)
+        self.rows = {ALL: np.arange(len(df))}
+        if 'tickers' in df:
+            exploded = df['tickers'].fillna('').str.split(',').explode()
+            exploded = exploded[exploded != '']
+            for ticker, group in exploded.groupby(exploded):
+                self.rows[ticker] = group.index.to_numpy()
+        self.times = {ticker: self.time[rows] for ticker, rows in self.rows.items()}
+
+        self.levels = {}
+        for ticker, rows in self.rows.items():
+            self.levels[ticker] = {level: self._aggregate(rows, minutes, values) for level, minutes in LEVELS.items()}
+
+    def _aggregate(self, rows, minutes, values):
+        import pandas as pd
+        step = minutes * 60_000
+        buckets = self.time[rows] // step * step   # корзины от эпохи: дневные - по московским суткам
+        frame = pd.DataFrame({
+            'bucket': buckets,
+            'news_index': values['news_index'][rows],
+            'weighted_index': values['weighted_index'][rows],
+            'similar': values['similar'][rows],
+            'z': values['z'][rows],
+        })
+        grouped = frame.groupby('bucket', sort=True)
+        agg = grouped.agg(
+            count=('bucket', 'size'), news_index=('news_index', 'mean'), weighted_index=('weighted_index', 'mean'),
+            similar=('similar', 'sum'), z_mean=('z', 'mean'), z_min=('z', 'min'), z_max=('z', 'max'),
+        )
+        result = {'time': agg.index.to_numpy(np.int64)}
+        result.update({name: agg[name].to_numpy(np.float64) for name in AGGREGATES})
+        return result
+
+    def meta(self):
+        return {
+            'tickers': sorted(t for t in self.rows if t != ALL),
+            'start': int(self.time[0]) if len(self.time) else None,
+            'end': int(self.time[-1]) if len(self.time) else None,
+            'articles': len(self.time),
+            'dropped': self.dropped,
+            'levels': list(LEVELS),
+        }
+
+    def series(self, ticker=ALL, start=None, end=None, max_buckets=MAX_BUCKETS, max_points=MAX_POINTS):
+        """Агрегаты самого мелкого уровня, у которого в [start, end] не больше max_buckets корзин, и точки."""
+        levels = self.levels.get(ticker)
+        if levels is None:
+            raise KeyError(f"Нет статей по тикеру {ticker}")
+        start = -2 ** 62 if start is None else start
+        end = 2 ** 62 if end is None else end
+        for level, minutes in LEVELS.items():
+            data = levels[level]
+            # корзина, начавшаяся до start, тоже видна
+            lo = np.searchsorted(data['time'], start - minutes * 60_000, 'right')
+            hi = np.searchsorted(data['time'], end, 'right')
+            if hi - lo <= max_buckets:
+                break
+        body = {'level': level, 'time': data['time'][lo:hi].tolist()}
+        body.update({name: _json_floats(data[name][lo:hi]) for name in AGGREGATES})
+
+        rows, times = self.rows[ticker], self.times[ticker]
+        lo, hi = np.searchsorted(times, start, 'left'), np.searchsorted(times, end, 'right')
+        body['points'] = None
+        if hi - lo <= max_points:
+            selected = rows[lo:hi]
+            body['points'] = {
+                'time': times[lo:hi].tolist(),
+                'y': _json_floats(self.y[selected]),
+                'row': selected.tolist(),
+                'cluster': self.cluster[selected].tolist(),
+            }
+        body['articles'] = int(hi - lo)
+        return body
+
+    def articles(self, rows):
+        """Текст только для выбранных точек."""
+        rows = [r for r in rows[:MAX_ARTICLES] if 0 <= r < len(self.df)]
+        columns = [c for c in ('title', 'summary', 'url', 'publisher', 'news_index', 'weighted_index',
+                               'similar_news_count', 'cluster_id', 'z-score') if c in self.df]
+        out = []
+        for row, rec in zip(rows, self.df.iloc[rows][columns].to_dict('records')):
+            rec = {k: (None if isinstance(v, float) and v != v else v) for k, v in rec.items()}
+            rec['row'] = row
+            rec['published_at'] = self.df['published_at'].iloc[row].tz_convert(PAGE_TZ).strftime('%Y-%m-%d %H:%M')
+            out.append(rec)
+        return out
+
+
+def _json_floats(values, digits=4):
+    """float массив -> список для json, NaN -> None."""
+    rounded = np.round(values, digits)
+    return [None if v != v else v for v in rounded.tolist()]
+
+
+PAGE = """<!DOCTYPE html>
+<html lang="ru">
+<head>
+<meta charset="utf-8">
+<title>Новостной индикатор</title>
+<script src="https://cdn.plot.ly/plotly-2.35.2.min.js"></script>
+<style>
+  body { margin: 0; font-family: sans-serif; display: flex; height: 100vh; }
+  #main { flex: 1; display: flex; flex-direction: column; min-width: 0; }
+  #bar { padding: 6px 10px; border-bottom: 1px solid #ddd; font-size: 13px; }
+  #chart { flex: 1; }
+  #side { width: 380px; overflow-y: auto; border-left: 1px solid #ddd; padding: 8px; font-size: 13px; }
+  .article { border-bottom: 1px solid #eee; padding: 6px 0; }
+  .article .meta { color: #666; font-size: 12px; }
+</style>
+</head>
+<body>
+<div id="main">
+  <div id="bar">Тикер: <select id="ticker"><option value="">все</option></select>
+    <span id="info"></span></div>
+  <div id="chart"></div>
+</div>
+<div id="side">Выделите точки (box / lasso) или кликните по точке, чтобы увидеть статьи.</div>
+<script>
+const chart = document.getElementById('chart');
+const tickerSelect = document.getElementById('ticker');
+let range = null, timer = null, request = 0;
+
+function toMs(value) { return typeof value === 'number' ? value : new Date(value.replace(' ', 'T') + 'Z').getTime(); }
+
+async function load() {
+  const id = ++request;
+  const params = new URLSearchParams({ticker: tickerSelect.value});
+  if (range) { params.set('start', Math.floor(range[0])); params.set('end', Math.ceil(range[1])); }
+  const data = await (await fetch('/series?' + params)).json();
+  if (id !== request) return;  // пришел ответ на устаревшее окно
+  const x = data.time;
+  const traces = [
+    {type: 'scattergl', mode: 'lines', name: 'news_index (' + data.level + ')', x: x, y: data.news_index,
+     line: {color: '#1f77b4'}, connectgaps: false},
+    {type: 'scattergl', mode: 'lines', name: 'weighted_index', x: x, y: data.weighted_index,
+     line: {color: '#aec7e8'}, connectgaps: false},
+    {type: 'scattergl', mode: 'lines', name: 'статей', x: x, y: data.count, yaxis: 'y2',
+     line: {color: '#999', shape: 'hv'}},
+    {type: 'scattergl', mode: 'lines', name: 'similar_news_count', x: x, y: data.similar, yaxis: 'y2',
+     line: {color: '#ff7f0e', shape: 'hv'}},
+    {type: 'scattergl', mode: 'lines', name: 'z-score max', x: x, y: data.z_max, yaxis: 'y3',
+     line: {width: 0}, showlegend: false, connectgaps: false},
+    {type: 'scattergl', mode: 'lines', name: 'z-score min..max', x: x, y: data.z_min, yaxis: 'y3',
+     fill: 'tonexty', fillcolor: 'rgba(214,39,40,0.15)', line: {width: 0}, connectgaps: false},
+    {type: 'scattergl', mode: 'lines', name: 'z-score', x: x, y: data.z_mean, yaxis: 'y3',
+     line: {color: '#d62728'}, connectgaps: false},
+  ];
+  if (data.points) {
+    traces.push({type: 'scattergl', mode: 'markers', name: 'статьи', x: data.points.time, y: data.points.y,
+                 customdata: data.points.row, marker: {size: 6, color: data.points.cluster, colorscale: 'Viridis'},
+                 hovertemplate: '%{x}<br>weighted_index %{y}<extra></extra>'});
+  }
+  const layout = {
+    uirevision: tickerSelect.value, dragmode: 'zoom', hovermode: 'closest', margin: {t: 30, r: 20},
+    legend: {orientation: 'h'},
+    xaxis: {type: 'date', rangeslider: {visible: false}},
+    yaxis: {domain: [0.55, 1], title: 'индекс'},
+    yaxis2: {domain: [0.3, 0.5], title: 'статей'},
+    yaxis3: {domain: [0, 0.25], title: 'z-score'},
+  };
+  await Plotly.react(chart, traces, layout, {responsive: true});
+  document.getElementById('info').textContent =
+    ` уровень ${data.level}, статей в окне: ${data.articles}` + (data.points ? '' : ' (точки появятся при приближении)');
+}
+
+function schedule() { clearTimeout(timer); timer = setTimeout(load, 150); }
+
+async function showArticles(rows) {
+  const side = document.getElementById('side');
+  if (!rows.length) return;
+  const articles = await (await fetch('/articles?rows=' + rows.join(','))).json();
+  side.replaceChildren(...articles.map(a => {
+    const div = document.createElement('div');
+    div.className = 'article';
+    const title = document.createElement('a');
+    title.href = a.url || '#'; title.target = '_blank'; title.textContent = a.title || '';
+    const meta = document.createElement('div');
+    meta.className = 'meta';
+    meta.textContent = `${a.published_at} | index ${a.weighted_index ?? '-'} | похожих ${a.similar_news_count ?? '-'} | z ${a['z-score'] ?? '-'}`;
+    const summary = document.createElement('div');
+    summary.textContent = a.summary || '';
+    div.append(title, meta, summary);
+    return div;
+  }));
+}
+
+async function init() {
+  const meta = await (await fetch('/meta')).json();
+  for (const t of meta.tickers) tickerSelect.add(new Option(t, t));
+  tickerSelect.onchange = () => { range = null; load(); };
+  await load();
+  chart.on('plotly_relayout', e => {
+    if (e['xaxis.autorange']) { range = null; schedule(); }
+    else if (e['xaxis.range[0]'] !== undefined) { range = [toMs(e['xaxis.range[0]']), toMs(e['xaxis.range[1]'])]; schedule(); }
+    else if (e['xaxis.range']) { range = e['xaxis.range'].map(toMs); schedule(); }
+  });
+  const pick = e => showArticles((e && e.points || []).filter(p => p.customdata !== undefined).map(p => p.customdata));
+  chart.on('plotly_click', pick);
+  chart.on('plotly_selected', pick);
+}
+init();
+</script>
+</body>
+</html>
+"""
+
+
+def make_handler(pyramid):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, body, content_type='application/json; charset=utf-8'):
+            data = body.encode('utf-8') if isinstance(body, str) else json.dumps(body, ensure_ascii=False).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            parsed = urlparse(self.path)
+            query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+            try:
+                if parsed.path == '/':
+                    self._send(PAGE, 'text/html; charset=utf-8')
+                elif parsed.path == '/meta':
+                    self._send(pyramid.meta())
+                elif parsed.path == '/series':
+                    start = int(float(query['start'])) if 'start' in query else None
+                    end = int(float(query['end'])) if 'end' in query else None
+                    self._send(pyramid.series(query.get('ticker', ALL), start, end))
+                elif parsed.path == '/articles':
+                    rows = [int(r) for r in query.get('rows', '').split(',') if r]
+                    self._send(pyramid.articles(rows))
+                else:
+                    self.send_error(404)
+            except (KeyError, ValueError) as e:
+                self.send_error(400, 'Bad Request', str(e))  # строка статуса - только latin-1
+
+        def log_message(self, format, *args):
+            pass
+    return Handler
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Дашборд индикатора с агрегатами на сервере и WebGL")
+    arg_parser.add_argument('--input', default=None, help="csv / parquet / pkl статей вместо artifacts/market_join.pkl")
+    arg_parser.add_argument('--artifacts', default=str(ARTIFACTS_DIR), help="каталог артефактов dag.py")
+    arg_parser.add_argument('--host', default=HOST)
+    arg_parser.add_argument('--port', type=int, default=PORT)
+    args = arg_parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    started = time.perf_counter()
+    pyramid = Pyramid(load_frame(args.input, args.artifacts))
+    dashboard_logger.info("Статей: %s, тикеров: %s, агрегаты за %.1f сек", len(pyramid.time),
+                          len(pyramid.rows) - 1, time.perf_counter() - started)
+    httpd = ThreadingHTTPServer((args.host, args.port), make_handler(pyramid))
+    dashboard_logger.info("Дашборд на http://%s:%s", args.host, args.port)
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+
+if __name__ == "__main__":
+    main()
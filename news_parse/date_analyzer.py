@@ -0,0 +1,209 @@
+"""
+Офлайн анализ извлечения даты по сохраненному html, без браузера.
+
+То же, что single_url_test.py / not_extraced_urls_debug.py, но для тысяч
+страниц сразу: по каждой странице корпуса (corpus.py) собираем всех
+кандидатов даты (JSON-LD, meta, css селекторы; текст и атрибуты
+datetime/content), прогоняем их через custom_patterns и robust_parse и
+сравниваем с датой GNews. Страницы разбираются в пуле процессов.
+
+    python date_analyzer.py dec2025                  # все страницы корпуса
+    python date_analyzer.py dec2025 --only-failed    # только no_date из failures.db
+
+Результат:
+    logs/date_analysis.csv - кандидат на строку: url, источник, сырое значение,
+                             паттерн, распарсенная дата, расстояние от GNews, статус
+    в консоль - покрытие паттернов и страницы без perfect кандидата
+"""
+import argparse, gzip, json, os, re, time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from dateutil import parser
+
+from static_page import StaticPage, CSS_SELECTOR
+from date_extraction import (
+    meta_selectors, js_scripts, possible_time_classes, possible_selectors,
+    custom_patterns, robust_parse, find_key_recursive, date_match_status,
+)
+
+BASE_DIR = Path(__file__).parent
+OUTPUT_PATH = BASE_DIR / 'logs' / 'date_analysis.csv'
+
+JSON_LD_KEYS = ('datePublished', 'dateCreated', 'dateModified')
+
+# селекторы в том же виде, что проверяет extract_page_date: 'time' и '.time' и т.д.
+CSS_SELECTORS = list(dict.fromkeys(
+    variant
+    for item in possible_time_classes + possible_selectors
+    for variant in ([item] if any(c in item for c in ['.', '[', '#']) else [item, f".{item}"])
+))
+
+
+def matched_pattern(raw_value):
+    """Какой паттерн custom_patterns сработает у robust_parse (та же нормализация строки)."""
+    date_str = raw_value.lower().strip().replace('t', ' ').replace('z', '')
+    if re.search(r'^(\d{1,2}):(\d{2})', date_str) and len(date_str) <= 8:
+        return 'time_only'
+    for (pattern, _), _ in custom_patterns.items():
+        if re.search(pattern, date_str):
+            return pattern
+    return 'dateutil'
+
+
+def page_candidates(page):
+    """(источник, сырое значение) для всех мест, где extract_page_date ищет дату."""
+    for item in js_scripts:
+        for script in page.find_elements(CSS_SELECTOR, f'script[type="{item}"]'):
+            try:
+                data = json.loads(script.get_attribute("textContent"))
+            except Exception:
+                yield f"json-ld:{item}", "[invalid json]"
+                continue
+            for key in JSON_LD_KEYS:
+                value = find_key_recursive(data, key)
+                if value:
+                    yield f"json-ld:{key}", str(value)
+    for s in meta_selectors:
+        for el in page.find_elements(CSS_SELECTOR, s):
+            yield f"meta:{s}", el.get_attribute("content")
+    for sel in CSS_SELECTORS:
+        for el in page.find_elements(CSS_SELECTOR, sel):
+            yield f"attr:datetime in {sel}", el.get_attribute("datetime")
+            yield f"attr:content in {sel}", el.get_attribute("content")
+            yield f"text in {sel}", el.text.strip()
+
+
+def analyze_page(task):
+    """Кандидаты одной страницы. task - (url, final_url, gnews_date, путь к html.gz). Выполняется в воркере."""
+    url, final_url, gnews_date, html_path = task
+    with gzip.open(html_path, 'rt', encoding='utf-8') as f:
+        page = StaticPage(f.read(), final_url)
+    try:
+        target = parser.parse(gnews_date).replace(tzinfo=None) if gnews_date else None
+    except Exception:
+        target = None
+
+    rows = []
+    for source, raw in page_candidates(page):
+        if not raw or len(raw.strip()) < 4:
+            continue
+        raw = raw.strip()[:200]
+        row = {'url': url, 'final_url': final_url, 'gnews_date': gnews_date, 'source': source, 'raw': raw,
+               'pattern': None, 'parsed': None, 'has_time': None, 'distance_hours': None, 'status': 'unparsed'}
+        if raw != "[invalid json]":
+            row['pattern'] = matched_pattern(raw)
+            parsed = robust_parse(raw, target)
+            parsed_dt, has_time = parsed if parsed else (None, False)
+            if parsed_dt is not None:
+                parsed_dt = parsed_dt.replace(tzinfo=None)
+                row.update(parsed=parsed_dt.isoformat(), has_time=has_time)
+                if target is not None:
+                    row['distance_hours'] = round(abs((parsed_dt - target).total_seconds()) / 3600, 1)
+                    row['status'] = date_match_status(parsed_dt, target, has_time)
+                else:
+                    row['status'] = 'no_target'
+        rows.append(row)
+    if not rows:
+        rows.append({'url': url, 'final_url': final_url, 'gnews_date': gnews_date, 'source': None, 'raw': None,
+                     'pattern': None, 'parsed': None, 'has_time': None, 'distance_hours': None, 'status': 'no_candidates'})
+    return rows
+
+
+def corpus_tasks(corpus, only=None):
+    """Задачи по страницам корпуса с html. only - множество ссылок GNews или раскрытых URL."""
+    gnews_dates = {item['url']: item.get('published date')
+                   for results in corpus.searches.values() for item in results}
+    tasks = []
+    for rec in corpus.pages.values():
+        if rec['outcome'] != 'ok' or not rec.get('html_file'):
+            continue
+        if only is not None and rec['url'] not in only and rec['decoded_url'] not in only:
+            continue
+        tasks.append((rec['url'], rec.get('final_url') or rec['decoded_url'], gnews_dates.get(rec['url']),
+                      str(corpus.pages_dir / rec['html_file'])))
+    return tasks
+
+
+def analyze(tasks, workers=None, chunksize=16):
+    """Все кандидаты по всем страницам - DataFrame."""
+    import pandas as pd
+    if workers == 1:
+        results = map(analyze_page, tasks)
+        return pd.DataFrame([row for rows in results for row in rows])
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(analyze_page, tasks, chunksize=chunksize)
+        return pd.DataFrame([row for rows in results for row in rows])
+
+
+def pattern_coverage(df):
+    """
+    По паттерну: сколько кандидатов он разобрал, сколько из них perfect/partial
+    и на скольких страницах он дал perfect.
+    """
+    parsed = df[df['pattern'].notna()]
+    coverage = parsed.groupby('pattern').agg(
+        candidates=('raw', 'size'),
+        perfect=('status', lambda s: (s == 'perfect').sum()),
+        partial=('status', lambda s: (s == 'partial').sum()),
+        unparsed=('status', lambda s: (s == 'unparsed').sum()),
+        pages_perfect=('url', lambda u: u[parsed.loc[u.index, 'status'] == 'perfect'].nunique()),
+    )
+    return coverage.sort_values('pages_perfect', ascending=False)
+
+
+def page_summary(df):
+    """Лучший статус по каждой странице: perfect > partial > none > остальное."""
+    rank = {'perfect': 0, 'partial': 1, 'none': 2, 'no_target': 3, 'unparsed': 4, 'no_candidates': 5}
+    best = df.assign(rank=df['status'].map(rank)).groupby('url')['rank'].min()
+    inverse = {v: k for k, v in rank.items()}
+    return best.map(inverse).value_counts().rename_axis('status').rename('pages')
+
+
+def main():
+    import pandas as pd
+    from corpus import Corpus
+
+    arg_parser = argparse.ArgumentParser(description="Офлайн анализ кандидатов даты по сохраненному html")
+    arg_parser.add_argument('corpus', nargs='+', help="имена корпусов в corpus/")
+    arg_parser.add_argument('--only-failed', action='store_true', help="только страницы без даты из failures.db")
+    arg_parser.add_argument('--workers', type=int, default=None, help="процессов (по умолчанию - по числу ядер)")
+    arg_parser.add_argument('--output', default=str(OUTPUT_PATH))
+    args = arg_parser.parse_args()
+
+    only = None
+    if args.only_failed:
+        from failure_store import failure_store
+        failed = failure_store.load()
+        failed = failed[failed['reason'] == 'no_date']
+        only = set(failed['url']) | set(failed['decoded_url'].dropna())
+
+    tasks = [task for name in args.corpus for task in corpus_tasks(Corpus(name), only)]
+    if not tasks:
+        print("Нет сохраненных страниц для анализа")
+        return
+
+    started = time.perf_counter()
+    df = analyze(tasks, args.workers)
+    elapsed = time.perf_counter() - started
+
+    os.makedirs(Path(args.output).parent, exist_ok=True)
+    df.to_csv(args.output, index=False, encoding='utf-8-sig')
+
+    pd.set_option('display.width', 200)
+    pd.set_option('display.max_colwidth', 80)
+    print(f"Страниц: {len(tasks)}, кандидатов: {len(df)}, за {elapsed:.2f} сек. Таблица: {args.output}\n")
+    print("Лучший кандидат по страницам:")
+    print(page_summary(df).to_string())
+    print("\nПокрытие паттернов:")
+    print(pattern_coverage(df).to_string())
+
+    no_perfect = df.groupby('url')['status'].apply(lambda s: not (s == 'perfect').any())
+    misses = df[df['url'].isin(no_perfect[no_perfect].index) & df['raw'].notna()]
+    if not misses.empty:
+        print("\nСтраницы без perfect - ближайшие кандидаты:")
+        closest = misses.sort_values('distance_hours').groupby('url').head(3)
+        print(closest[['final_url', 'source', 'raw', 'pattern', 'distance_hours', 'status']].to_string(index=False))
+
+if __name__ == "__main__":
+    main()
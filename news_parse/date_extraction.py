@@ -0,0 +1,397 @@
+"""
+Извлечение даты публикации со страницы: паттерны дат, парсинг строк и
+поиск даты в JSON-LD, meta тегах и css селекторах (extract_page_date).
+Работает и с живым selenium driver, и со StaticPage.
+"""
+import re, json, time
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from dateutil import parser
+
+from static_page import StaticPage, CSS_SELECTOR
+from domain_profiles import domain_profiles, get_domain
+from loggers import date_logger, url_logger, missmatched_dates_logger, CANDIDATE
+
+meta_selectors = [
+    "meta[property='article:published_time']",
+    "meta[itemprop='datePublished']",
+    "meta[itemprop='dateModified']",
+    "meta[name='publish-date']",
+    "meta[property='og:published_time']", 
+    "meta[name='pubdate']",
+    "meta[name='originalPublicationDate']",
+    "link[rel='canonical']"
+]
+
+js_scripts = [
+    'application/ld+json'
+]
+
+possible_time_classes = [
+    "js-ago", "date", "news-item-header--date", "b-post-time", "post-time",
+    "article__info-date", "timestamp", "entry-date", "pWvg",
+    "c-post__date", "page-styles__date", "news-detail-date", "tag-date", 
+    "SHTMLCode", "article-details__date", "b-article__date", "article__date", 
+    "time", "full_news_date", "article-header__author-writing-date",
+    "article-date", "el-time", "date material__date", "date3", "date_item",
+    "article-date-desktop", "article-meta__date", "faq_date","post-info__date",
+    "desc"
+]
+
+possible_selectors = [
+    "span[title='Дата публикации']", "div[title='Дата публикации']",
+    "span[data-id='date']", "div[data-test='text']", "div[id='info-text-photo-date']",
+    "div.fn-rubric-link > div", ".text-grey.text-sm.span1",
+    ".tg-label-standard-regular-4b7-9-0-0.KVFz2",
+    "time", "div.text-nowrap.d-flex.flex-wrap.gap-3 > div", 
+    "div[class='MatterTop_date__mPSNt flex gap-[8px] mb-[16px] font-medium']",
+    "div[class='tg-label-standard-regular-4b7-9-0-1 KVFz2']", "div[data-test='article-created-at']",
+    "[data-qa='Datetime']", "[itemprop='datePublished']", "div[data-e2e-id='data-dynamic']",
+    "div[class='col-auto fw-bold']"
+]
+
+RU_MONTH_VALUES = {
+    'января': 'January', 'февраля': 'February', 'марта': 'March',
+    'апреля': 'April', 'мая': 'May', 'июня': 'June',
+    'июля': 'July', 'августа': 'August', 'сентября': 'September',
+    'октября': 'October', 'ноября': 'November', 'декабря': 'December',
+    # сокращения с точками
+    'янв.': 'January', 'фев.': 'February', 'март.': 'March',
+    # сокращения без точек
+    'янв': 'January', 'фев': 'February', 'март': 'March',
+}
+
+months_map = {
+    'янв': 1, 'фев': 2, 'мар': 3, 'апр': 4, 'май': 5, 'июн': 6,
+    'июл': 7, 'авг': 8, 'сен': 9, 'окт': 10, 'ноя': 11, 'дек': 12,
+    # сокразения на инглише
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+    'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12,
+    # сокращения (с точкой)
+    'янв.': 1, 'фев.': 2, 'мар.': 3, 'апр.': 4, 'май': 5, 'июн': 6,
+    'июл': 7, 'авг': 8, 'сен': 9, 'окт': 10, 'ноя': 11, 'дек': 12,
+    # полные месяца (родительный падеж)
+    'января': 1, 'февраля': 2, 'марта': 3, 'апреля': 4, 'мая': 5, 'июня': 6,
+    'июля': 7, 'августа': 8, 'сентября': 9, 'октября': 10, 'ноября': 11, 'декабря': 12,
+    # полные названия (именительный падеж)
+    'январь': 1, 'февраль': 2, 'март': 3, 'апрель': 4, 'май': 5, 'июнь': 6,
+    'июль': 7, 'август': 8, 'сентябрь': 9, 'октябрь': 10, 'ноябрь': 11, 'декабрь': 12
+}
+
+custom_patterns = { # формат списка [позиция числа, позиция месяца, позиция года, часы, минуты]
+    # "2025-12-01 23:13:00+07:00" - из json
+    (r'(\d{4})-(\d{2})-(\d{2})\s+(\d{2}):(\d{2}):\d{2}[+-]\d{2}:\d{2}', True): [0, 1, 2, 3, 4],
+
+    # 2025-12-01 13:08:28
+    (r'(\d{4})-(\d{2})-(\d{2})\s+(\d{2}):(\d{2})', True): [2, 1, 0, 3, 4],
+
+    # 12-12-2026
+    (r'(\d{4})-(\d{2})-(\d{2})$', False): [0, 1, 2],
+
+    # Паттерн: "03 декабря 2025, 11:35" или "3 дек 2025 11:35"
+    (r'(\d{1,2})\s+([а-яa-z]+)\s+(\d{4})[,\s]+(\d{1,2}):(\d{1,2})', True): [0, 1, 2, 3, 4],
+    
+    # Паттерн: "03 декабря 2025" или "3 дек 2025"
+    (r'(\d{1,2})\s+([а-яa-z]+)\s+(\d{4})', False): [0, 1, 2, None, None],
+    
+    # "Дата публикации: 02 дек 2025"
+    (r'дата публикации:\s*(\d{1,2})\s+([а-яa-z]+)\s+(\d{4})', False): [1, 2, 3, None, None],
+
+    # 04.12.2025 в 07:56
+    (r'(\d{2})\.(\d{2})\.(\d{4})\s+в\s+(\d{1,2}):(\d{2})', True): [0, 1, 2, 3, 4],
+
+    # 04.12.2025 07:56
+    (r'(\d{2})\.(\d{2})\.(\d{4})\s*(?:в)?\s*(\d{1,2}):(\d{2})', True): [0, 1, 2, 3, 4],
+
+    # 5 декабря 2025 в 11:36
+    (r'(\d{1,2})\s+([а-яa-z]+)\s+в\s+(\d{4})', True): [0, 1, 2, 3, 4],
+
+    # 17:36, 14 декабря 2025 или 17:36 14 декабря 2025 
+    (r'(\d{1,2}):(\d{2})[,\s]+(\d{1,2})\s+([а-яёa-z]+)\s+(\d{4})', True): [2, 3, 4, 0, 1],
+
+    # 1. 05.07.2022 г. (с точкой в конце и "г.")
+    (r'(\d{2})\.(\d{2})\.(\d{4})\s*г\.', False): [0, 1, 2, None, None],
+    
+    # 2. 30.12.25 12:53 (двузначный год)
+    (r'(\d{2})\.(\d{2})\.(\d{2})\s+(\d{2}):(\d{2})', True): [0, 1, 2, 3, 4],
+    
+    # 3. пт, 02/27/2026 - 17:27 (с днем недели, слешами и дефисом)
+    (r'[а-я]{2},\s*(\d{2})/(\d{2})/(\d{4})\s*-\s*(\d{2}):(\d{2})', True): [0, 1, 2, 3, 4],
+
+    # 09.12.2025 | 18:47
+    (r'(\d{2})\.(\d{2})\.(\d{4})\s*|\s*(\d{2}):(\d{2})', True): [0, 1, 2, 3, 4],
+
+    # 4 декабря 2025 года, 11:04
+    (r'(\d{1,2})\s+([а-яa-z]+)\s+(\d{4})\s+года?\s*[,]?\s*(\d{1,2}):(\d{2})', True): [0, 1, 2, 3, 4]
+}
+
+patterns = [
+    r'^\d{4}—\d{4}$', # Интервалы типа 2024—2025
+]
+
+def date_match_status(parsed_date, target_date, has_time):
+    """perfect / partial / none без логирования (для офлайн анализа, date_analyzer.py)."""
+    # Твоя проверка (разница дней <= 1, месяц и год совпадают)
+    is_day_match = (abs(parsed_date.date().day - target_date.date().day) <= 1 and 
+                    parsed_date.month == target_date.month and 
+                    parsed_date.year == target_date.year)
+    if is_day_match and has_time:
+        return "perfect"
+    return "partial" if is_day_match else "none"
+
+def is_date_suitable(parsed_date, target_date, date_source, raw_date, has_time):
+    status = date_match_status(parsed_date, target_date, has_time)
+
+    if status == "perfect":
+        missmatched_dates_logger.info("  [PERFECT MATCH] Src: %s | Raw: '%s' | Parsed: %s", date_source, raw_date, parsed_date,
+                                      extra={'source': date_source, 'outcome': 'perfect'})
+        return "perfect"
+    elif status == "partial":
+        missmatched_dates_logger.info("  [PARTIAL MATCH (No Time)] Src: %s | Raw: '%s' | Parsed: %s", date_source, raw_date, parsed_date,
+                                      extra={'source': date_source, 'outcome': 'partial'})
+        return "partial"
+    else:
+        # кандидатов на странице десятки - эти записи ограничены по частоте
+        missmatched_dates_logger.info("  [NO MATCH] Src: %s | Raw: '%s' | Parsed: %s | Days diff: %s | Target days: %s",
+                                      date_source, raw_date, parsed_date, abs(parsed_date.date().day - target_date.date().day),
+                                      target_date.day, extra=CANDIDATE)
+        return "none"
+        
+def translate_month(date_str):
+    """Заменяет русские месяцы на английские для корректного парсинга."""
+    if not date_str: return date_str
+    date_str = date_str.lower()
+    for ru, en in RU_MONTH_VALUES.items():
+        if ru in date_str:
+            date_str = date_str.replace(ru, en)
+            break
+    return date_str
+
+# явный пояс после времени: 10:15:00+03:00, 07:15Z, 07:15 GMT
+TZ_SUFFIX = re.compile(r'\d{1,2}:\d{2}(?::\d{2})?(?:\.\d+)?\s*(z|utc|gmt|[+-]\d{2}:?\d{2})$', re.IGNORECASE)
+
+def explicit_offset(date_str):
+    """Пояс, явно указанный в строке даты, или None - тогда дата считается московской (article.to_utc)."""
+    match = TZ_SUFFIX.search(date_str.strip())
+    if not match:
+        return None
+    suffix = match.group(1).lower()
+    if suffix in ('z', 'utc', 'gmt'):
+        return timezone.utc
+    sign = -1 if suffix[0] == '-' else 1
+    digits = suffix[1:].replace(':', '')
+    return timezone(sign * timedelta(hours=int(digits[:2]), minutes=int(digits[2:])))
+
+def robust_parse(date_str, default_date_obj=None):
+    """
+    Парсит строку в datetime. Если находит только время — склеивает с default_date_obj.
+    Явный пояс из строки (Z, +03:00) сохраняется в tzinfo, без пояса дата наивная.
+    """
+    if not date_str:
+        return None
+
+    offset = explicit_offset(date_str)
+    date_str = date_str.lower().strip().replace('t', ' ').replace('z', '')
+
+    # 1. ОБРАБОТКА "ТОЛЬКО ВРЕМЯ" (Например: "18:30" или "18:30:00")
+    time_match = re.search(r'^(\d{1,2}):(\d{2})', date_str)
+    if time_match and len(date_str) <= 8:
+        # ПРАВКА: Теперь мы уверены, что работаем с объектом datetime
+        if isinstance(default_date_obj, datetime):
+            hour, minute = int(time_match.group(1)), int(time_match.group(2))
+            return default_date_obj.replace(hour=hour, minute=minute, second=0, microsecond=0), True
+        return None, False # Если объекта даты нет, время бесполезно
+
+    for (pattern, has_time), indices in custom_patterns.items():
+            match = re.search(pattern, date_str)
+            if match:
+                groups = match.groups()
+                try:
+                    # Извлекаем данные по индексам из схемы
+                    d_idx, m_idx, y_idx, h_idx, min_idx = indices
+                    
+                    day = int(groups[d_idx]) if d_idx is not None else (default_date_obj.day if default_date_obj else 1)
+                    year = int(groups[y_idx]) if y_idx is not None else (default_date_obj.year if default_date_obj else 2025)
+                    
+                    # Логика месяца (название или число)
+                    month_raw = groups[m_idx] if m_idx is not None else None
+                    if not month_raw:
+                        month = default_date_obj.month if default_date_obj else 1
+                    elif month_raw.isdigit():
+                        month = int(month_raw)
+                    else:
+                        month = None
+                        for k, v in months_map.items():
+                            if k in month_raw:
+                                month = v
+                                break
+                        if not month: continue # Месяц не распознан
+                    
+                    hour = int(groups[h_idx]) if h_idx is not None else 8
+                    minute = int(groups[min_idx]) if min_idx is not None else 0
+                    
+                    return datetime(year, month, day, hour, minute, tzinfo=offset), has_time
+                except Exception:
+                    continue
+
+    # 3. ФОЛЛБЕК (БИБЛИОТЕКА)
+    try:
+        translated = translate_month(date_str)
+        # Убираем fuzzy=False, так как в мета-тегах часто бывает лишний текст
+        dt = parser.parse(translated, dayfirst=False, yearfirst=True, fuzzy=True)
+        if dt.tzinfo is None and offset is not None:
+            dt = dt.replace(tzinfo=offset)
+        return dt, (':' in date_str)
+    except:
+        return None, False
+
+def is_bad_pattern(text, url):
+    """Проверяет, соответствует ли текст нежелательным паттернам."""
+    if not text:
+        date_logger.info('НЕТ ТЕКСТА В URL %s', url, extra={'url': url})
+        return True
+    text = text.strip()
+    for pattern in patterns:
+        if re.match(pattern, text):
+            date_logger.info('ПЛОХОЙ ПАТТЕРН В URL %s', url, extra={'url': url})
+            return True
+    return False
+
+def is_valid_date_string(date_str):
+    """
+    Универсальная проверка: существует ли строка, 
+    достаточно ли она длинная и не содержит ли мусора.
+    """
+    if not date_str:
+        return False
+    
+    date_str = date_str.strip()
+    
+    # Отсекаем "12:30", "5 мин" и пустые строки
+    if len(date_str) <= 5:
+        return False
+        
+    # Проверяем на плохие паттерны
+    for pattern in patterns:
+        if re.match(pattern, date_str):
+            return False
+            
+    return True
+
+def find_key_recursive(obj, key_to_find):
+    """Рекурсивный поиск ключа в словаре или списке."""
+    if isinstance(obj, dict):
+        if key_to_find in obj:
+            return obj[key_to_find]
+        for v in obj.values():
+            result = find_key_recursive(v, key_to_find)
+            if result: return result
+    elif isinstance(obj, list):
+        for item in obj:
+            result = find_key_recursive(item, key_to_find)
+            if result: return result
+    return None
+
+def extract_page_date(driver, url, gnews_date_str, profiles=domain_profiles):
+    missmatched_dates_logger.info("\nURL: %s\nGNews Target: %s\nFound attempts:", url, gnews_date_str,
+                                  extra={'url': url, 'gnews_date': gnews_date_str})
+    try:
+        gnews_dt_obj = parser.parse(gnews_date_str)
+    except:
+        gnews_dt_obj = None
+
+    fallback_date = {"date": None, "has_time": False}
+    perfect_source = None
+
+    def process_element(raw_value, source):
+        nonlocal fallback_date, perfect_source
+        if not raw_value or len(raw_value.strip()) < 4: return None
+
+        # Получаем дату и флаг наличия времени
+        parsed_dt, has_time = robust_parse(raw_value, gnews_date_str)
+        
+        if parsed_dt:
+            # Твоя оригинальная проверка match_status
+            match_status = is_date_suitable(parsed_dt, gnews_dt_obj, source, raw_value, has_time)
+            
+            if match_status == "perfect":
+                perfect_source = source
+                return parsed_dt # СРАЗУ ВЫХОДИМ! Нашли идеальное совпадение
+            
+            elif match_status == "partial":
+                # ПРАВКА: Логика обновления словаря
+                # Обновляем если: еще ничего нет ИЛИ если новая дата с временем, а старая была без
+                if not fallback_date["date"] or (has_time and not fallback_date["has_time"]):
+                    fallback_date["date"] = parsed_dt
+                    fallback_date["has_time"] = has_time
+                    missmatched_dates_logger.info("  [FALLBACK UPDATED] %s: %s (has_time: %s)", source, parsed_dt, has_time,
+                                                      extra={'url': url, 'source': source})
+
+    def check_scripts(item):
+        try:
+            if not isinstance(driver, StaticPage): # у сохраненного html ждать нечего
+                from selenium.webdriver.support.ui import WebDriverWait
+                from selenium.webdriver.support import expected_conditions as EC
+                WebDriverWait(driver, 3).until(EC.presence_of_element_located((CSS_SELECTOR, f'script[type="{item}"]')))
+            scripts = driver.find_elements(CSS_SELECTOR, f'script[type="{item}"]')
+
+            for script in scripts:
+                try:         
+                    json_text = script.get_attribute("textContent")
+                    data = json.loads(json_text)
+                    res = find_key_recursive(data, "datePublished") or find_key_recursive(data, "dateCreated")
+                    if res := process_element(res, "json-ld:datePublished"): 
+                        return res
+                            
+                except:
+                    continue
+        except:
+            url_logger.info('webdriverWait/find_element ERROR | url %s | GnewsDate: %s', url, gnews_date_str,
+                            extra={'url': url, 'stage': 'date', 'outcome': 'error'})
+
+    def check_meta(s):
+        try:
+            val = driver.find_element(CSS_SELECTOR, s).get_attribute("content")
+            return process_element(val, f"meta:{s}")
+        except:
+            return None
+
+    def check_selector(sel):
+        try:
+            elements = driver.find_elements(CSS_SELECTOR, sel)
+            for el in elements:
+                if res := process_element(el.get_attribute("datetime"), f"attr:datetime in {sel}"): return res
+                if res := process_element(el.get_attribute("content"), f"attr:content in {sel}"): return res
+                if res := process_element(el.text.strip(), f"text in {sel}"): return res
+        except:
+            return None
+
+    # Порядок по умолчанию: scripts -> meta -> селекторы и классы
+    probes = [(f"json-ld:{item}", partial(check_scripts, item)) for item in js_scripts]
+    probes += [(f"meta:{s}", partial(check_meta, s)) for s in meta_selectors]
+    for item in possible_time_classes + possible_selectors:
+        if not any(c in item for c in ['.', '[', '#']):
+            search_variants = [item, f".{item}"] # и 'time', и '.time'
+        else:
+            search_variants = [item]
+        probes += [(f"css:{sel}", partial(check_selector, sel)) for sel in search_variants]
+    probes = list(dict(probes).items()) # 'time' есть в обоих списках - оставляем первый
+
+    # Выученный профиль домена: источник, который обычно дает дату, проверяем первым
+    domain = get_domain(driver.current_url or url)
+    if profiles is not None:
+        probes, profiled = profiles.order(domain, probes)
+    started = time.perf_counter()
+    for rank, (key, probe) in enumerate(probes):
+        if res := probe():
+            if profiles is not None:
+                profiles.record(domain, key, perfect_source, rank, time.perf_counter() - started, profiled)
+            return res
+    if profiles is not None:
+        profiles.record(domain, None, None, None, time.perf_counter() - started, profiled)
+
+    if fallback_date:
+        missmatched_dates_logger.info("  --> Returned PARTIAL match (no time found).")
+    else:
+        missmatched_dates_logger.info("  [NOT FOUND] No dates found for URL in any source.", extra={'url': url, 'outcome': 'not_found'})
+    return fallback_date
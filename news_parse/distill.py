@@ -0,0 +1,294 @@
+"""
+Компактная замена bart-large-mnli + finbert: линейные головы на эмбеддингах e5 -
+того же энкодера (article_store.INDEX_ENCODER), что дает вектора для FAISS/UMAP.
+
+Учитель - уже посчитанная разметка ноутбука:
+    sberbank_2d_facebook_model_class.csv            - вероятности шести candidate_labels (bart)
+    sberbank_2d_facebook_model_class_with_index.csv - news_index (сентимент finbert, без веса издания)
+Ученик - один проход multilingual-e5-large по summary и две головы на numpy:
+    тема      - softmax регрессия на мягких метках учителя
+    сентимент - ridge регрессия на news_index
+
+Эмбеддинги кешируются (models/embeddings_<encoder>.npz), поэтому переобучение
+голов занимает секунды.
+
+    python distill.py train                 # обучить и показать согласие с учителем на отложенной выборке
+    python distill.py train --encoder intfloat/multilingual-e5-small   # быстрее, но вектора не для индекса
+    python distill.py bench --n 64          # скорость учителя и ученика на CPU
+
+Инференс на этих головах (темы, сентимент и эмбеддинг за один проход) - inference.py,
+в графе этапов - dag.py (classify и sentiment по векторам этапа embed).
+"""
+import argparse, hashlib, json, time
+from pathlib import Path
+
+import numpy as np
+
+from article_store import INDEX_ENCODER
+from indicator import candidate_labels, is_noise
+
+BASE_DIR = Path(__file__).parent
+DATA_DIR = BASE_DIR.parent
+MODELS_DIR = BASE_DIR / 'models'
+HEADS_PATH = MODELS_DIR / 'distilled_heads.npz'
+
+TOPICS_DATASET = DATA_DIR / 'sberbank_2d_facebook_model_class.csv'
+INDEX_DATASET = DATA_DIR / 'sberbank_2d_facebook_model_class_with_index.csv'
+
+ENCODER = INDEX_ENCODER     # головы поверх векторов индекса - отдельный проход энкодера не нужен
+MAX_LENGTH = 256
+BATCH_SIZE = 16
+HOLDOUT = 0.2
+RIDGE_ALPHA = 1.0
+SOFTMAX_L2 = 1e-3
+SOFTMAX_STEPS = 2000
+SOFTMAX_LR = 2.0
+
+
+# --- энкодер ---
+_encoders = {}
+
+def get_encoder(name=ENCODER):
+    """(tokenizer, model) для e5, лениво, один раз на процесс."""
+    if name not in _encoders:
+        import torch
+        from transformers import AutoTokenizer, AutoModel
+        torch.set_grad_enabled(False)
+        tokenizer = AutoTokenizer.from_pretrained(name)
+        model = AutoModel.from_pretrained(name).eval()
+        _encoders[name] = (tokenizer, model)
+    return _encoders[name]
+
+
+def encode(texts, name=ENCODER, batch_size=BATCH_SIZE):
+    """L2-нормированные эмбеддинги e5 (mean pooling, префикс 'query: '), float32 [n, dim]."""
+    import torch
+    tokenizer, model = get_encoder(name)
+    vectors = []
+    for i in range(0, len(texts), batch_size):
+        batch = tokenizer([f"query: {t}" for t in texts[i:i + batch_size]], max_length=MAX_LENGTH,
+                          padding=True, truncation=True, return_tensors='pt')
+        with torch.inference_mode():
+            hidden = model(**batch).last_hidden_state
+        mask = batch['attention_mask'].unsqueeze(-1).to(hidden.dtype)
+        pooled = (hidden * mask).sum(1) / mask.sum(1)
+        vectors.append(torch.nn.functional.normalize(pooled, dim=-1).numpy())
+    return np.concatenate(vectors).astype(np.float32) if vectors else np.zeros((0, 0), np.float32)
+
+
+def _text_key(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+class EmbeddingCache:
+    """Эмбеддинги по sha1 текста в одном npz на энкодер."""
+    def __init__(self, name=ENCODER, root=MODELS_DIR):
+        self.name = name
+        self.path = Path(root) / f"embeddings_{name.replace('/', '__')}.npz"
+        self.vectors = {}
+        if self.path.exists():
+            data = np.load(self.path)
+            self.vectors = dict(zip(data['keys'].tolist(), data['vectors']))
+
+    def get(self, texts):
+        keys = [_text_key(t) for t in texts]
+        missing = list({k: t for k, t in zip(keys, texts) if k not in self.vectors}.items())
+        if missing:
+            for (k, _), v in zip(missing, encode([t for _, t in missing], self.name)):
+                self.vectors[k] = v
+        return np.stack([self.vectors[k] for k in keys])
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        keys = list(self.vectors)
+        np.savez(self.path, keys=np.array(keys), vectors=np.stack([self.vectors[k] for k in keys]))
+
+
+# --- головы ---
+def _softmax(z):
+    z = z - z.max(axis=1, keepdims=True)
+    e = np.exp(z)
+    return e / e.sum(axis=1, keepdims=True)
+
+
+def fit_softmax(X, P, l2=SOFTMAX_L2, steps=SOFTMAX_STEPS, lr=SOFTMAX_LR):
+    """Softmax регрессия с мягкими метками P (строки - распределения). Возвращает (W, b)."""
+    n, d = X.shape
+    W = np.zeros((d, P.shape[1]), np.float64)
+    b = np.log(P.mean(axis=0) + 1e-9)
+    for _ in range(steps):
+        G = (_softmax(X @ W + b) - P) / n
+        W -= lr * (X.T @ G + l2 * W)
+        b -= lr * G.sum(axis=0)
+    return W.astype(np.float32), b.astype(np.float32)
+
+
+def fit_ridge(X, y, alpha=RIDGE_ALPHA):
+    """Ridge регрессия в замкнутом виде. Возвращает (w, b)."""
+    mean_x, mean_y = X.mean(axis=0), y.mean()
+    Xc = X - mean_x
+    w = np.linalg.solve(Xc.T @ Xc + alpha * np.eye(X.shape[1]), Xc.T @ (y - mean_y))
+    return w.astype(np.float32), np.float32(mean_y - mean_x @ w)
+
+
+class DistilledHeads:
+    """Головы темы и сентимента поверх эмбеддингов одного энкодера."""
+    def __init__(self, encoder, topic_W, topic_b, sent_w, sent_b):
+        self.encoder = encoder
+        self.topic_W, self.topic_b = topic_W, topic_b
+        self.sent_w, self.sent_b = sent_w, sent_b
+
+    def topics(self, X):
+        return _softmax(X @ self.topic_W + self.topic_b)
+
+    def sentiment(self, X):
+        return np.clip(X @ self.sent_w + self.sent_b, 0.0, 1.0)
+
+    def save(self, path=HEADS_PATH):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        np.savez(path, encoder=self.encoder, labels=np.array(candidate_labels), topic_W=self.topic_W,
+                 topic_b=self.topic_b, sent_w=self.sent_w, sent_b=self.sent_b)
+
+    @classmethod
+    def load(cls, path=HEADS_PATH):
+        data = np.load(path)
+        if data['labels'].tolist() != candidate_labels:
+            raise ValueError(f"Головы {path} обучены на других candidate_labels")
+        return cls(str(data['encoder']), data['topic_W'], data['topic_b'], data['sent_w'], data['sent_b'])
+
+
+def load_teacher_labels(topics_path=TOPICS_DATASET, index_path=INDEX_DATASET):
+    """summary, вероятности тем [n, 6] и news_index (NaN для шумовых) из csv ноутбука."""
+    import pandas as pd
+    df = pd.read_csv(topics_path).dropna(subset=['summary'])
+    df = df[df['summary'].str.len() > 20].drop_duplicates('url')
+    if Path(index_path).exists():
+        index = pd.read_csv(index_path).drop_duplicates('url').set_index('url')['news_index']
+        df['news_index'] = df['url'].map(index)
+    P = df[candidate_labels].to_numpy(np.float64)
+    P = P / P.sum(axis=1, keepdims=True)
+    return df['summary'].tolist(), P, df.get('news_index', pd.Series(np.nan, index=df.index)).to_numpy(np.float64)
+
+
+def agreement_report(heads, X, P, y):
+    """Согласие ученика с учителем: top-1 тема, MAE вероятностей, решение is_noise, сентимент."""
+    Q = heads.topics(X)
+    noise_teacher = [is_noise(dict(zip(candidate_labels, p))) for p in P]
+    noise_student = [is_noise(dict(zip(candidate_labels, q))) for q in Q]
+    report = {
+        'rows': len(X),
+        'top1_agreement': float((P.argmax(1) == Q.argmax(1)).mean()),
+        'topic_mae': float(np.abs(P - Q).mean()),
+        'noise_agreement': float(np.mean(np.array(noise_teacher) == np.array(noise_student))),
+    }
+    has_y = ~np.isnan(y)
+    if has_y.sum() > 1:
+        pred = heads.sentiment(X[has_y])
+        report['sentiment_rows'] = int(has_y.sum())
+        report['sentiment_mae'] = float(np.abs(pred - y[has_y]).mean())
+        report['sentiment_corr'] = float(np.corrcoef(pred, y[has_y])[0, 1])
+    return report
+
+
+def train(encoder=ENCODER, seed=42):
+    """Обучает головы на разметке ноутбука. Возвращает (heads, отчет на отложенной выборке)."""
+    texts, P, y = load_teacher_labels()
+    cache = EmbeddingCache(encoder)
+    X = cache.get(texts).astype(np.float64)
+    cache.save()
+
+    order = np.random.default_rng(seed).permutation(len(texts))
+    n_test = int(len(texts) * HOLDOUT)
+    test, fit = order[:n_test], order[n_test:]
+    fit_y = fit[~np.isnan(y[fit])]
+
+    topic_W, topic_b = fit_softmax(X[fit], P[fit])
+    sent_w, sent_b = fit_ridge(X[fit_y], y[fit_y])
+    heads = DistilledHeads(encoder, topic_W, topic_b, sent_w, sent_b)
+    report = agreement_report(heads, X[test].astype(np.float32), P[test], y[test])
+
+    # финальные головы - на всех данных
+    all_y = ~np.isnan(y)
+    heads.topic_W, heads.topic_b = fit_softmax(X, P)
+    heads.sent_w, heads.sent_b = fit_ridge(X[all_y], y[all_y])
+    heads.save()
+    return heads, report
+
+
+# --- инференс ---
+_heads = None
+
+def get_heads():
+    global _heads
+    if _heads is None:
+        _heads = DistilledHeads.load()
+    return _heads
+
+
+def predict(texts, heads=None):
+    """Темы и сентимент для пачки summary одним проходом энкодера."""
+    heads = heads or get_heads()
+    X = encode(texts, heads.encoder)
+    return [
+        {'topics': dict(zip(candidate_labels, map(float, q))), 'sentiment': float(s)}
+        for q, s in zip(heads.topics(X), heads.sentiment(X))
+    ]
+
+
+def benchmark(n=64, with_teacher=True):
+    """
+    Статей в секунду на CPU: учитель (bart zero-shot + finbert) и ученик (e5 + головы).
+    Обе модели учителя получают те же summary теми же пачками, без LexRank
+    из calculate_market_index - сравниваются только модели.
+    """
+    import torch
+    from indicator import classify_summaries, get_indicator_pipe
+    texts, _, _ = load_teacher_labels()
+    texts = texts[:n]
+    result = {'n': len(texts), 'threads': torch.get_num_threads()}
+
+    heads = get_heads()
+    predict(texts[:2], heads) # прогрев и загрузка модели вне замера
+    started = time.perf_counter()
+    predict(texts, heads)
+    result['student_per_sec'] = len(texts) / (time.perf_counter() - started)
+
+    if with_teacher:
+        sentiment = get_indicator_pipe()
+        classify_summaries(texts[:2], batch_size=BATCH_SIZE)
+        sentiment(texts[:2], top_k=None, truncation=True, batch_size=BATCH_SIZE)
+        started = time.perf_counter()
+        for i in range(0, len(texts), BATCH_SIZE):
+            classify_summaries(texts[i:i + BATCH_SIZE], batch_size=BATCH_SIZE)
+        topics_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        for i in range(0, len(texts), BATCH_SIZE):
+            sentiment(texts[i:i + BATCH_SIZE], top_k=None, truncation=True, batch_size=BATCH_SIZE)
+        sentiment_seconds = time.perf_counter() - started
+        result['teacher_topics_per_sec'] = len(texts) / topics_seconds
+        result['teacher_sentiment_per_sec'] = len(texts) / sentiment_seconds
+        result['teacher_per_sec'] = len(texts) / (topics_seconds + sentiment_seconds)
+        result['speedup'] = result['student_per_sec'] / result['teacher_per_sec']
+    return result
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Дистилляция bart/finbert в головы на e5")
+    sub = arg_parser.add_subparsers(dest='command', required=True)
+    train_parser = sub.add_parser('train')
+    train_parser.add_argument('--encoder', default=ENCODER)
+    bench_parser = sub.add_parser('bench')
+    bench_parser.add_argument('--n', type=int, default=64)
+    bench_parser.add_argument('--no-teacher', action='store_true')
+    args = arg_parser.parse_args()
+
+    if args.command == 'train':
+        started = time.perf_counter()
+        _, report = train(args.encoder)
+        print(f"Головы сохранены в {HEADS_PATH} ({time.perf_counter() - started:.1f} сек)")
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        print(json.dumps(benchmark(args.n, not args.no_teacher), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Здоровье доменов: адаптивные таймауты и circuit breaker.
+
+По каждому домену копим время успешных загрузок и считаем таймаут как
+p95 * TIMEOUT_FACTOR (в пределах MIN_TIMEOUT..MAX_TIMEOUT). После
+FAILURE_THRESHOLD неудач подряд (таймаут, renderer timeout, стена
+сертификата Минцифры, пустой или короткий текст) домен "открывается" и
+пропускается COOLDOWN секунд, затем одна пробная загрузка (half-open):
+успех закрывает circuit, неудача открывает снова с удвоенной паузой.
+Если проба за PROBE_TIMEOUT так и не дала результата (статья отсеялась
+по пути, процесс упал), разрешается следующая.
+
+Все решения о пропуске пишутся в logs/domain_health.log с причиной.
+"""
+import json, threading, time
+from collections import deque
+from pathlib import Path
+
+from loggers import health_logger
+
+BASE_DIR = Path(__file__).parent
+HEALTH_PATH = BASE_DIR / 'domain_health.json'
+
+DEFAULT_TIMEOUT = 10    # как было в init_driver
+MIN_TIMEOUT = 5
+MAX_TIMEOUT = 30
+TIMEOUT_FACTOR = 1.5
+MIN_SAMPLES = 5         # меньше замеров - таймаут по умолчанию
+LATENCY_SAMPLES = 50
+
+FAILURE_THRESHOLD = 3
+COOLDOWN = 30 * 60      # секунд до пробной загрузки
+MAX_COOLDOWN = 6 * 60 * 60
+PROBE_TIMEOUT = 5 * 60  # секунд ждем результата пробной загрузки, потом пускаем новую
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+
+def _new_state():
+    return {'latencies': deque(maxlen=LATENCY_SAMPLES), 'failures': 0, 'state': CLOSED,
+            'opened_at': None, 'probe_at': None, 'cooldown': COOLDOWN, 'reason': None, 'skipped': 0}
+
+
+class DomainHealth:
+    """path=None - состояние только в памяти (replay в benchmark.py)."""
+    def __init__(self, path=HEALTH_PATH):
+        self.path = Path(path) if path else None
+        self._lock = threading.Lock()
+        self.domains = {}
+        if self.path and self.path.exists():
+            for domain, saved in json.loads(self.path.read_text(encoding='utf-8')).items():
+                state = _new_state()
+                state.update(saved)
+                state['latencies'] = deque(saved.get('latencies', []), maxlen=LATENCY_SAMPLES)
+                self.domains[domain] = state
+
+    def _get(self, domain):
+        state = self.domains.get(domain)
+        if state is None:
+            state = self.domains[domain] = _new_state()
+        return state
+
+    def timeout_for(self, domain):
+        with self._lock:
+            latencies = sorted(self._get(domain)['latencies'])
+        if len(latencies) < MIN_SAMPLES:
+            return DEFAULT_TIMEOUT
+        p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+        return round(min(MAX_TIMEOUT, max(MIN_TIMEOUT, p95 * TIMEOUT_FACTOR)), 1)
+
+    def allow(self, domain, url=None):
+        """Можно ли сейчас грузить домен. Возвращает (bool, причина пропуска)."""
+        with self._lock:
+            state = self._get(domain)
+            if state['state'] == CLOSED:
+                return True, None
+            now = time.time()
+            if state['state'] == OPEN and now - state['opened_at'] >= state['cooldown']:
+                state.update(state=HALF_OPEN, probe_at=now)
+                health_logger.info("PROBE | %s | пробная загрузка после паузы %s сек | %s", domain, state['cooldown'], url)
+                return True, None
+            if state['state'] == HALF_OPEN and (state['probe_at'] is None or now - state['probe_at'] >= PROBE_TIMEOUT):
+                state['probe_at'] = now
+                health_logger.info("PROBE | %s | нет результата пробной загрузки за %s сек, новая проба | %s", domain, PROBE_TIMEOUT, url)
+                return True, None
+            if state['state'] == HALF_OPEN:
+                # пробная загрузка уже идет - остальные страницы домена ждут ее результата
+                reason = f"ожидается результат пробной загрузки ({state['reason']})"
+            else:
+                left = int(state['cooldown'] - (now - state['opened_at']))
+                reason = f"circuit open: {state['reason']}, {state['failures']} неудач подряд, повтор через {left} сек"
+            state['skipped'] += 1
+        health_logger.info("SKIP | %s | %s | %s", domain, reason, url)
+        return False, reason
+
+    def retry_after(self, domain):
+        """Секунд до того, как allow пустит домен (0 - уже можно)."""
+        with self._lock:
+            state = self._get(domain)
+            now = time.time()
+            if state['state'] == OPEN:
+                return max(0, state['cooldown'] - (now - state['opened_at']))
+            if state['state'] == HALF_OPEN and state['probe_at'] is not None:
+                return max(0, PROBE_TIMEOUT - (now - state['probe_at']))
+            return 0
+
+    def record_success(self, domain, seconds=None):
+        """seconds=None - страница пришла без загрузки (html из ленты): circuit закрывается, замера нет."""
+        with self._lock:
+            state = self._get(domain)
+            if seconds is not None:
+                state['latencies'].append(round(seconds, 3))
+            if state['state'] != CLOSED:
+                if seconds is None:
+                    health_logger.info("CLOSE | %s | страница домена пришла из ленты", domain)
+                else:
+                    health_logger.info("CLOSE | %s | домен снова отвечает за %.1f сек", domain, seconds)
+            state.update(failures=0, state=CLOSED, opened_at=None, probe_at=None, cooldown=COOLDOWN, reason=None)
+
+    def record_failure(self, domain, reason):
+        with self._lock:
+            state = self._get(domain)
+            state['failures'] += 1
+            state['reason'] = reason
+            if state['state'] == HALF_OPEN:
+                state['cooldown'] = min(MAX_COOLDOWN, state['cooldown'] * 2)
+            elif state['failures'] < FAILURE_THRESHOLD:
+                return
+            state.update(state=OPEN, opened_at=time.time(), probe_at=None)
+            failures, cooldown = state['failures'], state['cooldown']
+        health_logger.info("OPEN | %s | %s | %s неудач подряд, пауза %s сек", domain, reason, failures, cooldown)
+
+    def save(self):
+        if self.path is None:
+            return
+        with self._lock:
+            data = {domain: {**state, 'latencies': list(state['latencies'])} for domain, state in self.domains.items()}
+        self.path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding='utf-8')
+
+    def report(self):
+        with self._lock:
+            domains = list(self.domains)
+        return [
+            {'domain': d, 'state': self.domains[d]['state'], 'failures': self.domains[d]['failures'],
+             'reason': self.domains[d]['reason'], 'skipped': self.domains[d]['skipped'], 'timeout': self.timeout_for(d)}
+            for d in domains
+        ]
+
+
+domain_health = DomainHealth()
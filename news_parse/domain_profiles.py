@@ -0,0 +1,133 @@
+"""
+Выученные профили извлечения даты по доменам.
+
+Каждое издание почти всегда отдает дату в одном и том же месте. Профиль
+запоминает, какой источник (json-ld, meta селектор, css селектор и что
+именно - атрибут datetime/content или текст) дал "perfect" совпадение, и
+на следующих страницах домена extract_page_date проверяет его первым.
+
+Профили лежат в domain_profiles.json. Отчет по доменам:
+
+    python domain_profiles.py
+"""
+import copy, json, threading
+from pathlib import Path
+from urllib.parse import urlparse
+
+BASE_DIR = Path(__file__).parent
+PROFILES_PATH = BASE_DIR / 'domain_profiles.json'
+
+
+def get_domain(url):
+    return urlparse(url).netloc if url else ''
+
+
+def _empty_profile():
+    return {
+        'pages': 0,             # сколько страниц домена прошло через extract_page_date
+        'perfect': 0,           # из них с perfect совпадением
+        'first_try': 0,         # perfect найден первым же проверенным источником
+        'probes': {},           # ключ проверки -> число perfect совпадений
+        'sources': {},          # подробный источник (attr/text/json-ld) -> число совпадений
+        'default_runs': 0, 'default_time': 0.0,     # прогоны в порядке по умолчанию
+        'profiled_runs': 0, 'profiled_time': 0.0,   # прогоны в выученном порядке
+    }
+
+
+class DomainProfiles:
+    """path=None - профили только в памяти (replay в benchmark.py, процесс пула разбора)."""
+    def __init__(self, path=PROFILES_PATH):
+        self.path = Path(path) if path else None
+        self._lock = threading.Lock()
+        self.data = {}
+        self.journal = None     # список, если record нужно повторить в другом процессе (news_parse.parse_task)
+        if self.path and self.path.exists():
+            self.data = json.loads(self.path.read_text(encoding='utf-8'))
+
+    def order(self, domain, probes):
+        """
+        probes - список (ключ, функция) в порядке по умолчанию.
+        Возвращает (probes в выученном порядке, был ли порядок изменен профилем).
+        """
+        with self._lock:
+            hits = dict(self.data.get(domain, {}).get('probes', {}))
+        if not hits:
+            return probes, False
+        # сортировка устойчивая: источники без попаданий остаются в исходном порядке
+        return sorted(probes, key=lambda probe: -hits.get(probe[0], 0)), True
+
+    def record(self, domain, probe_key, source, rank, elapsed, profiled):
+        """Результат одного вызова extract_page_date. probe_key=None - perfect не найден."""
+        if self.journal is not None:
+            self.journal.append((domain, probe_key, source, rank, elapsed, profiled))
+        with self._lock:
+            profile = self.data.setdefault(domain, _empty_profile())
+            profile['pages'] += 1
+            if profiled:
+                profile['profiled_runs'] += 1
+                profile['profiled_time'] += elapsed
+            else:
+                profile['default_runs'] += 1
+                profile['default_time'] += elapsed
+            if probe_key is None:
+                return
+            profile['perfect'] += 1
+            profile['first_try'] += rank == 0
+            profile['probes'][probe_key] = profile['probes'].get(probe_key, 0) + 1
+            profile['sources'][source] = profile['sources'].get(source, 0) + 1
+
+    def profile(self, domain):
+        """Копия профиля домена (или None) - для передачи в процесс пула."""
+        with self._lock:
+            return copy.deepcopy(self.data.get(domain))
+
+    def merge(self, hits):
+        """Повторить record из журнала процесса пула."""
+        for hit in hits:
+            self.record(*hit)
+
+    def save(self):
+        if self.path is None:
+            return
+        with self._lock:
+            text = json.dumps(self.data, ensure_ascii=False, indent=2)
+        self.path.write_text(text, encoding='utf-8')
+
+    def report(self):
+        """Доля perfect, доля попаданий с первой попытки и сэкономленное время по доменам."""
+        rows = []
+        with self._lock:
+            items = list(self.data.items())
+        for domain, p in items:
+            default_avg = p['default_time'] / p['default_runs'] if p['default_runs'] else None
+            profiled_avg = p['profiled_time'] / p['profiled_runs'] if p['profiled_runs'] else None
+            saved = (default_avg - profiled_avg) * p['profiled_runs'] if default_avg is not None and profiled_avg is not None else None
+            top_source = max(p['sources'], key=p['sources'].get) if p['sources'] else None
+            rows.append({
+                'domain': domain,
+                'pages': p['pages'],
+                'perfect_rate': p['perfect'] / p['pages'] if p['pages'] else 0.0,
+                'first_try_rate': p['first_try'] / p['perfect'] if p['perfect'] else 0.0,
+                'top_source': top_source,
+                'avg_time_default': default_avg,
+                'avg_time_profiled': profiled_avg,
+                'time_saved_sec': saved,
+            })
+        return sorted(rows, key=lambda r: -r['pages'])
+
+
+domain_profiles = DomainProfiles()
+
+
+def main():
+    import pandas as pd
+    report = pd.DataFrame(domain_profiles.report())
+    if report.empty:
+        print("Профилей пока нет")
+        return
+    pd.set_option('display.width', 200)
+    print(report.to_string(index=False))
+    print(f"\nВсего сэкономлено: {report['time_saved_sec'].fillna(0).sum():.3f} сек")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Запуск Chrome: обычный headless (init_driver) и stealth (init_stealth_driver).
+
+selenium и undetected_chromedriver импортируются только при запуске браузера.
+Путь к chromedriver берется из кеша без обращения к сети: переменная
+CHROMEDRIVER_PATH, сохраненный путь в .chromedriver_path или уже скачанный
+webdriver_manager драйвер в ~/.wdm. ChromeDriverManager().install() (с сетью)
+вызывается, только если локально драйвера нет совсем.
+"""
+import os
+from pathlib import Path
+
+from browser_profiles import DEFAULT_PROFILE, configure_options, apply_blocking
+
+BASE_DIR = Path(__file__).parent
+CHROMEDRIVER_CACHE = BASE_DIR / '.chromedriver_path'
+WDM_DIR = Path.home() / '.wdm' / 'drivers' / 'chromedriver'
+
+
+def chromedriver_path():
+    """Путь к chromedriver без сети, если он уже есть локально."""
+    env_path = os.environ.get('CHROMEDRIVER_PATH')
+    if env_path and Path(env_path).exists():
+        return env_path
+    if CHROMEDRIVER_CACHE.exists():
+        cached = CHROMEDRIVER_CACHE.read_text(encoding='utf-8').strip()
+        if Path(cached).exists():
+            return cached
+    if WDM_DIR.exists():
+        found = [p for p in WDM_DIR.rglob('chromedriver*') if p.is_file() and p.suffix in ('', '.exe')]
+        if found:
+            path = str(max(found, key=lambda p: p.stat().st_mtime))
+            CHROMEDRIVER_CACHE.write_text(path, encoding='utf-8')
+            return path
+    from webdriver_manager.chrome import ChromeDriverManager
+    path = ChromeDriverManager().install()
+    CHROMEDRIVER_CACHE.write_text(path, encoding='utf-8')
+    return path
+
+def init_driver(profile=DEFAULT_PROFILE):
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+    from selenium.webdriver.chrome.options import Options
+
+    chrome_options = Options()
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--headless=new")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--ignore-certificate-errors")
+    chrome_options.add_argument("--allow-insecure-localhost")
+    chrome_options.add_argument("--ignore-ssl-errors=yes")
+    chrome_options.add_argument("--disable-blink-features=AutomationControlled")
+    chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36")
+    configure_options(chrome_options, profile) # eager загрузка + performance лог для учета
+    prefs = {
+        "profile.managed_default_content_settings.images": 2, # 2 = блокировать
+        "profile.default_content_settings.ads": 2,
+    }
+    chrome_options.add_experimental_option("prefs", prefs)
+    service = Service(chromedriver_path())
+    driver = webdriver.Chrome(service=service, options=chrome_options)
+    driver.set_page_load_timeout(10)
+    apply_blocking(driver, profile)
+    return driver
+
+def init_stealth_driver(profile=DEFAULT_PROFILE):
+    import undetected_chromedriver as uc
+
+    options = uc.ChromeOptions()
+    configure_options(options, profile)
+
+    options.add_argument("--disable-blink-features=AutomationControlled")
+
+    options.add_argument("--window-position=3200,0") 
+    options.add_argument("--window-size=1280,600")
+
+    driver = uc.Chrome(options=options, version_main=145)
+    apply_blocking(driver, profile)
+    return driver
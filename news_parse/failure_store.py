@@ -0,0 +1,303 @@
+"""
+Хранилище неудачных статей (SQLite) и точечный перезапуск.
+
+fetch_with_selenium пишет сюда каждую статью, которую не удалось обработать:
+URL, домен, окно поиска, этап (load / trafilatura / date), код причины и
+тип исключения. Повторная удачная обработка помечает запись решенной.
+
+Коды причин:
+    timeout, renderer_timeout, webdriver_error, error, skipped - временные, их можно повторить
+    cert_wall, blocked, short, no_date - проблема в самой странице, повтор не поможет
+
+    python failure_store.py                      # сводка по причинам и доменам
+    python failure_store.py retry --workers 4    # повторить временные неудачи
+
+retry берет только записи, у которых подошло время следующей попытки
+(первая - сразу, дальше BASE_BACKOFF * 2^(попыток-2)). Домен с открытым circuit breaker
+(domain_health.py) попыткой не считается ни в retry, ни в fetch_with_selenium: запись
+откладывается до конца паузы домена.
+Html берется из офлайн корпусов, если страница там сохранена, и только иначе
+открывается браузер - по одному на поток.
+Успешные строки дописываются в retried_news.csv.
+"""
+import argparse, sqlite3, threading, time
+from datetime import datetime, timezone
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent
+FAILURES_PATH = BASE_DIR / 'failures.db'
+RETRY_OUTPUT = BASE_DIR / 'retried_news.csv'
+
+RETRYABLE = {'timeout', 'renderer_timeout', 'webdriver_error', 'error', 'skipped'}
+MAX_ATTEMPTS = 5
+BASE_BACKOFF = 10 * 60      # секунд после первой неудачи
+MAX_BACKOFF = 24 * 60 * 60
+
+COLUMNS = {
+    'url': 'TEXT PRIMARY KEY',  # ссылка GNews
+    'decoded_url': 'TEXT',
+    'domain': 'TEXT',
+    'keyword': 'TEXT',
+    'window_start': 'TEXT',
+    'window_end': 'TEXT',
+    'title': 'TEXT',
+    'gnews_date': 'TEXT',
+    'stage': 'TEXT',            # load / trafilatura / date
+    'reason': 'TEXT',           # код причины, см. выше
+    'error_type': 'TEXT',       # класс исключения, если было
+    'error_message': 'TEXT',
+    'attempts': 'INTEGER',
+    'first_failed_at': 'TEXT',
+    'last_failed_at': 'TEXT',
+    'next_retry_at': 'REAL',    # unix time
+    'resolved': 'INTEGER',
+}
+
+
+def _backoff(attempts):
+    """Пауза до следующей попытки: первую неудачу можно повторить сразу после прогона."""
+    if attempts <= 1:
+        return 0
+    return min(MAX_BACKOFF, BASE_BACKOFF * 2 ** (attempts - 2))
+
+
+class FailureStore:
+    def __init__(self, path=FAILURES_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("CREATE TABLE IF NOT EXISTS failures (url TEXT PRIMARY KEY)")
+        existing = {row[1] for row in self._conn.execute("PRAGMA table_info(failures)")}
+        for name, sql_type in COLUMNS.items():
+            if name not in existing:
+                self._conn.execute(f"ALTER TABLE failures ADD COLUMN {name} {sql_type.replace(' PRIMARY KEY', '')}")
+        self._conn.commit()
+        # открытые неудачи в памяти, чтобы на каждую удачную статью не ходить в базу
+        self._open = {row[0] for row in self._conn.execute("SELECT url FROM failures WHERE NOT resolved")}
+
+    def record(self, url, item=None, decoded_url=None, domain=None, keyword=None, window=None,
+               stage='load', reason='error', exc=None, delay=None):
+        """
+        Неудача по статье. window - (start, end) окна поиска, item - запись GNews.
+        delay - статью пропустили, не открывая (circuit breaker): попытка не засчитывается,
+        повтор через delay секунд вместо обычной паузы.
+        """
+        attempt = 0 if delay is not None else 1
+        item = item or {}
+        now = datetime.now(timezone.utc).isoformat()
+        start, end = window or (None, None)
+        values = {
+            'url': url, 'decoded_url': decoded_url, 'domain': domain, 'keyword': keyword,
+            'window_start': f"{start:%Y-%m-%d}" if start else None,
+            'window_end': f"{end:%Y-%m-%d}" if end else None,
+            'title': item.get('title'), 'gnews_date': item.get('published date'),
+            'stage': stage, 'reason': reason,
+            'error_type': type(exc).__name__ if exc is not None else None,
+            'error_message': str(exc)[:500] if exc is not None else None,
+            'first_failed_at': now, 'last_failed_at': now,
+        }
+        cols = ', '.join(values)
+        marks = ', '.join('?' for _ in values)
+        # first_failed_at и окно при повторной неудаче не трогаем
+        updates = ', '.join(f"{k} = coalesce(excluded.{k}, {k})" for k in values
+                            if k not in ('url', 'first_failed_at', 'window_start', 'window_end', 'keyword'))
+        with self._lock:
+            self._conn.execute(
+                f"INSERT INTO failures ({cols}, attempts, resolved) VALUES ({marks}, {attempt}, 0) "
+                f"ON CONFLICT(url) DO UPDATE SET {updates}, attempts = attempts + {attempt}, resolved = 0",
+                list(values.values())
+            )
+            attempts = self._conn.execute("SELECT attempts FROM failures WHERE url = ?", (url,)).fetchone()[0]
+            wait = delay if delay is not None else _backoff(attempts)
+            self._conn.execute("UPDATE failures SET next_retry_at = ? WHERE url = ?", (time.time() + wait, url))
+            self._conn.commit()
+            self._open.add(url)
+
+    def postpone(self, url, next_retry_at):
+        """Отложить повтор без новой попытки (например, домен на паузе у circuit breaker)."""
+        with self._lock:
+            self._conn.execute("UPDATE failures SET next_retry_at = ? WHERE url = ?", (next_retry_at, url))
+            self._conn.commit()
+
+    def resolve(self, url):
+        """Статья обработана - если по ней была неудача, закрываем."""
+        if url not in self._open:
+            return
+        with self._lock:
+            self._conn.execute("UPDATE failures SET resolved = 1 WHERE url = ?", (url,))
+            self._conn.commit()
+            self._open.discard(url)
+
+    def due(self, reasons=RETRYABLE, max_attempts=MAX_ATTEMPTS, now=None):
+        """Нерешенные неудачи с временными причинами, для которых подошло время повтора."""
+        marks = ', '.join('?' for _ in reasons)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT * FROM failures WHERE NOT resolved AND reason IN ({marks}) "
+                f"AND attempts < ? AND next_retry_at <= ? ORDER BY next_retry_at",
+                [*reasons, max_attempts, now or time.time()]
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def summary(self):
+        """Число нерешенных неудач по (этап, причина) и самые проблемные домены."""
+        with self._lock:
+            by_reason = self._conn.execute(
+                "SELECT stage, reason, count(*) AS n FROM failures WHERE NOT resolved GROUP BY stage, reason ORDER BY n DESC"
+            ).fetchall()
+            by_domain = self._conn.execute(
+                "SELECT domain, count(*) AS n FROM failures WHERE NOT resolved GROUP BY domain ORDER BY n DESC LIMIT 20"
+            ).fetchall()
+        return [dict(r) for r in by_reason], [dict(r) for r in by_domain]
+
+    def load(self, resolved=False):
+        import pandas as pd
+        with self._lock:
+            return pd.read_sql_query("SELECT * FROM failures WHERE resolved = ?", self._conn, params=(int(resolved),))
+
+    def close(self):
+        self._conn.close()
+
+
+failure_store = FailureStore()
+
+
+def _cached_html(corpora, decoded_url):
+    """html и итоговый URL из любого корпуса, где страница сохранена."""
+    for corpus in corpora:
+        rec = corpus.by_url.get(decoded_url)
+        if rec and rec['outcome'] == 'ok':
+            html = corpus.html(decoded_url)
+            if html:
+                return html, rec.get('final_url') or decoded_url
+    return None, None
+
+
+def retry(store=failure_store, workers=4, corpora=(), reasons=RETRYABLE, output=RETRY_OUTPUT):
+    """
+    Повторная обработка временных неудач в workers потоков.
+    Возвращает (число восстановленных статей, число повторных неудач).
+    """
+    import pandas as pd
+    from concurrent.futures import ThreadPoolExecutor
+    from selenium.common.exceptions import TimeoutException, WebDriverException
+    from news_parse import decode_url, load_page, process_page
+    from article import to_frame, append_articles
+    from domain_health import domain_health
+    from drivers import init_stealth_driver
+    from static_page import StaticPage
+
+    pending = store.due(reasons)
+    if not pending:
+        return 0, 0
+    local = threading.local()
+    drivers = []
+    drivers_lock = threading.Lock()
+
+    def get_driver():
+        # браузер на поток поднимаем, только когда без него не обойтись
+        if getattr(local, 'driver', None) is None:
+            local.driver = init_stealth_driver()
+            with drivers_lock:
+                drivers.append(local.driver)
+        return local.driver
+
+    def retry_one(rec):
+        url = rec['url']
+        decoded_url = rec['decoded_url'] or decode_url(url)
+        domain = rec['domain']
+        window = tuple(datetime.strptime(d, '%Y-%m-%d') for d in (rec['window_start'], rec['window_end'])) if rec['window_start'] else None
+        item = {'url': url, 'title': rec['title'], 'published date': rec['gnews_date']}
+        failure = dict(item=item, decoded_url=decoded_url, domain=domain, keyword=rec['keyword'], window=window)
+        html, final_url = _cached_html(corpora, decoded_url)
+        try:
+            if html is not None:
+                driver = StaticPage(html, final_url)
+            else:
+                allowed, reason = domain_health.allow(domain, url)
+                if not allowed:
+                    # страницу даже не открывали - попытку не тратим, ждем паузу домена
+                    store.postpone(url, time.time() + domain_health.retry_after(domain))
+                    return None
+                driver = get_driver()
+                driver.set_page_load_timeout(domain_health.timeout_for(domain))
+                started = time.perf_counter()
+                load_page(driver, url, decoded_url)
+                load_seconds = time.perf_counter() - started
+            row, outcome = process_page(driver, url, item)
+        except TimeoutException as e:
+            domain_health.record_failure(domain, 'timeout')
+            store.record(url, stage='load', reason='timeout', exc=e, **failure)
+            return None
+        except WebDriverException as e:
+            reason = 'renderer_timeout' if "Timed out receiving message from renderer" in str(e) else 'webdriver_error'
+            domain_health.record_failure(domain, reason)
+            store.record(url, stage='load', reason=reason, exc=e, **failure)
+            return None
+        except Exception as e:
+            domain_health.record_failure(domain, 'error')
+            store.record(url, stage='load', reason='error', exc=e, **failure)
+            return None
+        if row is None:
+            domain_health.record_failure(domain, outcome)
+            store.record(url, stage='trafilatura', reason=outcome, **failure)
+            return None
+        if html is None:
+            domain_health.record_success(domain, load_seconds)
+        if outcome == 'no_date':
+            store.record(url, stage='date', reason='no_date', **failure)
+        else:
+            store.resolve(url)
+        return row
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            rows = [row for row in pool.map(retry_one, pending) if row]
+    finally:
+        for driver in drivers:
+            driver.quit()
+        domain_health.save()
+
+    if rows:
+        append_articles(to_frame(rows), output)
+    return len(rows), len(pending) - len(rows)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Неудачные статьи: сводка и точечный перезапуск")
+    sub = arg_parser.add_subparsers(dest='command')
+    retry_parser = sub.add_parser('retry', help="повторить временные неудачи")
+    retry_parser.add_argument('--workers', type=int, default=4)
+    retry_parser.add_argument('--corpus', action='append', default=None,
+                              help="корпус с сохраненным html (можно несколько); по умолчанию все из corpus/")
+    retry_parser.add_argument('--reasons', default=','.join(sorted(RETRYABLE)))
+    args = arg_parser.parse_args()
+
+    if args.command == 'retry':
+        from corpus import Corpus, CORPUS_DIR
+        names = args.corpus if args.corpus is not None else (
+            [p.name for p in CORPUS_DIR.iterdir() if p.is_dir()] if CORPUS_DIR.exists() else [])
+        corpora = [Corpus(name, mode='replay') for name in names]
+        started = time.perf_counter()
+        recovered, failed = retry(workers=args.workers, corpora=corpora, reasons=set(args.reasons.split(',')))
+        print(f"Восстановлено: {recovered}, снова неудачно: {failed}, за {time.perf_counter() - started:.1f} сек")
+        if recovered:
+            print(f"Строки дописаны в {RETRY_OUTPUT}")
+        return
+
+    by_reason, by_domain = failure_store.summary()
+    if not by_reason:
+        print("Нерешенных неудач нет")
+        return
+    print("Этап / причина:")
+    for r in by_reason:
+        mark = '' if r['reason'] in RETRYABLE else '  (не повторяется)'
+        print(f"  {r['stage']:12s} {r['reason']:18s} {r['n']:6d}{mark}")
+    print("\nДомены:")
+    for r in by_domain:
+        print(f"  {r['domain']:40s} {r['n']:6d}")
+    print(f"\nГотово к повтору сейчас: {len(failure_store.due())}")
+
+if __name__ == "__main__":
+    main()
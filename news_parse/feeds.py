@@ -0,0 +1,265 @@
+"""
+Статьи из RSS / Atom лент и новостных sitemap изданий с большим весом.
+
+Через GNews до этих изданий доходим поиском, gnewsdecoder, загрузкой в
+браузере и эвристиками даты. У ленты есть точное время публикации, а у
+части лент (yandex:full-text, content:encoded) - и полный текст, тогда
+страницу вообще не грузим.
+
+Ленты опрашиваются условным GET (ETag / If-Modified-Since из feeds_state.json):
+неизменившаяся лента - это ответ 304 без тела. Ответ разбирается потоково
+(iterparse), записи фильтруются по тикерам (tickers.py) или ключевым словам
+и отдаются в формате GNews, так что дальше идут тем же путем:
+fetch_with_selenium(results=...) или live_service.py --feeds.
+
+Запись ленты помечена 'feed': process_page берет дату из ленты и не ищет ее
+на странице; при наличии 'html' этап загрузки не открывает браузер.
+
+Просмотренной ссылка становится только после confirm(urls) от потребителя:
+до этого запись лежит в 'pending' состояния и отдается на каждом опросе, даже
+при ответе 304, так что упавшая обработка повторится.
+
+    python feeds.py --ticker SBER               # опросить ленты, показать новые записи (без confirm)
+    python feeds.py --ticker SBER --fetch       # и обработать их, как окно GNews
+"""
+import argparse, html, json, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from pathlib import Path
+from xml.etree.ElementTree import iterparse
+
+from dateutil import parser
+
+from loggers import url_logger
+from metrics import metrics
+from tickers import match_tickers
+
+BASE_DIR = Path(__file__).parent
+STATE_PATH = BASE_DIR / 'feeds_state.json'
+
+HTTP_TIMEOUT = 15
+WORKERS = 8
+SEEN_LIMIT = 2000           # ссылок на ленту, которые помним между опросами (и неподтвержденных записей)
+MIN_FULL_TEXT = 300         # как порог короткого текста в process_page
+MSK = timezone(timedelta(hours=3))  # дата без пояса в ленте - московское время
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
+
+# издание (как в indicator.source_weights) -> ленты: RSS, Atom или news sitemap
+FEEDS = {
+    'Интерфакс': ['https://www.interfax.ru/rss.asp'],
+    'Ведомости': ['https://www.vedomosti.ru/rss/news.xml'],
+    'Коммерсантъ': ['https://www.kommersant.ru/RSS/news.xml'],
+    'Forbes.ru': ['https://www.forbes.ru/newrss.xml'],
+    'БКС Экспресс': ['https://bcs-express.ru/rss'],
+    'Финам.Ру': ['https://www.finam.ru/analysis/conews/rsspoint/'],
+    'Smart-Lab': ['https://smart-lab.ru/news/rss/'],
+    'Банки.ру': ['https://www.banki.ru/xml/news.rss'],
+    'BFM.ru': ['https://www.bfm.ru/news.rss'],
+    'Finmarket.ru': ['https://www.finmarket.ru/rss/mainnews.asp'],
+}
+
+ENTRY_TAGS = {'item', 'entry', 'url'}            # RSS, Atom, sitemap
+DATE_TAGS = ('pubDate', 'published', 'publication_date', 'date', 'updated', 'lastmod')
+TEXT_TAGS = ('full-text', 'encoded', 'content')  # yandex:full-text, content:encoded, atom content
+
+
+def _local(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+def _published(value):
+    """Время публикации из ленты в UTC или None."""
+    try:
+        dt = parser.parse(value)
+    except Exception:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=MSK)
+    return dt.astimezone(timezone.utc)
+
+
+def _full_text_html(text):
+    """Полный текст записи как html для trafilatura: content:encoded - уже html, yandex:full-text - текст."""
+    if '<' in text and '>' in text:
+        return f"<html><body><article>{text}</article></body></html>"
+    paragraphs = ''.join(f"<p>{html.escape(p.strip())}</p>" for p in text.splitlines() if p.strip())
+    return f"<html><body><article>{paragraphs}</article></body></html>"
+
+
+def parse_entries(stream, publisher):
+    """
+    Записи ленты из потока байт, по одной, без загрузки документа целиком.
+    Возвращает элементы в формате GNews плюс 'feed', 'published_at' и, если есть полный текст, 'html'.
+    """
+    for _, elem in iterparse(stream, events=('end',)):
+        if _local(elem.tag) not in ENTRY_TAGS:
+            continue
+        fields = {}
+        for child in elem.iter():
+            name = _local(child.tag)
+            if name == 'link' and child.get('href'):
+                fields.setdefault('link', child.get('href'))
+            elif child.text and child.text.strip():
+                fields.setdefault(name, child.text.strip())
+        elem.clear()
+
+        link = fields.get('link') or fields.get('loc')
+        published = next((_published(fields[t]) for t in DATE_TAGS if t in fields), None)
+        title = fields.get('title')
+        if not link or not title or published is None:
+            continue
+        item = {
+            'url': link,
+            'title': f"{title} - {publisher}", # как в GNews: extract_publisher берет издание отсюда
+            'description': fields.get('description') or fields.get('summary') or '',
+            'published date': format_datetime(published, usegmt=True),
+            'publisher': {'title': publisher},
+            'published_at': published.isoformat(),
+            'feed': True,
+        }
+        full_text = next((fields[t] for t in TEXT_TAGS if t in fields), None)
+        if full_text and len(full_text) >= MIN_FULL_TEXT:
+            item['html'] = _full_text_html(full_text)
+        yield item
+
+
+class FeedSource:
+    """
+    Опрос лент изданий. poll() - новые записи со времени прошлого опроса,
+    как у GNewsFeed / LocalFeed в live_service.py.
+
+    tickers - оставить записи, где упомянут хотя бы один тикер (по заголовку и описанию),
+    keywords - или любое из слов; без фильтров - все записи.
+    """
+    def __init__(self, publishers=None, tickers=None, keywords=None, feeds=FEEDS, path=STATE_PATH, workers=WORKERS):
+        import requests
+        self.feeds = {p: feeds[p] for p in (publishers or feeds)}
+        self.tickers = tickers
+        self.keywords = [k.lower() for k in keywords or []]
+        self.path = Path(path)
+        self.workers = workers
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = USER_AGENT
+        self._lock = threading.Lock()
+        self.state = json.loads(self.path.read_text(encoding='utf-8')) if self.path.exists() else {}
+
+    def relevant(self, item):
+        text = f"{item['title']}\n{item.get('description', '')}"
+        if self.tickers and match_tickers(text, self.tickers):
+            return True
+        if self.keywords and any(k in text.lower() for k in self.keywords):
+            return True
+        return not self.tickers and not self.keywords
+
+    def _poll_feed(self, publisher, url):
+        with self._lock:
+            state = dict(self.state.get(url, {}))
+        headers = {}
+        if state.get('etag'):
+            headers['If-None-Match'] = state['etag']
+        if state.get('last_modified'):
+            headers['If-Modified-Since'] = state['last_modified']
+
+        pending = state.get('pending', [])
+        with metrics.timer('feed_get', publisher) as t:
+            response = self.session.get(url, headers=headers, timeout=HTTP_TIMEOUT, stream=True)
+            if response.status_code == 304:
+                t.outcome = 'not_modified'
+                response.close()
+                return list(pending)
+            response.raise_for_status()
+            response.raw.decode_content = True
+            known = set(state.get('seen', [])) | {item['url'] for item in pending}
+            items, skipped, new = [], [], 0
+            try:
+                for item in parse_entries(response.raw, publisher):
+                    if item['url'] in known:
+                        continue
+                    known.add(item['url'])
+                    new += 1
+                    if self.relevant(item):
+                        items.append(item)
+                    else:
+                        skipped.append(item['url']) # нерелевантные потребителю не отдаем - сразу просмотрены
+            finally:
+                response.close()
+
+        metrics.count('feed_items', publisher, n=new)
+        metrics.count('feed_relevant', publisher, n=len(items))
+        with self._lock:
+            current = self.state.get(url, {})
+            self.state[url] = {
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'seen': (skipped + current.get('seen', []))[:SEEN_LIMIT],
+                'pending': (items + current.get('pending', []))[:SEEN_LIMIT],
+                'polled_at': datetime.now(timezone.utc).isoformat(),
+            }
+            return list(self.state[url]['pending'])
+
+    def _poll_safe(self, task):
+        publisher, url = task
+        try:
+            return self._poll_feed(publisher, url)
+        except Exception as e:
+            metrics.count('feed', publisher, 'error')
+            url_logger.warning("FEED ERROR | Лента %s недоступна: %s", url, e,
+                               extra={'url': url, 'stage': 'feed', 'outcome': 'error'})
+            return []
+
+    def poll(self):
+        tasks = [(publisher, url) for publisher, urls in self.feeds.items() for url in urls]
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            items = [item for found in pool.map(self._poll_safe, tasks) for item in found]
+        self.save()
+        return items
+
+    def confirm(self, urls):
+        """Записи обработаны (или отсеяны) потребителем - больше их не отдаем."""
+        urls = set(urls)
+        with self._lock:
+            for state in self.state.values():
+                done = [item['url'] for item in state.get('pending', []) if item['url'] in urls]
+                if done:
+                    state['pending'] = [item for item in state['pending'] if item['url'] not in urls]
+                    state['seen'] = (done + state.get('seen', []))[:SEEN_LIMIT]
+        self.save()
+
+    def save(self):
+        with self._lock:
+            text = json.dumps(self.state, ensure_ascii=False, indent=2)
+        self.path.write_text(text, encoding='utf-8')
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Новые статьи из RSS / sitemap изданий")
+    arg_parser.add_argument('--ticker', nargs='+', default=None, help="тикеры из tickers.py")
+    arg_parser.add_argument('--keyword', nargs='+', default=None)
+    arg_parser.add_argument('--publisher', nargs='+', default=None, help=f"издания из FEEDS: {', '.join(FEEDS)}")
+    arg_parser.add_argument('--fetch', action='store_true', help="обработать записи (fetch_with_selenium) и дописать в csv")
+    args = arg_parser.parse_args()
+
+    source = FeedSource(args.publisher, args.ticker, args.keyword)
+    started = time.perf_counter()
+    items = source.poll()
+    print(f"Новых записей: {len(items)}, за {time.perf_counter() - started:.1f} сек "
+          f"(с полным текстом: {sum(1 for i in items if i.get('html'))})")
+    for item in items:
+        print(f"  {item['published_at']}  {item['title']}")
+
+    if args.fetch and items:
+        import news_parse
+        from article import append_articles
+        now = datetime.now()
+        start = min(parser.parse(i['published_at']).replace(tzinfo=None) for i in items)
+        df, _ = news_parse.fetch_with_selenium(args.keyword or 'feeds', start, now, results=items)
+        # неудачные статьи уже в failures.db (failure_store.py retry) - из ленты их больше не берем
+        source.confirm(item['url'] for item in items)
+        file_name = 'feeds_news.csv'
+        if not df.empty:
+            append_articles(df, file_name)
+        print(f"Обработано статей: {len(df)} -> {file_name}")
+
+if __name__ == "__main__":
+    main()
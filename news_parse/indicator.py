@@ -0,0 +1,174 @@
+"""
+Расчет новостного индикатора из ноутбука news_indicator_microsoft.ipynb:
+классификация summary по темам (bart-large-mnli), сентимент (finbert)
+и взвешивание по изданию. Модели грузятся лениво при первом вызове.
+"""
+
+candidate_labels = ["Financials & Dividends", "Strategy & Corporate Events", "Market Analysis & Expert Forecasts", "Macro & Regulation",  "Retail Products & Marketing", "Service & Tech Updates"]
+
+# темы, которые не влияют на рынок - такие новости в индекс не идут
+noise_labels = ["Retail Products & Marketing", "Service & Tech Updates"]
+NOISE_THRESHOLD = 0.3
+
+''' словарь с весами изданий '''
+source_weights = {
+    # --- TIER 1: Максимальное влияние (Институционалы, Биржи, ГосСМИ) ---
+    'Интерфакс': 2.0,
+    'Интерфакс Россия': 1.8,
+    'Московская Биржа': 2.0,
+    'Ведомости': 1.8,
+    'Forbes.ru': 1.7,
+    'Сбербанк': 1.7,
+    'PJSC Sberbank': 1.7,
+    'ОАО «Сбер Банк': 1.5,
+    'Альфа-Банк': 1.5,
+    'БКС Экспресс': 1.5,
+    'Финам.Ру': 1.5,
+    'Коммерсантъ': 1.8,
+    'ПРАВО.Ru': 1.4,
+    'РАПСИ': 1.3,
+
+    # --- TIER 2: Профильные финансы, Технологии и Рынки ---
+    'Investing.com': 1.3,
+    'Smart-Lab': 1.3,
+    'ProFinance': 1.3,
+    'Банки.ру': 1.2,
+    'Эксперт': 1.2,
+    'Frank Media': 1.2,
+    'InvestFuture': 1.1,
+    'Finmarket.ru': 1.1,
+    'CNews.ru': 1.1,
+    'Хабр': 1.1,
+    'iXBT.com': 1.0,
+    '3DNews': 1.0,
+    'CoinDesk': 1.0,
+    'Zakon.ru': 1.0,
+    'BFM.ru': 1.1,
+    'Клерк.ру': 1.0,
+
+    # --- TIER 3: Крупные агрегаторы и Федеральные СМИ ---
+    'ФОНТАНКА.ру': 1.0,
+    'URA.RU': 1.0,
+    'NEWS.ru': 0.9,
+    'Lenta.ru': 0.9,
+    'Т—Ж': 0.9,
+    't-j.ru': 0.9,
+    'Лайфхакер': 0.8,
+    'Аргументы и Факты': 0.8,
+    'БИЗНЕС Online — Новости Казани': 0.9,
+    'Независимая газета': 0.9,
+    'ФедералПресс': 0.8,
+    'SIA.RU': 0.8,
+    'Сибирское информационное агентство': 0.8,
+
+    # --- TIER 4: Заметные региональные и отраслевые СМИ ---
+    'НГС.ру': 0.7,
+    '74.ру': 0.7,
+    '59.ру': 0.7,
+    'NGS.42': 0.7,
+    'Алтапресс — новости Барнаула и Алтайского края': 0.6,
+    'PrimaMedia': 0.6,
+    'SakhalinMedia': 0.6,
+    'ЯСИА': 0.6,
+    'Сибкрай.ru': 0.6,
+    'Vremyan.ru': 0.5,
+    'Время Н': 0.5,
+    'Выберу.ру': 0.5,
+    'ВсеЗаймыОнлайн': 0.4,
+    'ADIndex.ru': 0.5,
+    'Sostav.ru': 0.5,
+    'AppleInsider.ru': 0.5,
+
+    # --- TIER 5: Мелкие региональные порталы и шум ---
+    # Для всех остальных устанавливаем базовый низкий вес
+}
+
+_classifier = None
+_indicator_pipe = None
+
+def get_classifier():
+    global _classifier
+    if _classifier is None:
+        import torch
+        from transformers import pipeline
+        device = 0 if torch.cuda.is_available() else -1
+        _classifier = pipeline("zero-shot-classification", model="facebook/bart-large-mnli", device=device)
+    return _classifier
+
+def get_indicator_pipe():
+    global _indicator_pipe
+    if _indicator_pipe is None:
+        from transformers import pipeline
+        _indicator_pipe = pipeline(task='text-classification', model='ProsusAI/finbert')
+    return _indicator_pipe
+
+def extract_publisher(title):
+    return title.split(' - ')[-1]
+
+def classify_summaries(texts, batch_size=1):
+    """
+    Zero-shot классификация пачки summary. Возвращает список словарей {метка: вероятность}.
+    batch_size - сколько пар (текст, метка) идет через модель за раз.
+    """
+    results = get_classifier()(texts, candidate_labels, multi_label=False, batch_size=batch_size)
+    if isinstance(results, dict):
+        results = [results]
+    return [dict(zip(res['labels'], res['scores'])) for res in results]
+
+def is_noise(topics):
+    return sum(topics.get(label, 0) for label in noise_labels) >= NOISE_THRESHOLD
+
+def calculate_sentiment_index(neutral, positive, negative):
+    sentiment_index = (positive * 1.0) + (neutral * 0.5) + (negative * 0.0)
+    return round(sentiment_index, 4)
+
+def _is_length_error(e):
+    return 'Token indices sequence length' in str(e) or 'The size of tensor' in str(e)
+
+def _sentiment_from(result_all):
+    scores = {res['label']: res['score'] for res in result_all}
+    return calculate_sentiment_index(scores['neutral'], scores['positive'], scores['negative'])
+
+def calculate_market_index(summary):
+    """Сентимент finbert для summary. При ошибке длины сжимаем summary до меньшего числа предложений."""
+    from summarizer import get_summary
+    for length in range(4, 1, -1):
+        try:
+            short_summary = get_summary(summary, max_sentences=length)
+            return _sentiment_from(get_indicator_pipe()(short_summary, top_k=None))
+        except Exception as e:
+            if _is_length_error(e):
+                continue
+            raise
+    return None
+
+def calculate_market_indexes(summaries, batch_size=1):
+    """
+    calculate_market_index для пачки: summary сжимаются так же, finbert идет одной пачкой.
+    Если в пачке есть слишком длинный текст - пачка считается по одному, с пересжатием.
+    """
+    from summarizer import get_summary
+    short_summaries = [get_summary(summary, max_sentences=4) for summary in summaries]
+    try:
+        results = get_indicator_pipe()(short_summaries, top_k=None, batch_size=batch_size)
+    except Exception as e:
+        if _is_length_error(e):
+            return [calculate_market_index(summary) for summary in summaries]
+        raise
+    return [_sentiment_from(result_all) for result_all in results]
+
+def weight_index(index, publisher):
+    if index is not None:
+        coeff = source_weights.get(publisher, 1)
+        return index * coeff
+    return None
+
+def score_summary(summary, title):
+    """Темы, сентимент и взвешенный индекс для одной новости."""
+    topics = classify_summaries([summary])[0]
+    news_index = None if is_noise(topics) else calculate_market_index(summary)
+    return {
+        'topics': topics,
+        'news_index': news_index,
+        'weighted_index': weight_index(news_index, extract_publisher(title or '')),
+    }
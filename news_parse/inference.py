@@ -0,0 +1,96 @@
+"""
+Один проход энкодера на статью: темы, сентимент и эмбеддинг вместе.
+
+Раньше summary прогонялся тремя моделями - bart-large-mnli (темы), finbert
+(сентимент) и multilingual-e5 (эмбеддинги для FAISS/UMAP в ноутбуке), у
+каждой своя токенизация. Здесь e5 считается один раз пачкой, темы и
+сентимент - головы из distill.py поверх того же вектора, а вектор пишется
+в ArticleStore (колонки embedding, embedding_model) вместе с темами и индексом.
+
+    python inference.py articles.db                 # статьи без эмбеддинга
+    python inference.py articles.db --all           # пересчитать все
+    python inference.py articles.db --batch-size 32
+"""
+import argparse, time
+
+from distill import BATCH_SIZE, encode, get_heads
+from indicator import candidate_labels, is_noise, weight_index, extract_publisher
+from metrics import metrics
+
+
+def score_vectors(X, heads=None):
+    """
+    Темы и news_index по уже посчитанным эмбеддингам (dag.py: векторы этапа embed).
+    Возвращает список (темы, news_index); news_index None для шумовых тем.
+    """
+    heads = heads or get_heads()
+    with metrics.timer('heads'):
+        topics, sentiment = heads.topics(X), heads.sentiment(X)
+    scores = []
+    for probs, value in zip(topics, sentiment):
+        row_topics = dict(zip(candidate_labels, map(float, probs)))
+        scores.append((row_topics, None if is_noise(row_topics) else round(float(value), 4)))
+    return scores
+
+
+def score_batch(rows, heads=None, batch_size=BATCH_SIZE):
+    """
+    Для строк с summary и title - темы, news_index, weighted_index и эмбеддинг.
+    Энкодер вызывается один раз на пачку, головы - матричное умножение.
+    """
+    heads = heads or get_heads()
+    with metrics.timer('encode'):
+        X = encode([row['summary'] for row in rows], heads.encoder, batch_size)
+    metrics.count('encoded', n=len(rows))
+    results = []
+    for row, vector, (row_topics, news_index) in zip(rows, X, score_vectors(X, heads)):
+        results.append({
+            'topics': row_topics,
+            'news_index': news_index,
+            'weighted_index': weight_index(news_index, extract_publisher(row.get('title') or '')),
+            'embedding': vector,
+            'embedding_model': heads.encoder,
+        })
+    return results
+
+
+def score_summary(summary, title):
+    """Как indicator.score_summary (для live_service.py), плюс эмбеддинг в той же строке."""
+    return score_batch([{'summary': summary, 'title': title}])[0]
+
+
+def score_store(store, rescore=False, batch_size=BATCH_SIZE, chunk=256):
+    """
+    Считает и пишет в store темы, индекс и эмбеддинг для статей с summary.
+    rescore=False - только статьи без эмбеддинга. Возвращает число статей.
+    """
+    where = "summary IS NOT NULL AND summary != ''" + ("" if rescore else " AND embedding IS NULL")
+    df = store.load(where)
+    heads = get_heads()
+    rows = df[['url', 'summary', 'title']].to_dict('records')
+    for i in range(0, len(rows), chunk):
+        part = rows[i:i + chunk]
+        scored = score_batch(part, heads, batch_size)
+        store.add_many([{'url': row['url'], **result} for row, result in zip(part, scored)])
+    return len(rows)
+
+
+def main():
+    from article_store import ArticleStore, STORE_PATH
+    arg_parser = argparse.ArgumentParser(description="Темы, сентимент и эмбеддинги одним проходом энкодера")
+    arg_parser.add_argument('store', nargs='?', default=str(STORE_PATH))
+    arg_parser.add_argument('--all', action='store_true', help="пересчитать и статьи, у которых эмбеддинг уже есть")
+    arg_parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    args = arg_parser.parse_args()
+
+    store = ArticleStore(args.store)
+    started = time.perf_counter()
+    n = score_store(store, args.all, args.batch_size)
+    elapsed = time.perf_counter() - started
+    print(f"Статей: {n}, за {elapsed:.1f} сек" + (f" ({1000 * elapsed / n:.1f} мс на статью)" if n else ""))
+    embeddings = store.load("embedding IS NOT NULL")
+    for model, group in embeddings.groupby('embedding_model'):
+        print(f"Эмбеддинги {model}: {len(group)} x {len(group['embedding'].iloc[0])}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""
+Локальный сервер моделей: bart-large-mnli (темы), finbert (сентимент) и
+multilingual-e5 (эмбеддинги) загружаются один раз и обслуживают скрапер,
+live_service.py, ноутбук и воркеры по HTTP на localhost.
+
+Запросы к одной модели собираются в динамические пачки: пачка уходит в
+модель, когда набралось MAX_BATCH текстов или с первого запроса в пачке
+прошло MAX_WAIT секунд (бюджет задержки). Одиночные запросы почти не ждут,
+а под нагрузкой модель получает полные пачки.
+
+    python inference_server.py --port 8766
+
+    POST /topics     {"texts": [...]} -> {"topics": [{метка: вероятность}, ...]}
+    POST /sentiment  {"texts": [...]} -> {"sentiment": [индекс 0..1, ...]}
+    POST /embed      {"texts": [...]} -> {"embeddings": [[...], ...]}
+    POST /score      {"summary": ..., "title": ...} -> как indicator.score_summary, плюс embedding
+    GET  /stats      - ожидание в очереди, размер пачки и время модели по моделям
+    GET  /metrics    - то же в формате Prometheus
+
+Клиент (ноутбук, скрипты, live_service.py --models server):
+
+    from inference_server import InferenceClient
+    client = InferenceClient()
+    client.topics(df['summary'].tolist())
+"""
+import argparse, json, logging, queue, threading, time
+from collections import Counter
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from metrics import metrics
+
+HOST = '127.0.0.1'
+PORT = 8766
+MAX_BATCH = 32
+MAX_WAIT = 0.02             # секунд: сколько пачка ждет новых запросов после первого
+REQUEST_TIMEOUT = 300
+
+server_logger = logging.getLogger('inference_server')
+
+
+class Batcher:
+    """
+    Очередь запросов к одной модели и поток, который собирает их в пачки.
+    fn(texts) -> список результатов той же длины.
+    """
+    def __init__(self, name, fn, max_batch=MAX_BATCH, max_wait=MAX_WAIT):
+        self.name = name
+        self.fn = fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue = queue.Queue()
+        self._pending = None    # запрос, не влезший в прошлую пачку, - он откроет следующую
+        self.batch_sizes = Counter()
+        self._lock = threading.Lock()
+        threading.Thread(target=self._loop, name=f"batcher-{name}", daemon=True).start()
+
+    def submit(self, texts):
+        """Результаты для texts, когда их пачка пройдет через модель."""
+        texts = list(texts)
+        # большой запрос (ноутбук) - несколькими частями, чтобы пачка не выходила за max_batch
+        futures = []
+        for i in range(0, len(texts), self.max_batch):
+            future = Future()
+            self.queue.put((time.perf_counter(), texts[i:i + self.max_batch], future))
+            futures.append(future)
+        return [result for future in futures for result in future.result(timeout=REQUEST_TIMEOUT)]
+
+    def _collect(self):
+        if self._pending is not None:
+            batch, self._pending = [self._pending], None
+        else:
+            batch = [self.queue.get()]
+        size = len(batch[0][1])
+        deadline = time.perf_counter() + self.max_wait
+        while size < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                request = self.queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if size + len(request[1]) > self.max_batch:
+                self._pending = request
+                break
+            batch.append(request)
+            size += len(request[1])
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            texts = [text for _, request_texts, _ in batch for text in request_texts]
+            started = time.perf_counter()
+            for enqueued, _, _ in batch:
+                metrics.observe('queue_wait', started - enqueued, self.name)
+            try:
+                with metrics.timer('model', self.name):
+                    outputs = self.fn(texts)
+            except Exception as e:
+                server_logger.exception("Ошибка модели %s на пачке из %s", self.name, len(texts))
+                for _, _, future in batch:
+                    future.set_exception(e)
+                continue
+            with self._lock:
+                self.batch_sizes[len(texts)] += 1
+            metrics.count('batches', self.name)
+            metrics.count('batch_items', self.name, n=len(texts))
+            offset = 0
+            for _, request_texts, future in batch:
+                future.set_result(outputs[offset:offset + len(request_texts)])
+                offset += len(request_texts)
+
+    def stats(self):
+        with self._lock:
+            sizes = dict(sorted(self.batch_sizes.items()))
+        batches = sum(sizes.values())
+        return {
+            'batches': batches,
+            'mean_batch': round(sum(k * v for k, v in sizes.items()) / batches, 2) if batches else None,
+            'batch_sizes': sizes,
+        }
+
+
+# --- модели ---
+def run_topics(texts):
+    from indicator import classify_summaries
+    return classify_summaries(texts, batch_size=len(texts))
+
+
+def run_sentiment(texts):
+    """Индекс finbert так же, как в пакетном пайплайне (indicator.calculate_market_index), пачкой."""
+    from indicator import calculate_market_indexes
+    return calculate_market_indexes(texts, batch_size=len(texts))
+
+
+def make_embed(encoder):
+    from distill import encode
+    return lambda texts: [vector.tolist() for vector in encode(texts, encoder, batch_size=len(texts))]
+
+
+class InferenceServer:
+    def __init__(self, encoder=None, max_batch=MAX_BATCH, max_wait=MAX_WAIT):
+        from article_store import INDEX_ENCODER
+        self.encoder = encoder or INDEX_ENCODER
+        self.batchers = {
+            'topics': Batcher('topics', run_topics, max_batch, max_wait),
+            'sentiment': Batcher('sentiment', run_sentiment, max_batch, max_wait),
+            'embed': Batcher('embed', make_embed(self.encoder), max_batch, max_wait),
+        }
+
+    def preload(self):
+        """Загрузить все модели до первого запроса."""
+        from indicator import get_classifier, get_indicator_pipe
+        from distill import get_encoder
+        get_classifier()
+        get_indicator_pipe()
+        get_encoder(self.encoder)
+
+    def score(self, summary, title):
+        from indicator import is_noise, weight_index, extract_publisher
+        topics = self.batchers['topics'].submit([summary])[0]
+        news_index = None if is_noise(topics) else self.batchers['sentiment'].submit([summary])[0]
+        return {
+            'topics': topics,
+            'news_index': news_index,
+            'weighted_index': weight_index(news_index, extract_publisher(title or '')),
+            'embedding': self.batchers['embed'].submit([summary])[0],
+            'embedding_model': self.encoder,
+        }
+
+    def stats(self):
+        totals = {}
+        for row in metrics.snapshot()['stages']:
+            model = totals.setdefault(row['domain'], {})
+            for key in ('p50', 'p95', 'max'):
+                model[f"{row['stage']}_{key}"] = row[key]
+        return {name: {**batcher.stats(), **totals.get(name, {})} for name, batcher in self.batchers.items()}
+
+
+def make_handler(server):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, body, content_type='application/json; charset=utf-8'):
+            data = body.encode('utf-8') if isinstance(body, str) else json.dumps(body, ensure_ascii=False).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == '/stats':
+                self._send(server.stats())
+            elif self.path == '/metrics':
+                self._send(metrics.to_prometheus('inference'), 'text/plain; version=0.0.4')
+            else:
+                self.send_error(404)
+
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            try:
+                if self.path == '/score':
+                    body = server.score(request['summary'], request.get('title'))
+                elif self.path in ('/topics', '/sentiment', '/embed'):
+                    key = {'/topics': 'topics', '/sentiment': 'sentiment', '/embed': 'embeddings'}[self.path]
+                    body = {key: server.batchers[self.path[1:]].submit(request['texts'])}
+                else:
+                    self.send_error(404)
+                    return
+            except Exception as e:
+                self.send_error(500, str(e))
+                return
+            self._send(body)
+
+        def log_message(self, format, *args):
+            pass
+    return Handler
+
+
+class InferenceClient:
+    """Клиент сервера моделей. score_summary подходит как scorer для live_service.py."""
+    def __init__(self, url=f'http://{HOST}:{PORT}', timeout=REQUEST_TIMEOUT):
+        import requests
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def _post(self, path, body):
+        response = self.session.post(f'{self.url}{path}', json=body, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def topics(self, texts):
+        return self._post('/topics', {'texts': list(texts)})['topics']
+
+    def sentiment(self, texts):
+        return self._post('/sentiment', {'texts': list(texts)})['sentiment']
+
+    def embed(self, texts):
+        import numpy as np
+        return np.array(self._post('/embed', {'texts': list(texts)})['embeddings'], dtype=np.float32)
+
+    def score_summary(self, summary, title):
+        result = self._post('/score', {'summary': summary, 'title': title})
+        if result.get('embedding') is not None:
+            import numpy as np
+            result['embedding'] = np.array(result['embedding'], dtype=np.float32)
+        return result
+
+    def stats(self):
+        response = self.session.get(f'{self.url}/stats', timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Локальный сервер моделей с динамическими пачками")
+    arg_parser.add_argument('--host', default=HOST)
+    arg_parser.add_argument('--port', type=int, default=PORT)
+    arg_parser.add_argument('--encoder', default=None, help="модель эмбеддингов (по умолчанию article_store.INDEX_ENCODER, как у индекса)")
+    arg_parser.add_argument('--max-batch', type=int, default=MAX_BATCH)
+    arg_parser.add_argument('--max-wait', type=float, default=MAX_WAIT, help="секунд ожидания до отправки неполной пачки")
+    arg_parser.add_argument('--lazy', action='store_true', help="загружать модели при первом запросе")
+    args = arg_parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    server = InferenceServer(args.encoder, args.max_batch, args.max_wait)
+    if not args.lazy:
+        started = time.perf_counter()
+        server.preload()
+        server_logger.info("Модели загружены за %.1f сек", time.perf_counter() - started)
+    httpd = ThreadingHTTPServer((args.host, args.port), make_handler(server))
+    server_logger.info("Сервер моделей на http://%s:%s", args.host, args.port)
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,358 @@
+"""
+Живой режим новостного индикатора.
+
+Сервис раз в POLL_INTERVAL секунд опрашивает источник, обрабатывает только
+новые статьи (текст, дата, summary, темы, сентимент, вес издания) и публикует
+обновления индикатора по HTTP:
+
+    GET /indicator         - текущее значение индикатора
+    GET /updates?since=N   - обновления с порядковым номером > N
+    GET /latency           - задержка новость -> сигнал по статьям
+
+Источники: GNews (боевой режим), RSS / sitemap изданий (feeds.py, --feeds)
+или LocalFeed - json/jsonl файл или http адрес с тем же форматом элементов,
+что отдает GNews ('url', 'title', 'published date', опционально 'html').
+LocalFeed нужен, чтобы гонять сервис локально без сети:
+
+    python live_service.py --feed feed.jsonl --fetch http --port 8765
+"""
+import argparse, json, logging, threading, time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlparse, parse_qs
+
+import requests
+from dateutil import parser
+
+import news_parse
+from article_store import ArticleStore
+from indicator import score_summary, extract_publisher
+from static_page import StaticPage
+from tickers import search_queries
+from relevance_gate import RelevanceGate, relevance_gate
+
+BASE_DIR = Path(__file__).parent
+
+POLL_INTERVAL = 60          # секунд между опросами источника
+INDICATOR_WINDOW = timedelta(days=1)  # индикатор - среднее взвешенных индексов за сутки, как rolling('1D') в ноутбуке
+HTTP_TIMEOUT = 10
+RETRY_DELAY = 60            # секунд до повтора статьи, на которой обработка упала; дальше удваивается
+MAX_RETRIES = 5             # после стольких падений подряд статья помечается просмотренной
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
+
+service_logger = logging.getLogger('live_service')
+
+
+class LocalFeed:
+    """Подмена GNews: json / jsonl файл или http адрес, отдающий список элементов."""
+    def __init__(self, source):
+        self.source = source
+
+    def poll(self):
+        if self.source.startswith(('http://', 'https://')):
+            response = requests.get(self.source, timeout=HTTP_TIMEOUT)
+            response.raise_for_status()
+            return response.json()
+        text = Path(self.source).read_text(encoding='utf-8').strip()
+        if not text:
+            return []
+        if text.startswith('['):
+            return json.loads(text)
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+    def confirm(self, urls):
+        pass # повторы отсекает ArticleStore
+
+
+class GNewsFeed:
+    """
+    Свежие новости по ключевому слову (или списку запросов) за последний период
+    (по умолчанию час). Выдачи запросов объединяются без повторов.
+    """
+    def __init__(self, keyword, period='1h'):
+        from gnews import GNews
+        self.keywords = [keyword] if isinstance(keyword, str) else list(keyword)
+        self.google_news = GNews(language='ru', country='RU', period=period, max_results=100,
+                                 exclude_websites=news_parse.excluded_domains)
+
+    def poll(self):
+        return news_parse.unique_results([item for kw in self.keywords for item in self.google_news.get_news(kw)])
+
+    def confirm(self, urls):
+        pass # повторы отсекает ArticleStore
+
+
+def parse_published(date_str):
+    """Время публикации из GNews в UTC (или None)."""
+    try:
+        dt = parser.parse(date_str)
+    except Exception:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+class LiveIndicatorService:
+    """
+    :param feed: объект с методом poll(), возвращающим элементы в формате GNews, и confirm(urls) -
+                 статьи, которые больше не нужно отдавать (обработаны или отсеяны)
+    :param store: ArticleStore - по нему определяем, какие статьи уже обработаны
+    :param fetch: 'http' - страница качается requests, 'browser' - через stealth driver
+    :param scorer: функция (summary, title) -> dict с topics/news_index/weighted_index,
+                   None - без моделей (только извлечение)
+    :param gate: фильтр по заголовку до загрузки (relevance_gate.py), None - грузить все
+    :param retry_delay: пауза до повтора статьи после ошибки (таймаут, падение браузера или модели)
+    """
+    def __init__(self, feed, store, fetch='http', scorer=score_summary, poll_interval=POLL_INTERVAL, max_updates=1000,
+                 gate=relevance_gate, retry_delay=RETRY_DELAY):
+        self.feed = feed
+        self.gate = gate
+        self.store = store
+        self.fetch = fetch
+        self.scorer = scorer
+        self.poll_interval = poll_interval
+        self.retry_delay = retry_delay
+        self.retries = {}      # url -> (число падений подряд, time.monotonic() следующей попытки)
+        self.driver = None
+        self.updates = deque(maxlen=max_updates)
+        self.window = deque()  # (время публикации, взвешенный индекс) за INDICATOR_WINDOW
+        self.seq = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    # --- загрузка страницы ---
+    def load_page(self, item, url):
+        if item.get('html'):
+            return StaticPage(item['html'], url)
+        if self.fetch == 'browser':
+            if self.driver is None:
+                self.driver = news_parse.init_stealth_driver()
+            self.driver.get(url)
+            return self.driver
+        response = requests.get(url, headers={'User-Agent': USER_AGENT}, timeout=HTTP_TIMEOUT)
+        response.raise_for_status()
+        return StaticPage(response.text, response.url)
+
+    # --- обработка одной статьи ---
+    def process(self, item, seen_at):
+        timings = {}
+        if self.gate is not None:
+            planned = self.gate.plan([item])
+            if not planned:
+                return None
+            item = planned[0]
+        t0 = time.perf_counter()
+        url = news_parse.decode_url(item['url'])
+        timings['decode'] = time.perf_counter() - t0
+        if news_parse.is_excluded(url):
+            return None
+
+        t0 = time.perf_counter()
+        page = self.load_page(item, url)
+        timings['fetch'] = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        row, _ = news_parse.process_page(page, item['url'], item)
+        timings['extract'] = time.perf_counter() - t0
+        if not row:
+            return None
+        row['url'] = row['url'] or url
+        row['publisher'] = extract_publisher(row['title'] or '')
+        if 'gate_decision' in item:
+            row.update(gate_decision=item['gate_decision'], gate_score=item['gate_score'])
+
+        if self.scorer:
+            t0 = time.perf_counter()
+            row.update(self.scorer(row['summary'], row['title']))
+            timings['score'] = time.perf_counter() - t0
+
+        self.store.add({**row, 'url': item['url']})
+        return self.publish(item, row, seen_at, timings)
+
+    def publish(self, item, row, seen_at, timings):
+        published_at = datetime.now(timezone.utc)
+        news_time = parse_published(item.get('published date'))
+        with self._lock:
+            if row.get('weighted_index') is not None:
+                self.window.append((news_time or published_at, row['weighted_index']))
+            while self.window and self.window[0][0] < published_at - INDICATOR_WINDOW:
+                self.window.popleft()
+            self.seq += 1
+            update = {
+                'seq': self.seq,
+                'url': item['url'],
+                'title': row['title'],
+                'publisher': row['publisher'],
+                'news_index': row.get('news_index'),
+                'weighted_index': row.get('weighted_index'),
+                'indicator': self._indicator_value(),
+                'published_at': published_at.isoformat(),
+                # задержка от появления новости до сигнала и от момента, когда мы ее увидели
+                'news_to_signal_sec': (published_at - news_time).total_seconds() if news_time else None,
+                'processing_sec': (published_at - seen_at).total_seconds(),
+                'stage_sec': {k: round(v, 4) for k, v in timings.items()},
+            }
+            self.updates.append(update)
+        service_logger.info(json.dumps(update, ensure_ascii=False))
+        return update
+
+    def _indicator_value(self):
+        if not self.window:
+            return None
+        return sum(v for _, v in self.window) / len(self.window)
+
+    # --- цикл опроса ---
+    def poll_once(self):
+        seen_at = datetime.now(timezone.utc)
+        try:
+            items = self.feed.poll()
+        except Exception as e:
+            service_logger.warning(f"Источник недоступен: {e}")
+            return []
+        published = []
+        for item in items:
+            url = item['url']
+            if self.store.has(url):
+                continue
+            attempts, retry_at = self.retries.get(url, (0, 0.0))
+            if time.monotonic() < retry_at:
+                continue
+            try:
+                update = self.process(item, seen_at)
+            except Exception as e:
+                # сбой может быть временным - статья остается непросмотренной и повторяется с паузой
+                attempts += 1
+                if attempts < MAX_RETRIES:
+                    self.retries[url] = (attempts, time.monotonic() + self.retry_delay * 2 ** (attempts - 1))
+                    service_logger.warning("Ошибка обработки %s (попытка %s, повтор позже): %s", url, attempts, e)
+                    continue
+                service_logger.warning("Ошибка обработки %s, попыток %s - больше не повторяем: %s", url, attempts, e)
+                update = None
+            self.retries.pop(url, None)
+            if update is None:
+                # отсеяна фильтром, исключением или разбором - отмечаем как просмотренную,
+                # чтобы не качать повторно на каждом опросе
+                self.store.add({'url': url, 'title': item.get('title'), 'date': item.get('published date')})
+            else:
+                published.append(update)
+        # статьи, ждущие повтора, не подтверждаем - источник отдаст их снова
+        self.feed.confirm(item['url'] for item in items if self.store.has(item['url']))
+        return published
+
+    def run(self):
+        try:
+            while not self._stop.is_set():
+                started = time.monotonic()
+                self.poll_once()
+                self._stop.wait(max(0, self.poll_interval - (time.monotonic() - started)))
+        finally:
+            if self.driver is not None:
+                self.driver.quit()
+
+    def stop(self):
+        self._stop.set()
+
+    # --- данные для HTTP ---
+    def snapshot(self):
+        with self._lock:
+            return {'indicator': self._indicator_value(), 'articles_in_window': len(self.window), 'seq': self.seq}
+
+    def updates_since(self, since):
+        with self._lock:
+            return [u for u in self.updates if u['seq'] > since]
+
+    def latency_stats(self):
+        with self._lock:
+            values = sorted(u['processing_sec'] for u in self.updates)
+            news_values = sorted(u['news_to_signal_sec'] for u in self.updates if u['news_to_signal_sec'] is not None)
+        def pct(vals, q):
+            return vals[min(len(vals) - 1, int(q * len(vals)))] if vals else None
+        return {
+            'count': len(values),
+            'processing_p50': pct(values, 0.5), 'processing_p95': pct(values, 0.95),
+            'news_to_signal_p50': pct(news_values, 0.5), 'news_to_signal_p95': pct(news_values, 0.95),
+        }
+
+
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            parsed = urlparse(self.path)
+            if parsed.path == '/indicator':
+                body = service.snapshot()
+            elif parsed.path == '/updates':
+                since = int(parse_qs(parsed.query).get('since', ['0'])[0])
+                body = service.updates_since(since)
+            elif parsed.path == '/latency':
+                body = service.latency_stats()
+            else:
+                self.send_error(404)
+                return
+            data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+    return Handler
+
+
+def serve(service, host='127.0.0.1', port=8765):
+    """Запускает HTTP сервер в фоне и цикл опроса в текущем потоке."""
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        service.run()
+    finally:
+        server.shutdown()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Живой новостной индикатор")
+    arg_parser.add_argument('--keyword', nargs='+', default=None, help="поисковые запросы GNews")
+    arg_parser.add_argument('--ticker', nargs='+', default=['SBER'], help="тикеры из tickers.py, если не задан --keyword")
+    arg_parser.add_argument('--feed', help="локальный json/jsonl файл или http адрес вместо GNews")
+    arg_parser.add_argument('--feeds', action='store_true', help="RSS / sitemap изданий (feeds.py) вместо GNews")
+    arg_parser.add_argument('--fetch', choices=['http', 'browser'], default='http')
+    arg_parser.add_argument('--interval', type=float, default=POLL_INTERVAL)
+    arg_parser.add_argument('--store', default=str(BASE_DIR / 'live_articles.db'))
+    arg_parser.add_argument('--no-models', action='store_true', help="без классификации и сентимента")
+    arg_parser.add_argument('--models', choices=['full', 'distilled', 'server'], default='full',
+                            help="bart + finbert, один проход e5 с головами (inference.py) или сервер моделей (inference_server.py)")
+    arg_parser.add_argument('--inference-url', default=None, help="адрес inference_server.py для --models server")
+    arg_parser.add_argument('--gate', choices=['enforce', 'shadow', 'off'], default=relevance_gate.mode,
+                            help="фильтр по заголовку до загрузки страницы")
+    arg_parser.add_argument('--host', default='127.0.0.1')
+    arg_parser.add_argument('--port', type=int, default=8765)
+    args = arg_parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    scorer = score_summary
+    if args.models == 'distilled':
+        from inference import score_summary as scorer
+    elif args.models == 'server':
+        from inference_server import InferenceClient
+        client = InferenceClient(args.inference_url) if args.inference_url else InferenceClient()
+        scorer = client.score_summary
+    if args.feed:
+        feed = LocalFeed(args.feed)
+    elif args.feeds:
+        from feeds import FeedSource
+        feed = FeedSource(tickers=None if args.keyword else args.ticker, keywords=args.keyword)
+    else:
+        feed = GNewsFeed(args.keyword or search_queries(args.ticker))
+    service = LiveIndicatorService(
+        feed, ArticleStore(args.store), fetch=args.fetch,
+        scorer=None if args.no_models else scorer, poll_interval=args.interval,
+        gate=RelevanceGate(mode=args.gate)
+    )
+    serve(service, args.host, args.port)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+Логгеры скрапера.
+
+Запись на диск идет в фоновом потоке: логгеры кладут записи в очередь
+(QueueHandler), а QueueListener раскладывает их по файлам:
+    logs/date_compare.log, logs/url.log, logs/missmatched_dates.log - текст, как раньше
+    logs/domain_health.log - решения circuit breaker (domain_health.py), дописывается
+    logs/events.jsonl - все записи в JSON, с полями url/domain/stage/outcome/timings,
+                        если они переданы через extra=
+
+Сообщения собираются лениво: в горячем цикле пишем logger.info("... %s", x),
+строка форматируется уже в потоке записи. Подробные логи кандидатов даты
+(extra=CANDIDATE) ограничены по частоте - лишнее выбрасывается, а число
+выброшенных записей пишется в лог раз в DROP_REPORT_INTERVAL секунд.
+
+Процессы пула разбора страниц пишут в ту же очередь через
+child_log_queue() / log_to_queue() - файлы открыты только в основном процессе.
+Файлы открываются при первой записи (delay=True) и только на дозапись,
+поэтому импорт модуля (процесс пула, date_analyzer.py, benchmark.py,
+failure_store.py retry) логи прошлого прогона не стирает. Скрапер
+(news_parse.main) начинает логи прогона с пустых файлов через start_run_logs().
+"""
+import atexit, json, os, logging, queue, threading, time
+from logging.handlers import QueueHandler, QueueListener
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent
+LOG_DIR = BASE_DIR / 'logs'
+
+os.makedirs(LOG_DIR, exist_ok=True)
+
+# поля, которые попадают в events.jsonl, если заданы через extra=
+EVENT_FIELDS = ('url', 'domain', 'stage', 'outcome', 'timings', 'gnews_date', 'source')
+
+# пометка для подробных логов кандидатов даты: logger.info(..., extra=CANDIDATE)
+CANDIDATE = {'verbose': True}
+CANDIDATE_RATE = 200        # записей в секунду в среднем
+CANDIDATE_BURST = 2000      # запас на всплеск
+DROP_REPORT_INTERVAL = 10   # секунд
+
+
+class JsonLineFormatter(logging.Formatter):
+    def format(self, record):
+        event = {
+            'ts': round(record.created, 3),
+            'logger': record.name,
+            'level': record.levelname,
+            'message': record.getMessage(),
+        }
+        for field in EVENT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                event[field] = value
+        return json.dumps(event, ensure_ascii=False, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """Token bucket для записей с extra=CANDIDATE, остальные пропускает всегда."""
+    def __init__(self, rate=CANDIDATE_RATE, burst=CANDIDATE_BURST):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.dropped = 0
+        self.reported = self.updated
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if not getattr(record, 'verbose', False):
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                if self.dropped and now - self.reported >= DROP_REPORT_INTERVAL:
+                    record.msg = f"  [ПРОПУЩЕНО {self.dropped} записей кандидатов] " + str(record.msg)
+                    self.dropped = 0
+                    self.reported = now
+                return True
+            self.dropped += 1
+            return False
+
+
+class LazyQueueHandler(QueueHandler):
+    """
+    QueueHandler без форматирования в вызывающем потоке: стандартный prepare()
+    склеивает msg % args сразу, а нам нужно сделать это уже в потоке записи.
+    """
+    def prepare(self, record):
+        if record.exc_info and not record.exc_text:
+            # traceback нужно снять сейчас, пока исключение живо
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_queue = queue.SimpleQueue()
+_file_handlers = []
+_run_handlers = []      # логи одного прогона скрапера - их обнуляет start_run_logs()
+
+
+def _file_handler(logger_name, file_name, per_run=True):
+    handler = logging.FileHandler(LOG_DIR / file_name, mode='a', encoding='utf-8', delay=True)
+    handler.addFilter(logging.Filter(logger_name))
+    _file_handlers.append(handler)
+    if per_run:
+        _run_handlers.append(handler)
+    return handler
+
+
+def _queued_logger(name, file_name, per_run=True):
+    logger = logging.getLogger(name)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    handler = LazyQueueHandler(_queue)
+    logger.addHandler(handler)
+    _file_handler(name, file_name, per_run)
+    return logger, handler
+
+
+date_logger, date_logger_handler = _queued_logger('date_logger', 'date_compare.log')
+url_logger, url_logger_handler = _queued_logger('url_logger', 'url.log')
+missmatched_dates_logger, missmatched_dates_logger_handler = _queued_logger('missmatched_dates_logger', 'missmatched_dates.log')
+missmatched_dates_logger_handler.addFilter(RateLimitFilter())
+health_logger, health_logger_handler = _queued_logger('domain_health_logger', 'domain_health.log', per_run=False)
+
+events_handler = logging.FileHandler(LOG_DIR / 'events.jsonl', mode='a', encoding='utf-8', delay=True)
+events_handler.setFormatter(JsonLineFormatter())
+_run_handlers.append(events_handler)
+
+listener = QueueListener(_queue, *_file_handlers, events_handler, respect_handler_level=True)
+listener.start()
+
+
+_child_queue = None
+
+
+def child_log_queue():
+    """
+    Очередь для логов из пула процессов (news_parse.get_parse_pool): записи из
+    нее перекладываются в общую очередь и пишутся тем же listener.
+    """
+    global _child_queue
+    if _child_queue is None:
+        import multiprocessing
+        # тот же контекст, что у пула (spawn), иначе очередь не передать в процесс
+        _child_queue = multiprocessing.get_context('spawn').Queue()
+        threading.Thread(target=_forward_child_logs, daemon=True).start()
+    return _child_queue
+
+
+def _forward_child_logs():
+    while True:
+        _queue.put(_child_queue.get())
+
+
+def log_to_queue(target):
+    """
+    initializer для процесса пула: логгеры пишут в очередь родителя.
+    Стандартный QueueHandler - сообщение форматируется в дочернем процессе,
+    чтобы в pickle не попали произвольные args.
+    """
+    for logger in (date_logger, url_logger, missmatched_dates_logger, health_logger):
+        for old in list(logger.handlers):
+            handler = QueueHandler(target)
+            handler.filters = old.filters
+            logger.removeHandler(old)
+            logger.addHandler(handler)
+
+
+def start_run_logs():
+    """Обнулить логи прогона (date_compare, url, missmatched_dates, events) - в начале скрапинга."""
+    flush_logs()
+    for handler in _run_handlers:
+        handler.acquire()
+        try:
+            if handler.stream is not None:
+                handler.stream.close()
+                handler.stream = None
+            open(handler.baseFilename, 'w', encoding='utf-8').close()
+        finally:
+            handler.release()
+
+
+def flush_logs():
+    """Дописать очередь на диск (в конце окна / перед выходом)."""
+    global listener
+    listener.stop()
+    listener = QueueListener(_queue, *_file_handlers, events_handler, respect_handler_level=True)
+    listener.start()
+
+
+atexit.register(lambda: listener.stop())
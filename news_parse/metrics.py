@@ -0,0 +1,199 @@
+"""
+Легкая инструментация пайплайна: гистограммы времени и счетчики
+по этапу (stage), домену и исходу (ok/short/blocked/timeout/...), плюс
+gauge - последнее значение (глубина очереди, занятость этапа, см. pipeline.py).
+
+    with metrics.timer('driver_get', domain) as t:
+        driver.get(url)
+        t.outcome = 'ok'
+
+В конце окна / прогона снимок пишется в JSON и в текстовый формат Prometheus.
+В горячем цикле - только perf_counter, bisect и пара операций со словарем.
+"""
+import json, threading, time
+from bisect import bisect_left
+from pathlib import Path
+
+# верхние границы корзин гистограммы, секунды
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, float('inf'))
+
+
+def classify_exception(exc):
+    """Исход этапа по исключению: таймауты отдельно от остальных ошибок."""
+    if 'Timeout' in type(exc).__name__ or 'Timed out' in str(exc):
+        return 'timeout'
+    return 'error'
+
+
+class Histogram:
+    __slots__ = ('counts', 'total', 'count', 'max')
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.total = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.total += value
+        self.count += 1
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        for i, c in enumerate(other.counts):
+            self.counts[i] += c
+        self.total += other.total
+        self.count += other.count
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q):
+        """Оценка квантиля по корзинам (верхняя граница корзины)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, c in zip(BUCKETS, self.counts):
+            seen += c
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+
+class _Timer:
+    __slots__ = ('metrics', 'stage', 'domain', 'outcome', 'start', 'elapsed')
+
+    def __init__(self, metrics, stage, domain):
+        self.metrics = metrics
+        self.stage = stage
+        self.domain = domain
+        self.outcome = 'ok'
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None:
+            self.outcome = classify_exception(exc)
+        self.elapsed = time.perf_counter() - self.start
+        self.metrics.observe(self.stage, self.elapsed, self.domain, self.outcome)
+        return False
+
+
+class Metrics:
+    def __init__(self):
+        self.histograms = {}  # (stage, domain, outcome) -> Histogram
+        self.counters = {}    # (name, domain, outcome) -> int
+        self.gauges = {}      # (name, stage) -> последнее значение
+        self._lock = threading.Lock()
+
+    # метрики из процесса пула возвращаются в родитель через pickle (см. news_parse.parse_task)
+    def __getstate__(self):
+        return {'histograms': self.histograms, 'counters': self.counters, 'gauges': self.gauges}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def timer(self, stage, domain=''):
+        return _Timer(self, stage, domain)
+
+    def observe(self, stage, seconds, domain='', outcome='ok'):
+        key = (stage, domain, outcome)
+        with self._lock:
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = Histogram()
+            hist.observe(seconds)
+
+    def count(self, name, domain='', outcome='ok', n=1):
+        key = (name, domain, outcome)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + n
+
+    def gauge(self, name, value, stage=''):
+        with self._lock:
+            self.gauges[(name, stage)] = value
+
+    def merge(self, other):
+        with self._lock:
+            self.gauges.update(other.gauges)
+            for key, hist in other.histograms.items():
+                self.histograms.setdefault(key, Histogram()).merge(hist)
+            for key, n in other.counters.items():
+                self.counters[key] = self.counters.get(key, 0) + n
+
+    def reset(self):
+        with self._lock:
+            self.histograms = {}
+            self.counters = {}
+            self.gauges = {}
+
+    # --- выгрузка ---
+    def snapshot(self):
+        with self._lock:
+            stages = [
+                {
+                    'stage': stage, 'domain': domain, 'outcome': outcome,
+                    'count': h.count, 'sum': round(h.total, 6), 'max': round(h.max, 6),
+                    'p50': h.quantile(0.5), 'p95': h.quantile(0.95),
+                    'buckets': dict(zip(map(str, BUCKETS), h.counts)),
+                }
+                for (stage, domain, outcome), h in sorted(self.histograms.items())
+            ]
+            counters = [
+                {'name': name, 'domain': domain, 'outcome': outcome, 'value': n}
+                for (name, domain, outcome), n in sorted(self.counters.items())
+            ]
+            gauges = [
+                {'name': name, 'stage': stage, 'value': value}
+                for (name, stage), value in sorted(self.gauges.items())
+            ]
+        return {'stages': stages, 'counters': counters, 'gauges': gauges}
+
+    def stage_totals(self):
+        """Суммарное время и число вызовов по этапу без разбивки по доменам."""
+        totals = {}
+        with self._lock:
+            for (stage, _, _), h in self.histograms.items():
+                t = totals.setdefault(stage, Histogram())
+                t.merge(h)
+        return {stage: {'count': h.count, 'sum': round(h.total, 6), 'p50': h.quantile(0.5), 'p95': h.quantile(0.95)}
+                for stage, h in totals.items()}
+
+    def to_prometheus(self, prefix='news_parse'):
+        lines = [f'# TYPE {prefix}_stage_seconds histogram']
+        with self._lock:
+            for (stage, domain, outcome), h in sorted(self.histograms.items()):
+                labels = f'stage="{_escape(stage)}",domain="{_escape(domain)}",outcome="{_escape(outcome)}"'
+                cumulative = 0
+                for bound, c in zip(BUCKETS, h.counts):
+                    cumulative += c
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'{prefix}_stage_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+                lines.append(f'{prefix}_stage_seconds_sum{{{labels}}} {h.total}')
+                lines.append(f'{prefix}_stage_seconds_count{{{labels}}} {h.count}')
+            lines.append(f'# TYPE {prefix}_events_total counter')
+            for (name, domain, outcome), n in sorted(self.counters.items()):
+                lines.append(f'{prefix}_events_total{{name="{_escape(name)}",domain="{_escape(domain)}",outcome="{_escape(outcome)}"}} {n}')
+            lines.append(f'# TYPE {prefix}_gauge gauge')
+            for (name, stage), value in sorted(self.gauges.items()):
+                lines.append(f'{prefix}_gauge{{name="{_escape(name)}",stage="{_escape(stage)}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def dump(self, path_prefix):
+        """Пишет <path_prefix>.json и <path_prefix>.prom"""
+        path_prefix = Path(path_prefix)
+        path_prefix.parent.mkdir(parents=True, exist_ok=True)
+        Path(f'{path_prefix}.json').write_text(json.dumps(self.snapshot(), ensure_ascii=False, indent=2), encoding='utf-8')
+        Path(f'{path_prefix}.prom').write_text(self.to_prometheus(), encoding='utf-8')
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# общий экземпляр для пайплайна (метрики текущего окна)
+metrics = Metrics()
@@ -1,47 +1,47 @@
-import pandas as pd
-from gnews import GNews
-from dateutil import parser
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
-from sumy.parsers.plaintext import PlaintextParser
-from selenium.webdriver.common.by import By
-from sumy.nlp.tokenizers import Tokenizer
-from sumy.summarizers.lex_rank import LexRankSummarizer
-from selenium.common.exceptions import NoSuchElementException, TimeoutException, WebDriverException
-from nltk.tokenize import sent_tokenize
-import undetected_chromedriver as uc
-import re, json, time, trafilatura, nltk, csv, os, logging
+"""
+Скрапер новостей GNews: поиск, загрузка страниц, текст, дата и summary.
+
+Тяжелые зависимости (selenium, undetected_chromedriver, gnews, trafilatura,
+sumy/nltk, googlenewsdecoder, pandas) импортируются там, где нужны, поэтому
+импорт модуля быстрый. Компоненты:
+    date_extraction.py - паттерны дат и extract_page_date
+    drivers.py         - запуск Chrome
+    summarizer.py      - get_summary
+    loggers.py         - файловые логгеры
+    tickers.py         - тикеры: поисковые запросы и упоминания в тексте
+    pipeline.py        - конвейер этапов статьи с ограниченными очередями
+    article.py         - типизированная строка статьи: published_at в UTC, точность и источник даты
+"""
+import atexit, os, threading, time
 from datetime import datetime, timedelta
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from googlenewsdecoder import gnewsdecoder
-from collections import deque
 from pathlib import Path
 
-nltk.download('punkt')
-nltk.download('punkt_tab')
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+from static_page import StaticPage
+from article import Article, FOUND_SOURCES, to_frame, append_articles
+from corpus import Corpus, ReplayDriver
+from domain_profiles import DomainProfiles, domain_profiles, get_domain
+from domain_health import domain_health
+from browser_profiles import page_accounting, drain_performance_log
+from metrics import metrics, Metrics
+from failure_store import failure_store
+from loggers import (LOG_DIR, date_logger, url_logger, flush_logs, start_run_logs,
+                     child_log_queue, log_to_queue)
+from date_extraction import extract_page_date
+from drivers import init_stealth_driver
+from summarizer import get_summary
+from tickers import search_queries, match_tickers
+from relevance_gate import relevance_gate
+from pipeline import Pipeline, Stage
 
 BASE_DIR = Path(__file__).parent  # или parent.parent в зависимости от структуры
-LOG_DIR = BASE_DIR / 'logs'
+METRICS_DIR = LOG_DIR / 'metrics'
 
-os.makedirs(LOG_DIR, exist_ok=True)
-
-date_logger = logging.getLogger('date_logger')
-date_logger_handler = logging.FileHandler(LOG_DIR / 'date_compare.log', mode='w', encoding='utf-8')
-date_logger.setLevel(logging.INFO)
-date_logger.addHandler(date_logger_handler)
-
-url_logger = logging.getLogger('url_logger')
-url_logger_handler = logging.FileHandler(LOG_DIR / 'url.log', mode='w', encoding='utf-8')
-url_logger.setLevel(logging.INFO)
-url_logger.addHandler(url_logger_handler)
-
-missmatched_dates_logger = logging.getLogger('missmatched_dates_logger')
-missmatched_dates_logger_handler = logging.FileHandler(LOG_DIR / 'missmatched_dates.log', mode='w', encoding='utf-8')
-missmatched_dates_logger.setLevel(logging.INFO)
-missmatched_dates_logger.addHandler(missmatched_dates_logger_handler)
+# конвейер fetch_with_selenium (pipeline.py)
+DECODE_WORKERS = 4                    # потоков раскрытия ссылок GNews
+BROWSERS = 1                          # браузеров на этапе загрузки
+PARSE_WORKERS = os.cpu_count() or 1   # процессов разбора страниц; 0 - разбор в потоке основного процесса
 
 # --- КОНСТАНТЫ И ПАТТЕРНЫ ---
 excluded_domains = [
@@ -56,498 +56,446 @@ excluded_domains = [
     'blog.domclick.ru'
 ]
 
-meta_selectors = [
-    "meta[property='article:published_time']",
-    "meta[itemprop='datePublished']",
-    "meta[itemprop='dateModified']",
-    "meta[name='publish-date']",
-    "meta[property='og:published_time']", 
-    "meta[name='pubdate']",
-    "meta[name='originalPublicationDate']",
-    "link[rel='canonical']"
-]
-
-js_scripts = [
-    'application/ld+json'
-]
-
-possible_time_classes = [
-    "js-ago", "date", "news-item-header--date", "b-post-time", "post-time",
-    "article__info-date", "timestamp", "entry-date", "pWvg",
-    "c-post__date", "page-styles__date", "news-detail-date", "tag-date", 
-    "SHTMLCode", "article-details__date", "b-article__date", "article__date", 
-    "time", "full_news_date", "article-header__author-writing-date",
-    "article-date", "el-time", "date material__date", "date3", "date_item",
-    "article-date-desktop", "article-meta__date", "faq_date","post-info__date",
-    "desc"
-]
-
-possible_selectors = [
-    "span[title='Дата публикации']", "div[title='Дата публикации']",
-    "span[data-id='date']", "div[data-test='text']", "div[id='info-text-photo-date']",
-    "div.fn-rubric-link > div", ".text-grey.text-sm.span1",
-    ".tg-label-standard-regular-4b7-9-0-0.KVFz2",
-    "time", "div.text-nowrap.d-flex.flex-wrap.gap-3 > div", 
-    "div[class='MatterTop_date__mPSNt flex gap-[8px] mb-[16px] font-medium']",
-    "div[class='tg-label-standard-regular-4b7-9-0-1 KVFz2']", "div[data-test='article-created-at']",
-    "[data-qa='Datetime']", "[itemprop='datePublished']", "div[data-e2e-id='data-dynamic']",
-    "div[class='col-auto fw-bold']"
-]
-
-RU_MONTH_VALUES = {
-    'января': 'January', 'февраля': 'February', 'марта': 'March',
-    'апреля': 'April', 'мая': 'May', 'июня': 'June',
-    'июля': 'July', 'августа': 'August', 'сентября': 'September',
-    'октября': 'October', 'ноября': 'November', 'декабря': 'December',
-    # сокращения с точками
-    'янв.': 'January', 'фев.': 'February', 'март.': 'March',
-    # сокращения без точек
-    'янв': 'January', 'фев': 'February', 'март': 'March',
-}
-
-months_map = {
-    'янв': 1, 'фев': 2, 'мар': 3, 'апр': 4, 'май': 5, 'июн': 6,
-    'июл': 7, 'авг': 8, 'сен': 9, 'окт': 10, 'ноя': 11, 'дек': 12,
-    # сокразения на инглише
-    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
-    'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12,
-    # сокращения (с точкой)
-    'янв.': 1, 'фев.': 2, 'мар.': 3, 'апр.': 4, 'май': 5, 'июн': 6,
-    'июл': 7, 'авг': 8, 'сен': 9, 'окт': 10, 'ноя': 11, 'дек': 12,
-    # полные месяца (родительный падеж)
-    'января': 1, 'февраля': 2, 'марта': 3, 'апреля': 4, 'мая': 5, 'июня': 6,
-    'июля': 7, 'августа': 8, 'сентября': 9, 'октября': 10, 'ноября': 11, 'декабря': 12,
-    # полные названия (именительный падеж)
-    'январь': 1, 'февраль': 2, 'март': 3, 'апрель': 4, 'май': 5, 'июнь': 6,
-    'июль': 7, 'август': 8, 'сентябрь': 9, 'октябрь': 10, 'ноябрь': 11, 'декабрь': 12
-}
-
-custom_patterns = { # формат списка [позиция числа, позиция месяца, позиция года, часы, минуты]
-    # "2025-12-01 23:13:00+07:00" - из json
-    (r'(\d{4})-(\d{2})-(\d{2})\s+(\d{2}):(\d{2}):\d{2}[+-]\d{2}:\d{2}', True): [0, 1, 2, 3, 4],
-
-    # 2025-12-01 13:08:28
-    (r'(\d{4})-(\d{2})-(\d{2})\s+(\d{2}):(\d{2})', True): [2, 1, 0, 3, 4],
-
-    # 12-12-2026
-    (r'(\d{4})-(\d{2})-(\d{2})$', False): [0, 1, 2],
-
-    # Паттерн: "03 декабря 2025, 11:35" или "3 дек 2025 11:35"
-    (r'(\d{1,2})\s+([а-яa-z]+)\s+(\d{4})[,\s]+(\d{1,2}):(\d{1,2})', True): [0, 1, 2, 3, 4],
-    
-    # Паттерн: "03 декабря 2025" или "3 дек 2025"
-    (r'(\d{1,2})\s+([а-яa-z]+)\s+(\d{4})', False): [0, 1, 2, None, None],
-    
-    # "Дата публикации: 02 дек 2025"
-    (r'дата публикации:\s*(\d{1,2})\s+([а-яa-z]+)\s+(\d{4})', False): [1, 2, 3, None, None],
-
-    # 04.12.2025 в 07:56
-    (r'(\d{2})\.(\d{2})\.(\d{4})\s+в\s+(\d{1,2}):(\d{2})', True): [0, 1, 2, 3, 4],
-
-    # 04.12.2025 07:56
-    (r'(\d{2})\.(\d{2})\.(\d{4})\s*(?:в)?\s*(\d{1,2}):(\d{2})', True): [0, 1, 2, 3, 4],
+def decode_url(url):
+    """Раскрывает ссылку news.google.com в прямой URL статьи."""
+    if 'news.google.com' not in url:
+        return url
+    try:
+        from googlenewsdecoder import gnewsdecoder
+        decoded_data = gnewsdecoder(url)
+        return decoded_data.get('decoded_url', url) if isinstance(decoded_data, dict) else str(decoded_data)
+    except:
+        return url
 
-    # 5 декабря 2025 в 11:36
-    (r'(\d{1,2})\s+([а-яa-z]+)\s+в\s+(\d{4})', True): [0, 1, 2, 3, 4],
+def is_excluded(url):
+    return any(domain in url for domain in excluded_domains)
 
-    # 17:36, 14 декабря 2025 или 17:36 14 декабря 2025 
-    (r'(\d{1,2}):(\d{2})[,\s]+(\d{1,2})\s+([а-яёa-z]+)\s+(\d{4})', True): [2, 3, 4, 0, 1],
+def search_news(keyword, start_date, end_date, max_results=100):
+    """Поиск новостей GNews за период [start_date, end_date]."""
+    from gnews import GNews
+    google_news = GNews(language='ru', country='RU', max_results=max_results, exclude_websites=excluded_domains)
+    google_news.start_date = (start_date.year, start_date.month, start_date.day)
+    google_news.end_date = (end_date.year, end_date.month, end_date.day)
+    return google_news.get_news(keyword)
 
-    # 1. 05.07.2022 г. (с точкой в конце и "г.")
-    (r'(\d{2})\.(\d{2})\.(\d{4})\s*г\.', False): [0, 1, 2, None, None],
-    
-    # 2. 30.12.25 12:53 (двузначный год)
-    (r'(\d{2})\.(\d{2})\.(\d{2})\s+(\d{2}):(\d{2})', True): [0, 1, 2, 3, 4],
-    
-    # 3. пт, 02/27/2026 - 17:27 (с днем недели, слешами и дефисом)
-    (r'[а-я]{2},\s*(\d{2})/(\d{2})/(\d{4})\s*-\s*(\d{2}):(\d{2})', True): [0, 1, 2, 3, 4],
+def process_page(driver, url, item, failed_dates=None, profiles=domain_profiles):
+    """
+    Разбирает уже загруженную страницу: текст, дата публикации, summary.
+    driver - живой браузер или StaticPage.
+    profiles - профили дат доменов (domain_profiles.py), куда пишется и откуда берется порядок проверок.
+    Возвращает (строка для датафрейма или None, исход: ok / no_date / cert_wall / blocked / short).
+    no_date - строка есть, но дата взята из GNews.
+    """
+    import trafilatura
+    html = driver.page_source
+    domain = get_domain(driver.current_url)
 
-    # 09.12.2025 | 18:47
-    (r'(\d{2})\.(\d{2})\.(\d{4})\s*|\s*(\d{2}):(\d{2})', True): [0, 1, 2, 3, 4],
+    if any(x in html for x in ["Национального УЦ Минцифры", "403 Error"]):
+        metrics.count('article', domain, 'blocked')
+        return None, 'cert_wall'
 
-    # 4 декабря 2025 года, 11:04
-    (r'(\d{1,2})\s+([а-яa-z]+)\s+(\d{4})\s+года?\s*[,]?\s*(\d{1,2}):(\d{2})', True): [0, 1, 2, 3, 4]
-}
+    gnews_date = item.get('published date')
+    event = {'url': url, 'domain': domain, 'gnews_date': gnews_date, 'timings': {}}
 
-patterns = [
-    r'^\d{4}—\d{4}$', # Интервалы типа 2024—2025
-]
+    with metrics.timer('trafilatura', domain) as t:
+        text = trafilatura.extract(html, include_comments=False)
+        t.outcome = 'ok' if text and len(text) >= 300 else ('short' if text else 'blocked')
+    event['timings']['trafilatura'] = round(t.elapsed, 4)
 
-failed_urls_days = {}
-processing_url = {}
-attempted_match_logs = []
-
-def is_date_suitable(parsed_date, target_date, date_source, raw_date, has_time):
-
-    # Твоя проверка (разница дней <= 1, месяц и год совпадают)
-    is_day_match = (abs(parsed_date.date().day - target_date.date().day) <= 1 and 
-                    parsed_date.month == target_date.month and 
-                    parsed_date.year == target_date.year)
-        
-    if is_day_match and has_time:
-        missmatched_dates_logger.info(f"  [PERFECT MATCH] Src: {date_source} | Raw: '{raw_date}' | Parsed: {parsed_date}")
-        return "perfect"
-    elif is_day_match:
-        missmatched_dates_logger.info(f"  [PARTIAL MATCH (No Time)] Src: {date_source} | Raw: '{raw_date}' | Parsed: {parsed_date}")
-        return "partial"
+    if not text:
+        metrics.count('article', domain, 'blocked')
+        url_logger.warning("BLOCKED | Текст не извлечен из html для %s | GnewsDate: %s", url, gnews_date,
+                           extra={**event, 'stage': 'trafilatura', 'outcome': 'blocked'})
+        return None, 'blocked'
+
+    elif len(text) < 300:
+        metrics.count('article', domain, 'short')
+        url_logger.warning("SHORT TEXT | Слишком короткий текст на %s | GnewsDate: %s", url, gnews_date,
+                           extra={**event, 'stage': 'trafilatura', 'outcome': 'short'})
+        return None, 'short'
+
+    if item.get('feed'):
+        # время из RSS / sitemap издания (feeds.py) точное - на странице дату не ищем
+        page_date = None
+        event['outcome'] = 'feed'
     else:
-        missmatched_dates_logger.info(f"  [NO MATCH] Src: {date_source} | Raw: '{raw_date}' | Parsed: {parsed_date} | Days diff: {abs(parsed_date.date().day - target_date.date().day)} | Target days: {target_date.day}")
-        return "none"
-        
-def translate_month(date_str):
-    """Заменяет русские месяцы на английские для корректного парсинга."""
-    if not date_str: return date_str
-    date_str = date_str.lower()
-    for ru, en in RU_MONTH_VALUES.items():
-        if ru in date_str:
-            date_str = date_str.replace(ru, en)
-            break
-    return date_str
-
-def robust_parse(date_str, default_date_obj=None):
-    """Парсит строку в datetime. Если находит только время — склеивает с default_date_obj."""
-    if not date_str:
-        return None
-
-    date_str = date_str.lower().strip().replace('t', ' ').replace('z', '')
-
-    # 1. ОБРАБОТКА "ТОЛЬКО ВРЕМЯ" (Например: "18:30" или "18:30:00")
-    time_match = re.search(r'^(\d{1,2}):(\d{2})', date_str)
-    if time_match and len(date_str) <= 8:
-        # ПРАВКА: Теперь мы уверены, что работаем с объектом datetime
-        if isinstance(default_date_obj, datetime):
-            hour, minute = int(time_match.group(1)), int(time_match.group(2))
-            return default_date_obj.replace(hour=hour, minute=minute, second=0, microsecond=0), True
-        return None, False # Если объекта даты нет, время бесполезно
-
-    for (pattern, has_time), indices in custom_patterns.items():
-            match = re.search(pattern, date_str)
-            if match:
-                groups = match.groups()
-                try:
-                    # Извлекаем данные по индексам из схемы
-                    d_idx, m_idx, y_idx, h_idx, min_idx = indices
-                    
-                    day = int(groups[d_idx]) if d_idx is not None else (default_date_obj.day if default_date_obj else 1)
-                    year = int(groups[y_idx]) if y_idx is not None else (default_date_obj.year if default_date_obj else 2025)
-                    
-                    # Логика месяца (название или число)
-                    month_raw = groups[m_idx] if m_idx is not None else None
-                    if not month_raw:
-                        month = default_date_obj.month if default_date_obj else 1
-                    elif month_raw.isdigit():
-                        month = int(month_raw)
-                    else:
-                        month = None
-                        for k, v in months_map.items():
-                            if k in month_raw:
-                                month = v
-                                break
-                        if not month: continue # Месяц не распознан
-                    
-                    hour = int(groups[h_idx]) if h_idx is not None else 8
-                    minute = int(groups[min_idx]) if min_idx is not None else 0
-                    
-                    return datetime(year, month, day, hour, minute), has_time
-                except Exception:
-                    continue
-
-    # 3. ФОЛЛБЕК (БИБЛИОТЕКА)
+        with metrics.timer('extract_page_date', domain) as t:
+            page_date = extract_page_date(driver, url, gnews_date, profiles)
+            if isinstance(page_date, datetime):
+                t.outcome = 'perfect'
+            else:
+                t.outcome = 'partial' if page_date and page_date.get('date') else 'none'
+        event['timings']['extract_page_date'] = round(t.elapsed, 4)
+        event['outcome'] = t.outcome
+
+    with metrics.timer('get_summary', domain):
+        summary = get_summary(text)
+    article = Article.from_page(item, driver.current_url, page_date, summary,
+                                match_tickers(f"{item.get('title') or ''}\n{text}"))
+
+    if article.date_source in FOUND_SOURCES:
+        # Дата найдена (неважно, совпала или нет)
+        date_logger.info("OK | Дата: %s (%s, %s) | URL: %s", article.published_at, article.date_source,
+                         article.date_precision, url, extra={**event, 'stage': 'date'})
+    else:
+        # ВООБЩЕ ничего не нашли по всем спискам - дата из GNews (или время разбора, если нет и ее)
+        if failed_dates is not None:
+            failed_dates.append(url)
+        url_logger.warning("EMPTY | Элементы даты не найдены на %s", url, extra={**event, 'stage': 'date'})
+
+    metrics.count('article', domain, 'ok')
+    metrics.count('date_source', domain, article.date_source)
+    outcome = 'ok' if article.date_source in FOUND_SOURCES else 'no_date'
+    return article.to_row(), outcome
+
+def load_page(driver, url, decoded_url, corpus=None):
+    """driver.get с замером времени; в режиме записи корпуса сохраняет html или ошибку."""
+    recording = corpus is not None and corpus.mode == 'record'
+    live = not isinstance(driver, StaticPage)
+    domain = get_domain(decoded_url)
+    if live:
+        drain_performance_log(driver) # выкидываем хвост запросов прошлой страницы
+    started = time.perf_counter()
     try:
-        translated = translate_month(date_str)
-        # Убираем fuzzy=False, так как в мета-тегах часто бывает лишний текст
-        dt = parser.parse(translated, dayfirst=False, yearfirst=True, fuzzy=True)
-        return dt, (':' in date_str)
-    except:
-        return None, False
-
-def is_bad_pattern(text, url):
-    """Проверяет, соответствует ли текст нежелательным паттернам."""
-    if not text:
-        date_logger.info(f'НЕТ ТЕКСТА В URL {url}')
-        return True
-    text = text.strip()
-    for pattern in patterns:
-        if re.match(pattern, text):
-            date_logger.info(f'ПЛОХОЙ ПАТТЕРН В URL {url}')
-            return True
-    return False
-
-def is_valid_date_string(date_str):
+        with metrics.timer('driver_get', domain):
+            driver.get(decoded_url)
+    except Exception as e:
+        if recording:
+            corpus.record_error(url, decoded_url, e)
+        raise
+    finally:
+        if live:
+            # учет запросов и байт по странице (пусто, если профиль без performance лога)
+            for key, value in page_accounting(driver).items():
+                metrics.count(key, domain, n=value)
+    if recording:
+        corpus.record_page(url, decoded_url, driver.current_url, driver.page_source, time.perf_counter() - started)
+
+def unique_results(results):
+    """Выдача нескольких запросов без повторов (по ссылке GNews), порядок сохраняется."""
+    seen = set()
+    unique = []
+    for item in results:
+        if item['url'] not in seen:
+            seen.add(item['url'])
+            unique.append(item)
+    return unique
+
+_parse_pool = None
+_parse_pool_workers = None
+
+def get_parse_pool(workers=PARSE_WORKERS):
     """
-    Универсальная проверка: существует ли строка, 
-    достаточно ли она длинная и не содержит ли мусора.
+    Пул процессов для разбора страниц - один на прогон, логи воркеров идут в общий listener.
+    Процессы запускаются через spawn: к моменту первого разбора в родителе уже
+    работают потоки конвейера и логов, и fork мог бы унести в потомка чужую блокировку.
     """
-    if not date_str:
-        return False
-    
-    date_str = date_str.strip()
-    
-    # Отсекаем "12:30", "5 мин" и пустые строки
-    if len(date_str) <= 5:
-        return False
-        
-    # Проверяем на плохие паттерны
-    for pattern in patterns:
-        if re.match(pattern, date_str):
-            return False
-            
-    return True
-
-def find_key_recursive(obj, key_to_find):
-    """Рекурсивный поиск ключа в словаре или списке."""
-    if isinstance(obj, dict):
-        if key_to_find in obj:
-            return obj[key_to_find]
-        for v in obj.values():
-            result = find_key_recursive(v, key_to_find)
-            if result: return result
-    elif isinstance(obj, list):
-        for item in obj:
-            result = find_key_recursive(item, key_to_find)
-            if result: return result
-    return None
-
-def extract_page_date(driver, url, gnews_date_str):
-    missmatched_dates_logger.info(f"\nURL: {url}\nGNews Target: {gnews_date_str}\nFound attempts:")
-    try:
-        gnews_dt_obj = parser.parse(gnews_date_str)
-    except:
-        gnews_dt_obj = None
-
-    fallback_date = {"date": None, "has_time": False}
-
-    def process_element(raw_value, source):
-        nonlocal fallback_date
-        if not raw_value or len(raw_value.strip()) < 4: return None
+    global _parse_pool, _parse_pool_workers
+    if _parse_pool is not None and _parse_pool_workers != workers:
+        _parse_pool.shutdown()
+        _parse_pool = None
+    if _parse_pool is None:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        _parse_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                          initializer=log_to_queue, initargs=(child_log_queue(),))
+        _parse_pool_workers = workers
+        atexit.register(_parse_pool.shutdown)
+    return _parse_pool
+
+def parse_task(task):
+    """
+    Разбор сохраненного html в процессе пула. profile - профиль дат домена из родителя.
+    Возвращает (строка, исход, метрики разбора, попадания профилей дат) - метрики
+    и профили родитель сливает к себе сам.
+    """
+    url, item, html, final_url, profile = task
+    metrics.reset()
+    profiles = DomainProfiles(path=None)
+    if profile:
+        profiles.data[get_domain(final_url)] = profile
+    profiles.journal = []
+    row, outcome = process_page(StaticPage(html, final_url), url, item, profiles=profiles)
+    return row, outcome, metrics, profiles.journal
+
+def fetch_with_selenium(keyword, start_date, end_date, corpus=None, failures=failure_store, results=None, gate=relevance_gate,
+                        browsers=BROWSERS, parse_workers=PARSE_WORKERS, health=domain_health, profiles=domain_profiles):
+    """
+    keyword - строка или список запросов (например, search_queries(['SBER', 'VTBR'])):
+    выдачи объединяются, и каждая статья грузится один раз, сколько бы запросов ее ни нашли.
+    results - уже готовая выдача за окно (query_planner.py), тогда GNews не запрашивается.
+    gate - фильтр по заголовку до загрузки (relevance_gate.py), None - грузить все.
+    corpus - офлайн корпус страниц (см. corpus.py): в режиме 'record' сохраняет
+    выдачу GNews и html, в режиме 'replay' работает только по нему, без сети и браузера.
+    failures - куда писать неудачные статьи для failure_store.py retry (при replay не пишем).
+    health, profiles - здоровье доменов и профили дат; для воспроизводимого replay
+    (benchmark.py) - чистые экземпляры в памяти вместо сохраненных на диске.
+
+    Статьи идут по конвейеру (pipeline.py), этапы работают одновременно:
+        decode - раскрытие ссылок GNews, дубли, исключения, здоровье домена (DECODE_WORKERS потоков)
+        fetch  - driver.get, браузер на поток (browsers); дальше нужен только html
+        parse  - trafilatura, дата, summary в пуле из parse_workers процессов (0 - в потоке)
+        redate - дата по живому DOM для страниц из браузера, где в сохраненном html ее не нашлось
+                 (ее дорисовывает js после снимка page_source): страница грузится заново (browsers)
+        write  - строки, failures.db и здоровье домена по итогам разбора (один поток)
+    """
+    import pandas as pd
+    replay = corpus is not None and corpus.mode == 'replay'
+    recording = corpus is not None and corpus.mode == 'record'
+    all_news = []
+    failed_dates = [] # Сюда попадут только URL с полным нулем
+    if replay:
+        failures = None
+    queries = [keyword] if isinstance(keyword, str) else list(keyword)
+    seen_urls = set() # раскрытые URL: разные ссылки GNews могут вести на одну статью
+    seen_lock = threading.Lock()
+    local = threading.local()
+    drivers = []
+    drivers_lock = threading.Lock()
+    pool = get_parse_pool(parse_workers) if parse_workers else None
+
+    def record_failure(url, item, decoded_url, domain, stage, reason, exc=None, delay=None):
+        failed_dates.append(url)
+        if failures is not None:
+            failures.record(url, item, decoded_url, domain, ', '.join(queries), (start_date, end_date), stage, reason, exc, delay)
+
+    def get_driver():
+        # браузер на поток этапа fetch, таймаут загрузки выставляется по домену
+        if getattr(local, 'driver', None) is None:
+            local.driver = ReplayDriver(corpus) if replay else init_stealth_driver()
+            local.page_load_timeout = None
+            with drivers_lock:
+                drivers.append(local.driver)
+        return local.driver
+
+    def browser_for(domain):
+        driver = get_driver()
+        timeout = health.timeout_for(domain)
+        if not replay and timeout != local.page_load_timeout:
+            driver.set_page_load_timeout(timeout)
+            local.page_load_timeout = timeout
+        return driver
+
+    def decode(item):
+        url = item['url']
+        with metrics.timer('gnewsdecoder'):
+            decoded_url = corpus.decode(url) if replay else decode_url(url)
+        domain = get_domain(decoded_url)
+        with seen_lock:
+            duplicate = decoded_url in seen_urls
+            seen_urls.add(decoded_url)
+        if duplicate:
+            metrics.count('article', domain, 'duplicate')
+            return None
+
+        if is_excluded(decoded_url):
+            if recording:
+                corpus.record_skip(url, decoded_url)
+            metrics.count('article', domain, 'excluded')
+            return None
+
+        # домен, который подряд падает или блокирует, пропускаем до пробной загрузки
+        allowed, reason = health.allow(domain, url)
+        if not allowed:
+            metrics.count('article', domain, 'skipped')
+            record_failure(url, item, decoded_url, domain, 'load', 'skipped', delay=health.retry_after(domain))
+            url_logger.warning("SKIPPED | %s | %s | GnewsDate: %s", reason, url, item.get('published date'),
+                               extra={'url': url, 'domain': domain, 'stage': 'load', 'outcome': 'skipped'})
+            return None
+        return {'item': item, 'url': url, 'decoded_url': decoded_url, 'domain': domain}
+
+    def fetch(task):
+        item, url, decoded_url, domain = task['item'], task['url'], task['decoded_url'], task['domain']
+        if item.get('html'):
+            # полный текст уже пришел в ленте (feeds.py) - браузер не нужен
+            metrics.count('page_source', domain, 'feed')
+            return {**task, 'html': item['html'], 'final_url': decoded_url, 'load_seconds': None}
+        driver = browser_for(domain)
+        timeout = health.timeout_for(domain)
+        try:
+            started = time.perf_counter()
+            load_page(driver, url, decoded_url, corpus)
+            # time.sleep(3)
+            return {**task, 'html': driver.page_source, 'final_url': driver.current_url,
+                    'load_seconds': time.perf_counter() - started}
+        except TimeoutException as e:
+            metrics.count('article', domain, 'timeout')
+            health.record_failure(domain, 'timeout')
+            record_failure(url, item, decoded_url, domain, 'load', 'timeout', e)
+            url_logger.warning("TimeoutException | Страница не загрузилась за %s сек %s | GnewsDate: %s", timeout, url, item.get('published date'),
+                               extra={'url': url, 'domain': domain, 'stage': 'load', 'outcome': 'timeout'})
+        except WebDriverException as e:
+            metrics.count('article', domain, 'timeout' if "Timed out" in str(e) else 'error')
+            if "Timed out receiving message from renderer" in str(e):
+                health.record_failure(domain, 'renderer_timeout')
+                record_failure(url, item, decoded_url, domain, 'load', 'renderer_timeout', e)
+                url_logger.warning("WEBDRIVER TIMEOUT | Ошибка выполнения запроса на %s | GnewsDate: %s", url, item.get('published date'),
+                                   extra={'url': url, 'domain': domain, 'stage': 'load', 'outcome': 'renderer_timeout'})
+            else:
+                health.record_failure(domain, 'webdriver_error')
+                record_failure(url, item, decoded_url, domain, 'load', 'webdriver_error', e)
+                url_logger.warning("WEBDRIVER UNKNOWN ERROR | Неизвестная ошибка выполнения запроса на %s | GnewsDate: %s", url, item.get('published date'),
+                                   extra={'url': url, 'domain': domain, 'stage': 'load', 'outcome': 'webdriver_error'})
+        except Exception as e:
+            metrics.count('article', domain, 'error')
+            health.record_failure(domain, 'error')
+            record_failure(url, item, decoded_url, domain, 'load', 'error', e)
+            url_logger.warning("UNKNOW NERROR | Неизвестная ошибка выполнения запроса на %s | GnewsDate: %s", url, item.get('published date'),
+                               extra={'url': url, 'domain': domain, 'stage': 'load', 'outcome': 'error'})
+        return None
 
-        # Получаем дату и флаг наличия времени
-        parsed_dt, has_time = robust_parse(raw_value, gnews_date_str)
-        
-        if parsed_dt:
-            # Твоя оригинальная проверка match_status
-            match_status = is_date_suitable(parsed_dt, gnews_dt_obj, source, raw_value, has_time)
-            
-            if match_status == "perfect":
-                return parsed_dt # СРАЗУ ВЫХОДИМ! Нашли идеальное совпадение
-            
-            elif match_status == "partial":
-                # ПРАВКА: Логика обновления словаря
-                # Обновляем если: еще ничего нет ИЛИ если новая дата с временем, а старая была без
-                if not fallback_date["date"] or (has_time and not fallback_date["has_time"]):
-                    fallback_date["date"] = parsed_dt
-                    fallback_date["has_time"] = has_time
-                    missmatched_dates_logger.info(f"  [FALLBACK UPDATED] {source}: {parsed_dt} (has_time: {has_time})")
-
-    # scripts
-    for item in js_scripts:
+    def parse(task):
+        profile_hits = []
+        if pool is None:
+            row, outcome = process_page(StaticPage(task['html'], task['final_url']), task['url'], task['item'], profiles=profiles)
+        else:
+            row, outcome, page_metrics, profile_hits = pool.submit(parse_task, (task['url'], task['item'], task['html'], task['final_url'],
+                                                                              profiles.profile(get_domain(task['final_url'])))).result()
+            metrics.merge(page_metrics)
+        return {'item': task['item'], 'url': task['url'], 'decoded_url': task['decoded_url'], 'domain': task['domain'],
+                'load_seconds': task['load_seconds'], 'row': row, 'outcome': outcome, 'profile_hits': profile_hits}
+
+    def redate(task):
+        # html из ленты и replay - уже все, что есть; браузер нужен только живой
+        if task['outcome'] != 'no_date' or task['load_seconds'] is None or replay:
+            return task
+        item, url, row, domain = task['item'], task['url'], task['row'], task['domain']
         try:
-            WebDriverWait(driver, 3).until(EC.presence_of_element_located((By.CSS_SELECTOR, f'script[type="{item}"]')))
-            scripts = driver.find_elements(By.CSS_SELECTOR, f'script[type="{item}"]')
-
-            for script in scripts:
-                try:         
-                    json_text = script.get_attribute("textContent")
-                    data = json.loads(json_text)
-                    res = find_key_recursive(data, "datePublished") or find_key_recursive(data, "dateCreated")
-                    if res := process_element(res, "json-ld:datePublished"): 
-                        return res
-                            
-                except:
-                    continue
-        except:
-            url_logger.info(f'webdriverWait/find_element ERROR | url {url} | GnewsDate: {gnews_date_str}')
-            pass
-
-    # Meta
-    for s in meta_selectors:
-            try:
-                val = driver.find_element(By.CSS_SELECTOR, s).get_attribute("content")
-                if res := process_element(val, f"meta:{s}"):
-                    return res
-            except: continue
-
-    # Селекторы и классы
-    all_selectors = possible_time_classes + possible_selectors
-    for item in all_selectors:
-        if not any(c in item for c in ['.', '[', '#']):
-            search_variants = [item, f".{item}"] # и 'time', и '.time'
+            driver = browser_for(domain)
+            load_page(driver, url, task['decoded_url'])
+            with metrics.timer('extract_page_date_live', domain):
+                page_date = extract_page_date(driver, url, item.get('published date'), profiles)
+            article = Article.from_page(item, driver.current_url, page_date, row['summary'],
+                                        row['tickers'].split(',') if row['tickers'] else [])
+        except Exception as e:
+            # остается строка с датой GNews из разбора html
+            metrics.count('live_date', domain, 'error')
+            url_logger.info("LIVE DATE ERROR | Повторный поиск даты в браузере не удался на %s: %s", url, e,
+                            extra={'url': url, 'domain': domain, 'stage': 'date', 'outcome': 'error'})
+            return task
+        if article.date_source not in FOUND_SOURCES:
+            metrics.count('live_date', domain, 'none')
+            return task
+        metrics.count('live_date', domain, 'found')
+        date_logger.info("OK LIVE | Дата: %s (%s, %s) | URL: %s", article.published_at, article.date_source,
+                         article.date_precision, url, extra={'url': url, 'domain': domain, 'stage': 'date'})
+        return {**task, 'row': article.to_row(), 'outcome': 'ok'}
+
+    def write(task):
+        item, url, decoded_url, domain, row, outcome = (task[k] for k in ('item', 'url', 'decoded_url', 'domain', 'row', 'outcome'))
+        # профили дат, выученные в процессе пула, иначе остались бы в нем
+        profiles.merge(task['profile_hits'])
+        if row:
+            if 'gate_decision' in item:
+                row.update(gate_decision=item['gate_decision'], gate_score=item['gate_score'])
+            all_news.append(row)
+            # html из ленты (load_seconds None) тоже закрывает пробу half-open, но без замера времени
+            health.record_success(domain, task['load_seconds'])
+            if outcome == 'no_date':
+                record_failure(url, item, decoded_url, domain, 'date', outcome)
+            elif failures is not None:
+                failures.resolve(url)
         else:
-            search_variants = [item]
-        for sel in search_variants:
-            try:
-                elements = driver.find_elements(By.CSS_SELECTOR, sel)
-                for el in elements:
-                    if res := process_element(el.get_attribute("datetime"), f"attr:datetime in {sel}"): return res
-                    if res := process_element(el.get_attribute("content"), f"attr:content in {sel}"): return res
-                    if res := process_element(el.text.strip(), f"text in {sel}"): return res
-            except: continue
-
-    if fallback_date:
-        missmatched_dates_logger.info("  --> Returned PARTIAL match (no time found).")
-    else:
-        missmatched_dates_logger.info(f"  [NOT FOUND] No dates found for URL in any source.")
-    return fallback_date
-
-def init_driver():
-    chrome_options = Options()
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--headless=new")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--ignore-certificate-errors")
-    chrome_options.add_argument("--allow-insecure-localhost")
-    chrome_options.add_argument("--ignore-ssl-errors=yes")
-    chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-    chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36")
-    chrome_options.page_load_strategy = 'normal'
-    prefs = {
-        "profile.managed_default_content_settings.images": 2, # 2 = блокировать
-        "profile.default_content_settings.ads": 2,
-    }
-    chrome_options.add_experimental_option("prefs", prefs)
-    service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=chrome_options)
-    driver.set_page_load_timeout(10)
-    return driver
-
-def init_stealth_driver():
-    options = uc.ChromeOptions()
-
-    options.add_argument("--disable-blink-features=AutomationControlled")
-
-    options.add_argument("--window-position=3200,0") 
-    options.add_argument("--window-size=1280,600")
-
-    driver = uc.Chrome(options=options, version_main=145)
-    return driver
-
-def get_summary(text, max_sentences=4):
-    if not text or len(text) < 100: return "Текст слишком короткий"
-    clean_text = " ".join(text.replace("\n", " ").split())
-    try:
-        parser_sum = PlaintextParser.from_string(clean_text, Tokenizer("russian"))
-        summarizer = LexRankSummarizer()
-        sumy_result = summarizer(parser_sum.document, max_sentences)
-        raw_summary = " ".join([str(s) for s in sumy_result])
-        real_sentences = sent_tokenize(raw_summary, language="russian")
-        return ' '.join(real_sentences[:max_sentences]) if real_sentences else raw_summary
-    except Exception as e:
-        return f"Ошибка обработки: {e}"
-
-def fetch_with_selenium(keyword, start_date, end_date):
-    driver = init_stealth_driver()
-    all_news = []
-    failed_dates = [] # Сюда попадут только URL с полным нулем
-    google_news = GNews(language='ru', country='RU', max_results=100, exclude_websites=excluded_domains)
+            health.record_failure(domain, outcome)
+            record_failure(url, item, decoded_url, domain, 'trafilatura', outcome)
+
+    def on_error(stage, task, e):
+        # исключение, которое этап не разобрал сам (например, упал разбор страницы)
+        item = task['item'] if 'item' in task else task
+        domain = task.get('domain', '')
+        metrics.count('article', domain, 'error')
+        if domain:
+            health.record_failure(domain, 'error')
+        record_failure(item['url'], item, task.get('decoded_url'), domain, 'load' if stage == 'fetch' else 'trafilatura', 'error', e)
+        url_logger.warning("UNKNOW NERROR | Ошибка на этапе %s для %s | GnewsDate: %s", stage, item['url'], item.get('published date'),
+                           extra={'url': item['url'], 'domain': domain, 'stage': stage, 'outcome': 'error'})
 
     try:
-        google_news.start_date = (start_date.year, start_date.month, start_date.day)
-        google_news.end_date = (end_date.year, end_date.month, end_date.day)
-        results = google_news.get_news(keyword)
-        
-        for item in results:
-            url = item['url']
-            try:                  
-                decoded_data = gnewsdecoder(url)
-                decoded_url = decoded_data.get('decoded_url', url) if isinstance(decoded_data, dict) else str(decoded_data)
-            
-            except:
-                decoded_url = url
-
-            if any(domain in decoded_url for domain in excluded_domains):
-                continue
-
-            try:
-                driver.get(decoded_url)
-                # time.sleep(3)
-                html = driver.page_source
-                
-                if any(x in html for x in ["Национального УЦ Минцифры", "403 Error"]):
-                    continue
-
-                text = trafilatura.extract(html, include_comments=False)
-
-                if not text:
-                    url_logger.warning(f"BLOCKED | Текст не извлечен из html для {url} | GnewsDate: {item.get('published date')}")
-                    continue
-
-                elif len(text) < 300:
-                    url_logger.warning(f"SHORT TEXT | Слишком короткий текст на {url} | GnewsDate: {item.get('published date')}")
-                    continue
-                
-                
-                # ВЫЗОВ ФУНКЦИИ (теперь без лишних параметров внутри)
-                page_date = extract_page_date(driver, url, item.get('published date'))
-
-                if page_date:
-                    # Дата найдена (неважно, совпала или нет)
-                    final_date = page_date
-                    date_logger.info(f"OK | Дата: {final_date} | URL: {url}")
-                else:
-                    # ВООБЩЕ ничего не нашли по всем спискам
-                    failed_dates.append(url)
-                    final_date = item.get('published date')
-                    url_logger.warning(f"EMPTY | Элементы даты не найдены на {url}")
-                
-                if text:
-                    all_news.append({
-                        'date': item.get('published date'),
-                        'scraped_date': final_date,
-                        'title': item.get('title'),
-                        'url': driver.current_url,
-                        'summary': get_summary(text)
-                    })
-            except TimeoutException:
-                failed_dates.append(url)
-                url_logger.warning(f"TimeoutException | Страница не загрузилась за 10 сек {url} | GnewsDate: {item.get('published date')}")
-            except WebDriverException as e:
-                failed_dates.append(url)
-                if "Timed out receiving message from renderer" in str(e):
-                    url_logger.warning(f"WEBDRIVER TIMEOUT | Ошибка выполнения запроса на {url} | GnewsDate: {item.get('published date')}")
-                else:
-                    url_logger.warning(f"WEBDRIVER UNKNOWN ERROR | Неизвестная ошибка выполнения запроса на {url} | GnewsDate: {item.get('published date')}")
-            except Exception as e:
-                failed_dates.append(url)
-                url_logger.warning(f"UNKNOW NERROR | Неизвестная ошибка выполнения запроса на {url} | GnewsDate: {item.get('published date')}")
+        if results is not None:
+            if recording:
+                corpus.record_search(queries[0] if len(queries) == 1 else ', '.join(queries), start_date, end_date, results)
+        else:
+            results = []
+            for query in queries:
+                with metrics.timer('gnews_search'):
+                    if replay:
+                        found = corpus.search(query, start_date, end_date)
+                    else:
+                        found = search_news(query, start_date, end_date)
+                if recording:
+                    corpus.record_search(query, start_date, end_date, found)
+                results += found
+        metrics.count('gnews_results', n=len(results))
+        results = unique_results(results)
+        metrics.count('gnews_unique', n=len(results))
+        if gate is not None:
+            results = gate.plan(results) # явный шум не грузим, сомнительное - в конец окна
+
+        pipeline = Pipeline([
+            Stage('decode', decode, DECODE_WORKERS),
+            Stage('fetch', fetch, browsers),
+            Stage('parse', parse, max(parse_workers, 1)),
+            Stage('redate', redate, browsers),
+            Stage('write', write, 1),
+        ], on_error=on_error)
+        report = pipeline.run(results)
+        date_logger.info("Конвейер окна %s: %s", f"{start_date:%Y-%m-%d}",
+                         '; '.join(f"{r['stage']}: {r['items']} шт, занят {r['utilization']:.0%}, очередь до {r['queue_max']}" for r in report))
     finally:
-        driver.quit()
-    return pd.DataFrame(all_news), pd.DataFrame(failed_dates)
+        for driver in drivers:
+            driver.quit()
+    return to_frame(all_news), pd.DataFrame(failed_dates)
 
 def main():
-    KEYWORD = "сбербанк"
+    start_run_logs()
+    TICKERS = ['SBER'] # несколько тикеров - одна общая выдача, см. tickers.py
+    QUERIES = search_queries(TICKERS)
     start_date = datetime(2025, 12, 1)
     end_date = datetime(2026, 2, 23)
     WINDOW = 3
-    
-    current_date = start_date
-    while current_date <= end_date:
-        next_date = current_date + timedelta(days=WINDOW)
+    RECORD_CORPUS = None # имя корпуса, если нужно сохранить страницы для офлайн прогонов (corpus.py)
 
+    corpus = Corpus(RECORD_CORPUS, mode='record') if RECORD_CORPUS else None
+    
+    run_metrics = Metrics()
+    run_id = datetime.now().strftime('%Y%m%d_%H%M%S')
+    os.makedirs(METRICS_DIR / run_id, exist_ok=True)
+
+    # выдача GNews за весь период сразу: загруженные дни делятся, тихие склеиваются (query_planner.py)
+    from query_planner import QueryPlanner, group_by_window
+    import pandas as pd
+    period_end = end_date + timedelta(days=1)
+    planner = QueryPlanner()
+    results = planner.run(QUERIES, start_date, period_end)
+    planner.save()
+    pd.DataFrame(planner.report(results, start_date, period_end)).to_csv(METRICS_DIR / run_id / 'query_plan.csv', index=False)
+    run_metrics.merge(metrics)
+    metrics.reset()
+
+    for current_date, next_date, window_results in group_by_window(results, start_date, period_end, WINDOW):
         try:
-            df, failed = fetch_with_selenium(KEYWORD, current_date, next_date)
+            df, failed = fetch_with_selenium(QUERIES, current_date, next_date, corpus, results=window_results)
             
             if not df.empty:
-                file_name = f'{KEYWORD}_{WINDOW}day_news.csv'
-                df.to_csv(file_name, mode='a', index=False, header=not os.path.exists(file_name), encoding='utf-8-sig')
+                name = QUERIES[0] if len(TICKERS) == 1 else '_'.join(TICKERS)
+                file_name = f'{name}_{WINDOW}day_news.csv'
+                append_articles(df, file_name)
             
+            # подробности по неудачам - в failures.db, повтор: python failure_store.py retry
             if not failed.empty:
-                for f_url in failed.values:
-                    url_key = f_url[0]
-                    # Получаем данные или пустой кортеж, если данных нет
-                    debug_data = failed_urls_days.get(url_key)
-                    
-                    if debug_data:
-                        extracted_d, default_d, raw_s = debug_data
-                        date_logger.info(
-                            f"Failed match for: {url_key}\n"
-                            f"  -> Default (GNews): {default_d}\n"
-                            f"  -> Extracted (Parsed): {extracted_d}\n"
-                            f"  -> Raw string from site: '{raw_s}'"
-                    )
+                date_logger.info("Окно %s: неудачных статей %s", f"{current_date:%Y-%m-%d}", len(failed))
         except Exception as e:
-            url_logger.error(f"Ошибка выполнения: {e}")
+            url_logger.error("Ошибка выполнения: %s", e)
         finally:
-            current_date = next_date
+            # метрики окна отдельно, затем копим в метрики всего прогона
+            metrics.dump(METRICS_DIR / run_id / f'window_{current_date:%Y-%m-%d}')
+            domain_profiles.save()
+            domain_health.save()
+            flush_logs()
+            run_metrics.merge(metrics)
+            metrics.reset()
+
+    run_metrics.dump(METRICS_DIR / run_id / 'run')
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
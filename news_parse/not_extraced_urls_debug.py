@@ -4,7 +4,7 @@ from datetime import datetime
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
+from drivers import chromedriver_path
 from selenium.webdriver.common.by import By
 from dateutil import parser
 
@@ -104,17 +104,17 @@ def init_driver():
     opts = Options()
     opts.add_argument("--headless")
     opts.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36")
-    return webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=opts)
+    return webdriver.Chrome(service=Service(chromedriver_path()), options=opts)
 
 def main():
-    url_file = LOG_DIR / 'url.log'
-    if not url_file.exists():
-        print("url.log не найден")
+    from failure_store import failure_store
+    failed = failure_store.load()
+    # страницы, где не нашли дату, из failures.db (раньше - разбор текста url.log)
+    urls = failed.loc[failed['reason'] == 'no_date', 'decoded_url'].dropna().unique().tolist()
+    if not urls:
+        print("В failures.db нет страниц без даты")
         return
 
-    with open(url_file, 'r', encoding='utf-8') as f:
-        urls = [line.split()[-1] for line in f]
-
     driver = init_driver()
     for url in urls:
         print(f"Анализируем: {url}")
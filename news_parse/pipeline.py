@@ -0,0 +1,156 @@
+"""
+Конвейер этапов с ограниченными очередями.
+
+Этап - несколько потоков и входная очередь на queue_size элементов. Поток
+берет элемент, вызывает handler и кладет результат (если не None) в очередь
+следующего этапа. Если та заполнена, поток ждет: медленный этап притормаживает
+быстрые, а очереди и память не растут. Пропускная способность конвейера -
+у самого медленного этапа, а не сумма времени всех этапов.
+
+CPU работа уходит в пул процессов из handler (pool.submit(...).result()):
+потоки этапа только ждут результат, поэтому задач в пуле не больше, чем
+потоков у этапа.
+
+Наблюдаемость (metrics.py):
+    pipeline_<этап>                      - гистограмма времени на элемент
+    gauge queue_depth{stage}             - глубина очереди, раз в SAMPLE_INTERVAL
+    gauge queue_depth_max, utilization   - по итогам прогона (report())
+"""
+import logging, queue, threading, time
+
+from metrics import metrics
+
+QUEUE_SIZE = 8
+SAMPLE_INTERVAL = 0.5
+
+_STOP = object()
+
+pipeline_logger = logging.getLogger('pipeline')
+
+
+class Stage:
+    def __init__(self, name, handler, workers=1, queue_size=QUEUE_SIZE):
+        self.name = name
+        self.handler = handler
+        self.workers = workers
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.next = None
+        self.on_error = None
+        self.items = 0
+        self.errors = 0
+        self.busy = 0.0
+        self.depth_max = 0
+        self.depth_sum = 0
+        self.samples = 0
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"{self.name}-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        """Дождаться, пока этап разберет очередь (все, что положено до вызова)."""
+        for _ in self._threads:
+            self.queue.put(_STOP)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def _work(self):
+        while True:
+            item = self.queue.get()
+            if item is _STOP:
+                return
+            result = None
+            with metrics.timer(f'pipeline_{self.name}') as t:
+                try:
+                    result = self.handler(item)
+                except Exception as e:
+                    t.outcome = 'error'
+                    with self._lock:
+                        self.errors += 1
+                    if self.on_error is not None:
+                        # упавший on_error не должен ронять поток: иначе очередь этапа
+                        # перестанет разбираться, а put предыдущего этапа и stop() зависнут
+                        try:
+                            self.on_error(self.name, item, e)
+                        except Exception:
+                            pipeline_logger.exception("on_error упал на этапе %s", self.name)
+            with self._lock:
+                self.items += 1
+                self.busy += t.elapsed
+            if result is not None and self.next is not None:
+                self.next.queue.put(result) # ждет, если следующий этап не успевает
+
+    def sample(self):
+        depth = self.queue.qsize()
+        with self._lock:
+            self.depth_max = max(self.depth_max, depth)
+            self.depth_sum += depth
+            self.samples += 1
+        metrics.gauge('queue_depth', depth, self.name)
+
+
+class Pipeline:
+    """
+    Этапы по порядку: выход одного - вход следующего.
+    on_error(этап, элемент, исключение) - для ошибок, которые handler не обработал сам.
+    """
+    def __init__(self, stages, on_error=None):
+        self.stages = stages
+        for stage, following in zip(stages, stages[1:] + [None]):
+            stage.next = following
+            stage.on_error = on_error
+        self.elapsed = 0.0
+
+    def _sampler(self, done):
+        while not done.wait(SAMPLE_INTERVAL):
+            for stage in self.stages:
+                stage.sample()
+
+    def run(self, items):
+        """Прогоняет items через все этапы и ждет окончания. Возвращает report()."""
+        started = time.perf_counter()
+        done = threading.Event()
+        sampler = threading.Thread(target=self._sampler, args=(done,), daemon=True)
+        for stage in self.stages:
+            stage.start()
+        sampler.start()
+        try:
+            for item in items:
+                self.stages[0].queue.put(item)
+        finally:
+            # этап останавливаем только после предыдущего: все его результаты уже в очереди
+            for stage in self.stages:
+                stage.stop()
+            done.set()
+            sampler.join()
+            self.elapsed = time.perf_counter() - started
+        report = self.report()
+        for row in report:
+            metrics.gauge('queue_depth_max', row['queue_max'], row['stage'])
+            metrics.gauge('utilization', row['utilization'], row['stage'])
+        return report
+
+    def report(self):
+        """
+        По этапам: элементов, ошибок, занятость потоков (доля от elapsed * workers)
+        и глубина очереди. Этап с занятостью около 1 - узкое место.
+        """
+        rows = []
+        for stage in self.stages:
+            capacity = self.elapsed * stage.workers
+            rows.append({
+                'stage': stage.name,
+                'workers': stage.workers,
+                'items': stage.items,
+                'errors': stage.errors,
+                'busy_sec': round(stage.busy, 3),
+                'utilization': round(stage.busy / capacity, 3) if capacity else 0.0,
+                'queue_max': stage.depth_max,
+                'queue_mean': round(stage.depth_sum / stage.samples, 2) if stage.samples else 0.0,
+            })
+        return rows
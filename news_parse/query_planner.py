@@ -0,0 +1,240 @@
+"""
+Планировщик запросов к GNews.
+
+GNews отдает не больше max_results (100) статей на запрос, поэтому в
+загруженные дни фиксированное окно молча обрезается, а в тихие - тратит
+лишний запрос. Планировщик:
+    - режет период на диапазоны по накопленной плотности новостей (query_plan.json,
+      по дням; день, уперевшийся в лимит, запоминается как max_results):
+      тихие дни склеиваются в один запрос, пока ожидаемое число статей
+      не дойдет до TARGET_FILL * max_results;
+    - если выдача уперлась в лимит, делит диапазон пополам, пока выдача не
+      станет меньше лимита (до одного дня - дальше GNews по дате не делится,
+      такой день помечается как неполный);
+    - выполняет запросы параллельно, не чаще RATE запросов в секунду.
+
+Отчет по дням (статей, запросов, неполные дни):
+
+    python query_planner.py сбербанк 2025-12-01 2025-12-31
+"""
+import argparse, json, threading, time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from dateutil import parser
+
+from loggers import LOG_DIR
+from metrics import metrics
+
+BASE_DIR = Path(__file__).parent
+PLAN_PATH = BASE_DIR / 'query_plan.json'
+
+MAX_RESULTS = 100
+TARGET_FILL = 0.7       # доля лимита, на которую рассчитываем диапазон
+DEFAULT_DAILY = 25      # статей в день, пока по запросу нет истории (2 дня на запрос: 3 * 25 уже больше TARGET_FILL * MAX_RESULTS)
+MAX_SPAN = 31           # дней в одном запросе
+WORKERS = 4
+RATE = 1.0              # запросов в секунду
+
+
+class RateLimiter:
+    """Не чаще rate вызовов в секунду на все потоки."""
+    def __init__(self, rate=RATE):
+        self.interval = 1 / rate if rate else 0
+        self.next_at = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self.next_at)
+            self.next_at = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def published_day(item):
+    """День публикации статьи из выдачи GNews (date) или None."""
+    try:
+        return parser.parse(item.get('published date')).date()
+    except Exception:
+        return None
+
+
+class QueryPlanner:
+    def __init__(self, search=None, max_results=MAX_RESULTS, workers=WORKERS, rate=RATE, path=PLAN_PATH):
+        if search is None:
+            from news_parse import search_news as search
+        self.search = search
+        self.max_results = max_results
+        self.workers = workers
+        self.limiter = RateLimiter(rate)
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        # запрос -> {день: статей} по выдачам, которые не делились дальше
+        self.history = json.loads(self.path.read_text(encoding='utf-8')) if self.path.exists() else {}
+        self.queries = []   # (запрос, начало, конец, статей, исход) по всем выполненным запросам
+
+    def initial_ranges(self, query, start, end):
+        """Диапазоны [начало, конец) по ожидаемой плотности: тихие дни склеиваются."""
+        daily = self.history.get(query, {})
+        target = TARGET_FILL * self.max_results
+        ranges = []
+        range_start, expected = start, 0
+        day = start
+        while day < end:
+            count = daily.get(f"{day:%Y-%m-%d}", DEFAULT_DAILY)
+            # загруженный день не приклеиваем к уже набранному диапазону
+            if day > range_start and (expected + count > target or (day - range_start).days >= MAX_SPAN):
+                ranges.append((range_start, day))
+                range_start, expected = day, 0
+            expected += count
+            day += timedelta(days=1)
+        if range_start < end:
+            ranges.append((range_start, end))
+        return ranges
+
+    def _search(self, query, start, end):
+        self.limiter.wait()
+        with metrics.timer('gnews_search'):
+            return self.search(query, start, end, max_results=self.max_results)
+
+    def _remember(self, query, start, end, results, saturated=False):
+        """
+        Плотность по дням диапазона [start, end). Выдача не в лимите полная, поэтому
+        дни диапазона без статей запоминаются явным 0 - иначе тихие дни так и
+        считались бы по DEFAULT_DAILY и не склеивались.
+        """
+        counts = {}
+        if not saturated:
+            day = start
+            while day < end:
+                counts[f"{day:%Y-%m-%d}"] = 0
+                day += timedelta(days=1)
+        first, last = f"{start:%Y-%m-%d}", f"{end:%Y-%m-%d}"
+        for item in results:
+            day = published_day(item)
+            if day is not None and first <= f"{day:%Y-%m-%d}" < last:
+                counts[f"{day:%Y-%m-%d}"] = counts.get(f"{day:%Y-%m-%d}", 0) + 1
+        if saturated:
+            # однодневная выдача в лимите: статей в этот день не меньше лимита
+            counts = {day: max(n, self.max_results) for day, n in counts.items()}
+        with self._lock:
+            self.history.setdefault(query, {}).update(counts)
+
+    def run(self, queries, start, end):
+        """
+        Все статьи по запросам за [start, end) без повторов (по ссылке GNews).
+        Диапазоны, уперевшиеся в лимит, делятся пополам и запрашиваются заново.
+        """
+        queries = [queries] if isinstance(queries, str) else list(queries)
+        pending = [(q, s, e) for q in queries for s, e in self.initial_ranges(q, start, end)]
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            while pending:
+                futures = {pool.submit(self._search, *task): task for task in pending}
+                pending = []
+                for future in as_completed(futures):
+                    query, s, e = futures[future]
+                    try:
+                        found = future.result()
+                    except Exception as exc:
+                        metrics.count('gnews_queries', outcome='error')
+                        self.queries.append((query, s, e, 0, f"error: {exc}"))
+                        continue
+                    saturated = len(found) >= self.max_results
+                    if saturated and (e - s).days > 1:
+                        mid = s + timedelta(days=(e - s).days // 2)
+                        pending += [(query, s, mid), (query, mid, e)]
+                        outcome = 'split'
+                    else:
+                        outcome = 'saturated' if saturated else 'ok'
+                        self._remember(query, s, e, found, saturated)
+                        for item in found:
+                            results.setdefault(item['url'], item)
+                    metrics.count('gnews_queries', outcome=outcome)
+                    self.queries.append((query, s, e, len(found), outcome))
+        return list(results.values())
+
+    def save(self):
+        with self._lock:
+            text = json.dumps(self.history, ensure_ascii=False, indent=2)
+        self.path.write_text(text, encoding='utf-8')
+
+    def report(self, results, start, end):
+        """
+        По дням: статей (по дате публикации), запросов, покрывших день, и
+        неполнота - день попал в однодневный запрос, который уперся в лимит.
+        """
+        rows = {}
+        day = start
+        while day < end:
+            rows[day.date()] = {'day': f"{day:%Y-%m-%d}", 'articles': 0, 'queries': 0, 'complete': True, 'errors': 0}
+            day += timedelta(days=1)
+        for item in results:
+            d = published_day(item)
+            if d in rows:
+                rows[d]['articles'] += 1
+        for _, s, e, _, outcome in self.queries:
+            day = s
+            while day < e:
+                row = rows.get(day.date())
+                if row is not None:
+                    row['queries'] += 1
+                    if outcome == 'saturated':
+                        row['complete'] = False
+                    elif outcome.startswith('error'):
+                        row['errors'] += 1
+                        row['complete'] = False
+                day += timedelta(days=1)
+        return list(rows.values())
+
+
+def group_by_window(results, start, end, window_days):
+    """Выдачу за период - по окнам [start + k*window, ...) по дате публикации (для fetch_with_selenium)."""
+    windows = {}
+    current = start
+    while current < end:
+        windows[current] = []
+        current += timedelta(days=window_days)
+    starts = sorted(windows)
+    for item in results:
+        day = published_day(item)
+        key = start
+        if day is not None:
+            for s in starts:
+                if s.date() <= day:
+                    key = s
+        windows[key].append(item)
+    return [(s, min(s + timedelta(days=window_days), end), items) for s, items in windows.items()]
+
+
+def main():
+    import pandas as pd
+    arg_parser = argparse.ArgumentParser(description="Планирование запросов GNews и покрытие по дням")
+    arg_parser.add_argument('query', nargs='+', help="запросы, последние два аргумента - начало и конец периода")
+    arg_parser.add_argument('--workers', type=int, default=WORKERS)
+    arg_parser.add_argument('--rate', type=float, default=RATE)
+    args = arg_parser.parse_args()
+    *queries, start, end = args.query
+    start, end = datetime.strptime(start, '%Y-%m-%d'), datetime.strptime(end, '%Y-%m-%d')
+
+    planner = QueryPlanner(workers=args.workers, rate=args.rate)
+    started = time.perf_counter()
+    results = planner.run(queries, start, end)
+    planner.save()
+    report = pd.DataFrame(planner.report(results, start, end))
+    report.to_csv(LOG_DIR / 'query_plan_report.csv', index=False, encoding='utf-8-sig')
+
+    pd.set_option('display.width', 200)
+    print(report.to_string(index=False))
+    outcomes = pd.Series([q[4] for q in planner.queries]).value_counts()
+    print(f"\nСтатей: {len(results)}, запросов: {len(planner.queries)} ({', '.join(f'{k}: {v}' for k, v in outcomes.items())}), "
+          f"за {time.perf_counter() - started:.1f} сек")
+    incomplete = report[~report['complete']]
+    if not incomplete.empty:
+        print(f"Неполные дни (выдача уперлась в лимит или ошибка): {', '.join(incomplete['day'])}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Фильтр релевантности по заголовку и сниппету GNews - до загрузки страницы.
+
+Ноутбук потом все равно выкидывает шумовые темы (noise_labels из
+indicator.py: розничные продукты и маркетинг, сервисы и обновления), а
+страница к тому моменту уже загружена, разобрана и прогнана через модели.
+Здесь - дешевая словарная модель: совпадения с шумовыми и рыночными
+словами в заголовке (вес TITLE_WEIGHT) и сниппете.
+
+    fetch - рыночные слова есть или ничего не нашлось
+    defer - только шумовые слова, не меньше defer_noise: грузим в конце окна
+    skip  - только шумовые слова, не меньше skip_noise: не грузим
+
+Режимы: 'enforce' - пропускать skip, 'shadow' - только размечать (для
+оценки), 'off'. В режиме enforce доля audit_rate пропусков все равно
+грузится, чтобы было с чем сравнить решение фильтра. По умолчанию shadow:
+enforce включается только после того, как согласие с пайплайном (main ниже,
+agreement) проверено на размеченных shadow прогонах.
+
+Сколько загрузок сэкономлено и согласие с разметкой полного пайплайна:
+
+    python relevance_gate.py articles.db --metrics logs/metrics/<run_id>/run.json
+"""
+import argparse, ast, json, random, re, threading
+
+from metrics import metrics
+
+MODE = 'shadow'        # 'enforce' - после проверки agreement()
+SKIP_NOISE = 3.0       # одно шумовое слово в заголовке (вес 2) - еще только defer
+DEFER_NOISE = 1.0
+TITLE_WEIGHT = 2.0
+AUDIT_RATE = 0.05
+
+# шумовые темы: розничные продукты, маркетинг, сервисы и техобновления
+NOISE_WORDS = [
+    r'кешбэк', r'кэшбэк', r'промокод', r'скидк', r'розыгрыш', r'подар(?:ок|ки|ит)', r'бонус',
+    r'\bспасибо\b', r'подписк', r'тариф', r'доставк', r'реклам', r'маркетинг', r'акци(?:я|ю)\b',
+    r'дебетов', r'кредитн\w* карт', r'карт\w* (?:мир|visa|mastercard)', r'банкомат', r'отделени',
+    r'приложени', r'сбербанк онлайн', r'сбол\b', r'сбер\s?id', r'обновлени', r'нов\w* функци',
+    # сбои и мошенничество - только розничные: сбой в работе банка и дела о мошенничестве бывают рыночными
+    r'не работа', r'телефонн\w* мошенни', r'мошенни\w* (?:звон|схем)', r'gigachat', r'гигачат', r'салют', r'умн\w* колонк',
+    r'сбермаркет', r'самокат', r'окко', r'звук\b', r'вакан',
+]
+
+# рыночные темы: финансы, корпоративные события, аналитика, макро и регулирование
+MARKET_WORDS = [
+    r'дивиденд', r'прибыл', r'выручк', r'отчетност', r'мсфо', r'рсбу', r'акционер', r'котировк',
+    r'капитализац', r'бумаг', r'облигац', r'ставк', r'\bцб\b', r'банк россии', r'санкци', r'греф',
+    r'набсовет', r'наблюдательн\w* совет', r'собрани\w* акционер', r'мосбирж', r'индекс',
+    r'инвест', r'аналитик', r'прогноз', r'рейтинг', r'выкуп', r'сделк', r'слияни', r'поглощени',
+    r'налог', r'регулятор', r'закон', r'рынок', r'рынк', r'торг(?:и|ах|ов)', r'подорожа', r'подешев',
+    r'акци(?:и|ям|ях)\s+(?:сбер|банк|компани)',
+]
+
+_noise = [re.compile(w) for w in NOISE_WORDS]
+_market = [re.compile(w) for w in MARKET_WORDS]
+
+
+def _hits(patterns, text):
+    return sum(1 for p in patterns if p.search(text))
+
+
+class RelevanceGate:
+    def __init__(self, mode=MODE, skip_noise=SKIP_NOISE, defer_noise=DEFER_NOISE,
+                 audit_rate=AUDIT_RATE, seed=None):
+        if mode not in ('enforce', 'shadow', 'off'):
+            raise ValueError(f"Неизвестный режим фильтра: {mode}")
+        self.mode = mode
+        self.skip_noise = skip_noise
+        self.defer_noise = defer_noise
+        self.audit_rate = audit_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {'fetch': 0, 'defer': 0, 'skip': 0, 'audit': 0}
+
+    def score(self, item):
+        """(шум, рынок) по заголовку и сниппету записи GNews."""
+        title = (item.get('title') or '').rsplit(' - ', 1)[0].lower() # без издания
+        snippet = (item.get('description') or '').lower()
+        noise = TITLE_WEIGHT * _hits(_noise, title) + _hits(_noise, snippet)
+        market = TITLE_WEIGHT * _hits(_market, title) + _hits(_market, snippet)
+        return noise, market
+
+    def decide(self, item):
+        """fetch / defer / skip для записи GNews и оценка (рынок - шум)."""
+        noise, market = self.score(item)
+        if market > 0 or noise < self.defer_noise:
+            decision = 'fetch'
+        elif noise >= self.skip_noise:
+            decision = 'skip'
+        else:
+            decision = 'defer'
+        return decision, market - noise
+
+    def plan(self, results):
+        """
+        Выдача в порядке загрузки: fetch, затем defer; skip в режиме enforce
+        отбрасываются (кроме выборки audit). Каждой записи проставляются
+        gate_decision и gate_score - они попадают в строку статьи.
+        """
+        if self.mode == 'off':
+            return results
+        ordered = {'fetch': [], 'defer': [], 'skip': []}
+        for item in results:
+            decision, score = self.decide(item)
+            item = {**item, 'gate_decision': decision, 'gate_score': score}
+            metrics.count('gate', outcome=decision)
+            with self._lock:
+                self.stats[decision] += 1
+                if decision == 'skip' and self.mode == 'enforce':
+                    if self._random.random() >= self.audit_rate:
+                        metrics.count('article', outcome='gated')
+                        continue
+                    self.stats['audit'] += 1
+            ordered[decision].append(item)
+        return ordered['fetch'] + ordered['defer'] + ordered['skip']
+
+    def saved_loads(self):
+        """Сколько загрузок страниц не сделано из-за фильтра."""
+        if self.mode != 'enforce':
+            return 0
+        return self.stats['skip'] - self.stats['audit']
+
+
+relevance_gate = RelevanceGate()
+
+
+def _parse_topics(value):
+    if isinstance(value, dict):
+        return value
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        return json.loads(value)
+    except ValueError:
+        return ast.literal_eval(value) # csv из ноутбука: repr словаря
+
+
+def agreement(df):
+    """
+    Согласие решений фильтра с разметкой полного пайплайна (is_noise по topics).
+    Берутся строки, где есть и решение фильтра, и темы: режим shadow и audit выборка.
+    """
+    from indicator import is_noise
+    rows = df[df['gate_decision'].notna() & df['topics'].notna()].copy()
+    if rows.empty:
+        return None
+    rows['noise'] = rows['topics'].map(lambda t: is_noise(_parse_topics(t)))
+    table = rows.groupby(['gate_decision', 'noise']).size().unstack(fill_value=0)
+    skipped = rows[rows['gate_decision'] == 'skip']
+    flagged = rows[rows['gate_decision'] != 'fetch']
+    return {
+        'rows': len(rows),
+        'table': table,
+        # доля пропущенных, которые пайплайн тоже счел шумом (цена ошибки - потерянная новость)
+        'skip_precision': skipped['noise'].mean() if len(skipped) else None,
+        # доля шума, которую фильтр поймал (skip или defer)
+        'noise_recall': flagged['noise'].sum() / rows['noise'].sum() if rows['noise'].sum() else None,
+        'accuracy': ((rows['gate_decision'] != 'fetch') == rows['noise']).mean(),
+    }
+
+
+def main():
+    import pandas as pd
+    arg_parser = argparse.ArgumentParser(description="Экономия и точность фильтра релевантности")
+    arg_parser.add_argument('data', help="articles.db (ArticleStore) или csv с колонками gate_decision и topics")
+    arg_parser.add_argument('--metrics', help="json метрик прогона (metrics.dump) - для числа сэкономленных загрузок")
+    args = arg_parser.parse_args()
+
+    if args.metrics:
+        snapshot = json.loads(open(args.metrics, encoding='utf-8').read())
+        gate = {c['outcome']: c['value'] for c in snapshot['counters'] if c['name'] == 'gate'}
+        page_time = sum(s['sum'] for s in snapshot['stages'] if s['stage'] in ('driver_get', 'trafilatura', 'extract_page_date', 'get_summary'))
+        pages = sum(c['value'] for c in snapshot['counters'] if c['name'] == 'article' and c['outcome'] not in ('gated', 'excluded', 'duplicate'))
+        saved = sum(c['value'] for c in snapshot['counters'] if c['name'] == 'article' and c['outcome'] == 'gated')
+        print(f"Решения фильтра: {gate}")
+        print(f"Сэкономлено загрузок: {saved}" + (f", ~{saved * page_time / pages:.0f} сек" if pages else ""))
+
+    if args.data.endswith('.db'):
+        from article_store import ArticleStore
+        df = ArticleStore(args.data).load()
+    else:
+        df = pd.read_csv(args.data)
+    result = agreement(df) if 'gate_decision' in df else None
+    if result is None:
+        print("Нет строк с решением фильтра и темами (нужен режим shadow или audit выборка)")
+        return
+    print(f"\nСтрок для сравнения: {result['rows']}")
+    print(result['table'].to_string())
+    for key in ('skip_precision', 'noise_recall', 'accuracy'):
+        value = result[key]
+        print(f"{key}: {value:.3f}" if value is not None else f"{key}: -")
+
+if __name__ == "__main__":
+    main()
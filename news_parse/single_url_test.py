@@ -6,7 +6,7 @@ from datetime import datetime
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
+from drivers import chromedriver_path
 from selenium.webdriver.common.by import By
 from googlenewsdecoder import gnewsdecoder
 from dateutil import parser
@@ -231,7 +231,7 @@ def init_driver():
     opts = Options()
     opts.add_argument("--headless")
     opts.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36")
-    return webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=opts)
+    return webdriver.Chrome(service=Service(chromedriver_path()), options=opts)
 
 def main():
     url_file = LOG_DIR / 'url.log'
@@ -0,0 +1,51 @@
+"""
+Обертка над уже скачанным html с тем же интерфейсом, что у selenium driver
+(find_element / find_elements / page_source / current_url). Позволяет
+прогонять extract_page_date и process_page без браузера.
+"""
+from selectolax.parser import HTMLParser
+from selenium.common.exceptions import NoSuchElementException
+
+CSS_SELECTOR = "css selector" # = selenium By.CSS_SELECTOR, без импорта тяжелого selenium.webdriver
+
+class StaticElement:
+    """Аналог selenium WebElement поверх узла selectolax."""
+    def __init__(self, node):
+        self.node = node
+
+    @property
+    def text(self):
+        return " ".join(self.node.text(separator=" ", strip=True).split())
+
+    def get_attribute(self, name):
+        if name == "textContent":
+            return self.node.text(deep=True)
+        if name == "outerHTML":
+            return self.node.html
+        return self.node.attributes.get(name)
+
+
+class StaticPage:
+    """Страница из готового html: ничего не грузит и ничего не ждет."""
+    def __init__(self, html, url=None):
+        self.page_source = html or ""
+        self.current_url = url
+        self._tree = HTMLParser(self.page_source)
+
+    def find_elements(self, by=CSS_SELECTOR, value=None):
+        if by != CSS_SELECTOR:
+            raise ValueError(f"StaticPage поддерживает только CSS селекторы, получено: {by}")
+        try:
+            return [StaticElement(node) for node in self._tree.css(value)]
+        except Exception:
+            # selectolax не понимает часть экзотических селекторов - ведем себя как пустой поиск
+            return []
+
+    def find_element(self, by=CSS_SELECTOR, value=None):
+        elements = self.find_elements(by, value)
+        if not elements:
+            raise NoSuchElementException(f"Элемент не найден: {value}")
+        return elements[0]
+
+    def quit(self):
+        pass
@@ -0,0 +1,43 @@
+"""
+Summary статьи (LexRank из sumy + нарезка на предложения nltk).
+
+sumy и nltk импортируются при первом вызове get_summary, а данные punkt
+проверяются локально (nltk.data.find) и скачиваются только если их нет.
+"""
+
+NLTK_RESOURCES = {
+    'punkt': 'tokenizers/punkt',
+    'punkt_tab': 'tokenizers/punkt_tab/russian',
+}
+
+_nltk_ready = False
+
+def ensure_nltk_data():
+    global _nltk_ready
+    if _nltk_ready:
+        return
+    import nltk
+    for name, resource in NLTK_RESOURCES.items():
+        try:
+            nltk.data.find(resource)
+        except LookupError:
+            nltk.download(name, quiet=True)
+    _nltk_ready = True
+
+def get_summary(text, max_sentences=4):
+    if not text or len(text) < 100: return "Текст слишком короткий"
+    clean_text = " ".join(text.replace("\n", " ").split())
+    try:
+        from sumy.parsers.plaintext import PlaintextParser
+        from sumy.nlp.tokenizers import Tokenizer
+        from sumy.summarizers.lex_rank import LexRankSummarizer
+        from nltk.tokenize import sent_tokenize
+        ensure_nltk_data()
+        parser_sum = PlaintextParser.from_string(clean_text, Tokenizer("russian"))
+        summarizer = LexRankSummarizer()
+        sumy_result = summarizer(parser_sum.document, max_sentences)
+        raw_summary = " ".join([str(s) for s in sumy_result])
+        real_sentences = sent_tokenize(raw_summary, language="russian")
+        return ' '.join(real_sentences[:max_sentences]) if real_sentences else raw_summary
+    except Exception as e:
+        return f"Ошибка обработки: {e}"
@@ -0,0 +1,204 @@
+"""
+Тесты живого режима (live_service.py) без сети и моделей: статьи приходят
+из LocalFeed вместе с html, scorer подменен функцией с фиксированным ответом.
+
+    python -m unittest test_live_service
+"""
+import json, tempfile, threading, unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import requests
+
+from article_store import ArticleStore
+from feeds import FeedSource
+from live_service import LocalFeed, LiveIndicatorService, make_handler
+
+BODY = ("Сбербанк объявил о росте чистой прибыли по итогам квартала. "
+        "Аналитики ожидают рекордных дивидендов по итогам года. "
+        "Акции банка выросли на торгах Московской биржи. "
+        "Набсовет рассмотрит рекомендацию по выплате в следующем месяце. ") * 3
+
+
+def make_item(n, published='2026-10-19T10:15:00+03:00'):
+    html = (f"<html><head><meta property='article:published_time' content='{published}'>"
+            f"<title>Новость {n}</title></head>"
+            f"<body><article><h1>Новость {n}</h1><p>{BODY}</p></article></body></html>")
+    return {'url': f'https://example.ru/news/{n}', 'title': f'Сбербанк {n} - Интерфакс',
+            'published date': 'Sun, 19 Oct 2026 07:00:00 GMT', 'html': html}
+
+
+def fake_scorer(summary, title):
+    return {'topics': {'финансы': 1.0}, 'news_index': 0.75, 'weighted_index': 0.5}
+
+
+def start_server(handler):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+class LiveServiceTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.store = ArticleStore(self.dir / 'live.db')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def service(self, feed):
+        return LiveIndicatorService(feed, self.store, scorer=fake_scorer, gate=None)
+
+    def test_local_feed_jsonl_and_json(self):
+        items = [make_item(1), make_item(2)]
+        jsonl = self.dir / 'feed.jsonl'
+        jsonl.write_text('\n'.join(json.dumps(item, ensure_ascii=False) for item in items) + '\n', encoding='utf-8')
+        self.assertEqual(LocalFeed(str(jsonl)).poll(), items)
+        array = self.dir / 'feed.json'
+        array.write_text(json.dumps(items, ensure_ascii=False), encoding='utf-8')
+        self.assertEqual(LocalFeed(str(array)).poll(), items)
+        empty = self.dir / 'empty.jsonl'
+        empty.write_text('', encoding='utf-8')
+        self.assertEqual(LocalFeed(str(empty)).poll(), [])
+
+    def test_local_feed_http(self):
+        items = [make_item(1)]
+
+        class FeedHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                data = json.dumps(items, ensure_ascii=False).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        server, url = start_server(FeedHandler)
+        try:
+            self.assertEqual(LocalFeed(url + '/feed').poll(), items)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_poll_once_publishes_only_new_articles(self):
+        feed = self.dir / 'feed.jsonl'
+        feed.write_text(json.dumps(make_item(1), ensure_ascii=False) + '\n', encoding='utf-8')
+        service = self.service(LocalFeed(str(feed)))
+
+        first = service.poll_once()
+        self.assertEqual([u['seq'] for u in first], [1])
+        self.assertEqual(first[0]['url'], 'https://example.ru/news/1')
+        self.assertEqual(first[0]['weighted_index'], 0.5)
+        self.assertEqual(first[0]['indicator'], 0.5)
+        self.assertTrue(self.store.has('https://example.ru/news/1'))
+
+        # та же статья повторно не обрабатывается, новая получает следующий номер
+        with feed.open('a', encoding='utf-8') as f:
+            f.write(json.dumps(make_item(2), ensure_ascii=False) + '\n')
+        second = service.poll_once()
+        self.assertEqual([u['url'] for u in second], ['https://example.ru/news/2'])
+        self.assertEqual(second[0]['seq'], 2)
+        self.assertEqual(service.poll_once(), [])
+
+    def test_poll_once_retries_failed_item(self):
+        feed = self.dir / 'feed.jsonl'
+        feed.write_text(json.dumps(make_item(1), ensure_ascii=False) + '\n', encoding='utf-8')
+        calls = []
+
+        def flaky_scorer(summary, title):
+            calls.append(title)
+            if len(calls) == 1:
+                raise RuntimeError("модель недоступна")
+            return fake_scorer(summary, title)
+
+        service = LiveIndicatorService(LocalFeed(str(feed)), self.store, scorer=flaky_scorer, gate=None, retry_delay=0)
+        self.assertEqual(service.poll_once(), [])
+        self.assertFalse(self.store.has('https://example.ru/news/1'))
+
+        # на следующем опросе статья обрабатывается заново
+        second = service.poll_once()
+        self.assertEqual([u['url'] for u in second], ['https://example.ru/news/1'])
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(service.retries, {})
+
+    def test_feed_source_returns_item_until_confirmed(self):
+        rss = (f"<?xml version='1.0' encoding='utf-8'?><rss xmlns:yandex='http://news.yandex.ru'><channel><item>"
+               f"<title>Сбербанк 1</title><link>https://example.ru/news/1</link>"
+               f"<pubDate>Sun, 19 Oct 2026 07:00:00 GMT</pubDate><yandex:full-text>{BODY}</yandex:full-text>"
+               f"</item></channel></rss>").encode('utf-8')
+
+        class RssHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                # лента не меняется: второй и следующие опросы получают 304
+                if self.headers.get('If-None-Match') == '"v1"':
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('ETag', '"v1"')
+                self.send_header('Content-Length', str(len(rss)))
+                self.end_headers()
+                self.wfile.write(rss)
+
+            def log_message(self, format, *args):
+                pass
+
+        calls = []
+
+        def flaky_scorer(summary, title):
+            calls.append(title)
+            if len(calls) == 1:
+                raise RuntimeError("модель недоступна")
+            return fake_scorer(summary, title)
+
+        server, url = start_server(RssHandler)
+        try:
+            feed = FeedSource(feeds={'Интерфакс': [url + '/rss']}, path=self.dir / 'feeds_state.json')
+            service = LiveIndicatorService(feed, self.store, scorer=flaky_scorer, gate=None, retry_delay=0)
+            self.assertEqual(service.poll_once(), [])
+            # упавшая статья не подтверждена - лента отдает ее и при 304
+            second = service.poll_once()
+            self.assertEqual([u['url'] for u in second], ['https://example.ru/news/1'])
+            self.assertEqual(feed.poll(), [])
+            self.assertEqual(service.poll_once(), [])
+            self.assertEqual(len(calls), 2)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_poll_once_survives_broken_feed(self):
+        service = self.service(LocalFeed(str(self.dir / 'missing.jsonl')))
+        self.assertEqual(service.poll_once(), [])
+        self.assertEqual(service.snapshot()['seq'], 0)
+
+    def test_http_endpoints(self):
+        feed = self.dir / 'feed.jsonl'
+        feed.write_text('\n'.join(json.dumps(make_item(n), ensure_ascii=False) for n in (1, 2)) + '\n', encoding='utf-8')
+        service = self.service(LocalFeed(str(feed)))
+        service.poll_once()
+        server, url = start_server(make_handler(service))
+        try:
+            indicator = requests.get(url + '/indicator', timeout=5).json()
+            self.assertEqual(indicator, {'indicator': 0.5, 'articles_in_window': 2, 'seq': 2})
+
+            updates = requests.get(url + '/updates', params={'since': 1}, timeout=5).json()
+            self.assertEqual([u['seq'] for u in updates], [2])
+            self.assertEqual(len(requests.get(url + '/updates', timeout=5).json()), 2)
+
+            latency = requests.get(url + '/latency', timeout=5).json()
+            self.assertEqual(latency['count'], 2)
+            self.assertGreaterEqual(latency['processing_p95'], latency['processing_p50'])
+            self.assertIsNotNone(latency['news_to_signal_p50'])
+
+            self.assertEqual(requests.get(url + '/missing', timeout=5).status_code, 404)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == '__main__':
+    unittest.main()
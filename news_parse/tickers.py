@@ -0,0 +1,40 @@
+"""
+Тикеры и их упоминания в тексте.
+
+У каждого тикера - поисковые запросы для GNews и шаблоны упоминаний для
+разметки статей. Одна выдача по нескольким тикерам объединяется и
+дедуплицируется до загрузки страниц (fetch_with_selenium со списком
+запросов), а каждая статья получает все тикеры, которые в ней упомянуты.
+"""
+import re
+
+# шаблоны - регулярки по тексту в нижнем регистре, \w* ловит падежи: сбербанка, сбербанку, ...
+TICKERS = {
+    # не просто сбер\w* - иначе попадут "сбережения" и "сберегательный"
+    'SBER': {'queries': ['сбербанк'], 'aliases': [r'сбербанк\w*', r'\bсбер(?:а|у|ом|е)?\b', r'sberbank', r'\bsber\b']},
+    'VTBR': {'queries': ['втб'], 'aliases': [r'\bвтб\b', r'\bvtb\b']},
+    'T': {'queries': ['т-банк'], 'aliases': [r'т-банк\w*', r'тинькофф\w*', r'\bt-bank\b', r'tinkoff']},
+    'GAZP': {'queries': ['газпром'], 'aliases': [r'газпром(?!\s*нефт)\w*', r'gazprom(?!\s*neft)']},
+    'SIBN': {'queries': ['газпром нефть'], 'aliases': [r'газпром\s*нефт\w*', r'gazprom\s*neft']},
+    'LKOH': {'queries': ['лукойл'], 'aliases': [r'лукойл\w*', r'lukoil']},
+    'ROSN': {'queries': ['роснефть'], 'aliases': [r'роснефт\w*', r'rosneft']},
+    'GMKN': {'queries': ['норникель'], 'aliases': [r'норникел\w*', r'норильск\w* никел\w*', r'nornickel']},
+    'YDEX': {'queries': ['яндекс'], 'aliases': [r'яндекс\w*', r'yandex']},
+    'MOEX': {'queries': ['мосбиржа'], 'aliases': [r'мосбирж\w*', r'московск\w* бирж\w*', r'moscow exchange']},
+    'IMOEX': {'queries': ['индекс мосбиржи'], 'aliases': [r'индекс\w* мосбирж\w*', r'индекс\w* московской бирж\w*', r'\bimoex\b']},
+}
+
+_patterns = {ticker: re.compile('|'.join(spec['aliases'])) for ticker, spec in TICKERS.items()}
+
+
+def search_queries(tickers):
+    """Поисковые запросы GNews для списка тикеров, без повторов."""
+    return list(dict.fromkeys(q for ticker in tickers for q in TICKERS[ticker]['queries']))
+
+
+def match_tickers(text, tickers=None):
+    """Тикеры, упомянутые в тексте (в порядке TICKERS). tickers - ограничить проверку списком."""
+    if not text:
+        return []
+    text = text.lower()
+    return [t for t in (tickers or TICKERS) if _patterns[t].search(text)]